@@ -1,6 +1,8 @@
 from fastapi import FastAPI
-from src.api.routes import user_routes, course_routes, chat_routes, ai_planner_routes
+import asyncio
+from src.api.routes import user_routes, course_routes, chat_routes, ai_planner_routes, metrics_routes
 from src.api.middleware.security import setup_security_middleware
+from src.api.middleware.auth import run_certificate_refresh
 from src.utils.logging import setup_logger
 from src.config.settings import get_settings
 
@@ -23,6 +25,25 @@ app.include_router(user_routes.router, prefix="/api/user", tags=["users"])
 app.include_router(course_routes.router, prefix="/api/user/courses", tags=["courses"])
 app.include_router(chat_routes.router, prefix="/api", tags=["chat"])
 app.include_router(ai_planner_routes.router, prefix="/api", tags=["ai-planner"])
+app.include_router(metrics_routes.router, prefix="/api", tags=["metrics"])
+
+@app.on_event("startup")
+async def start_plan_pregeneration_schedule():
+    if settings.PLAN_PREGENERATION_HOUR_UTC >= 0:
+        from src.services.plan_pregeneration import run_nightly_schedule
+        app.state.plan_pregeneration_task = asyncio.create_task(run_nightly_schedule())
+        logger.info(f"Nightly plan pre-generation scheduled for {settings.PLAN_PREGENERATION_HOUR_UTC}:00 UTC")
+
+@app.on_event("startup")
+async def start_certificate_refresh():
+    app.state.certificate_refresh_task = asyncio.create_task(run_certificate_refresh())
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for name in ("certificate_refresh_task", "plan_pregeneration_task"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,127 @@
+"""
+Microbenchmark of the security middleware: requests/sec on a trivial route with
+the pure ASGI SecurityMiddleware versus the previous pair of @app.middleware("http")
+functions. Requests are driven straight through the ASGI app (no server, no
+HTTP client), so the numbers isolate middleware overhead.
+
+Run from the backend directory:
+
+    python scripts/benchmark_middleware.py --requests 20000 --concurrency 1
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings required at import time; the benchmark never uses them
+for name in ("FIREBASE_ADMIN_CREDENTIALS", "ENCRYPTION_KEY", "CANVAS_API_BASE_URL", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "benchmark")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost:3000")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the security middleware")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per variant")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight at once")
+    parser.add_argument("--rounds", type=int, default=3, help="Runs per variant, the best is reported")
+    return parser.parse_args()
+
+
+def build_app(variant: str):
+    from fastapi import FastAPI, Request, Response
+    from src.api.middleware import security
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    if variant == "asgi":
+        security.setup_security_middleware(app)
+        return app
+
+    # The previous implementation, kept here as the baseline
+    app.add_middleware(
+        security.CORSMiddleware,
+        allow_origins=[origin.strip() for origin in security.settings.CORS_ORIGINS.split(',')],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*", "Authorization", "Content-Type"],
+        expose_headers=["*"],
+        max_age=3600
+    )
+
+    @app.middleware("http")
+    async def security_headers(request: Request, call_next):
+        response = await call_next(request)
+        for name, value in security.SECURITY_HEADERS.items():
+            response.headers[name] = value
+        return response
+
+    @app.middleware("http")
+    async def method_check(request: Request, call_next):
+        if request.method not in security.ALLOWED_METHODS:
+            return Response(status_code=405)
+        return await call_next(request)
+
+    return app
+
+
+async def call(app, method: str = "GET", path: str = "/ping"):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"localhost"), (b"origin", b"http://localhost:3000")],
+        "client": ("127.0.0.1", 12345), "server": ("localhost", 8000)
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+async def run(app, requests: int, concurrency: int) -> float:
+    per_worker = requests // concurrency
+
+    async def worker():
+        for _ in range(per_worker):
+            await call(app)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return per_worker * concurrency / (time.perf_counter() - start)
+
+
+async def main():
+    args = parse_args()
+    results = {}
+
+    for variant in ("base_http", "asgi"):
+        app = build_app(variant)
+
+        # Sanity check that both variants behave the same
+        start, *_ = await call(app)
+        headers = {name.decode().lower(): value.decode() for name, value in start["headers"]}
+        assert start["status"] == 200 and headers["x-frame-options"] == "DENY", (variant, start)
+        blocked, *_ = await call(app, method="TRACE")
+        assert blocked["status"] == 405, (variant, blocked)
+
+        await run(app, min(1000, args.requests), args.concurrency)  # Warm-up
+        results[variant] = max([await run(app, args.requests, args.concurrency) for _ in range(args.rounds)])
+        print(f"{variant:>10}: {results[variant]:,.0f} requests/sec")
+
+    print(f"   speedup: {results['asgi'] / results['base_http']:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
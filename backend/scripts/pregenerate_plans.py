@@ -0,0 +1,57 @@
+"""
+Pre-generate AI plans for recently active users.
+
+Run from the backend directory, e.g. nightly from cron:
+
+    python scripts/pregenerate_plans.py --active-days 7 --concurrency 4 --max-tokens 2000000
+
+Use --fake-openai (with --users) to load-test the pipeline without calling OpenAI.
+Rerunning on the same day resumes from the state file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pre-generate AI plans for active users")
+    parser.add_argument("--active-days", type=int, help="Users active within this many days")
+    parser.add_argument("--concurrency", type=int, help="Generations running at once")
+    parser.add_argument("--max-tokens", type=int, help="Model token budget for the run")
+    parser.add_argument("--max-users", type=int, help="Check at most this many users")
+    parser.add_argument("--expiring-within-hours", type=float, help="Regenerate plans expiring within this many hours")
+    parser.add_argument("--state-path", help="Progress file used to resume an interrupted run")
+    parser.add_argument("--users", help="Comma-separated user IDs instead of querying active users")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which plans would be regenerated")
+    parser.add_argument("--fake-openai", action="store_true", help="Use the local OpenAI stand-in")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.fake_openai:
+        # Must be set before settings are first loaded
+        os.environ["OPENAI_FAKE_CLIENT"] = "true"
+
+    from src.services.plan_pregeneration import run_pregeneration
+
+    options = {
+        "active_days": args.active_days,
+        "concurrency": args.concurrency,
+        "max_tokens": args.max_tokens,
+        "max_users": args.max_users,
+        "expiring_within_hours": args.expiring_within_hours,
+        "state_path": args.state_path,
+        "user_ids": args.users.split(",") if args.users else None,
+        "dry_run": args.dry_run
+    }
+    summary = asyncio.run(run_pregeneration(**{key: value for key, value in options.items() if value is not None}))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,155 @@
-from fastapi import Header, HTTPException
+from fastapi import Depends, Header, HTTPException
 from firebase_admin import auth
+from src.services.user_activity import record_activity
+from src.config.settings import get_settings
+from src.utils import metrics
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+import asyncio
+import hashlib
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def verify_firebase_token(authorization: str = Header(...)):
+settings = get_settings()
+
+# Cached tokens are treated as expired slightly early, so one is never accepted past its exp
+EXPIRY_MARGIN_SECONDS = 5
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified ID tokens, keyed by the token's SHA-256 so raw tokens
+    are not kept in memory. Entries are valid until the token's own expiry, which
+    is what verify_id_token checks too (revocation is not checked either way).
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            uid, expires_at = entry
+            if expires_at - EXPIRY_MARGIN_SECONDS <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return uid
+
+    def put(self, key: str, uid: str, expires_at: float):
+        with self._lock:
+            self._entries[key] = (uid, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            metrics.set_gauge("auth.token_cache.size", len(self._entries))
+
+
+token_cache = VerifiedTokenCache(settings.AUTH_TOKEN_CACHE_SIZE)
+
+
+# Published signing certificates for Firebase ID tokens
+ID_TOKEN_CERT_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+
+def _certificate_request():
+    """
+    firebase_admin's cache-control aware transport used by verify_id_token, or None.
+
+    It is only reachable through private attributes, which any firebase_admin release
+    may change, so each step is looked up defensively. Without it, certificates are
+    fetched lazily by verify_id_token as before.
+    """
+    try:
+        get_client = getattr(auth, "_get_client", None)
+        verifier = getattr(get_client(None), "_token_verifier", None) if callable(get_client) else None
+        request = getattr(verifier, "request", None)
+    except Exception as e:
+        request, reason = None, str(e)
+    else:
+        reason = "token verifier transport not found"
+
+    if not callable(request):
+        logger.warning(f"Firebase certificate prefetch unavailable with this firebase_admin version "
+                       f"({reason}), certificates will be fetched on verification")
+        return None
+    return request
+
+
+def prefetch_public_certificates(request) -> bool:
+    """
+    Fetch the token-signing certificates through the verifier's HTTP cache, so
+    verification on the request path doesn't wait for the download when the
+    cached copy expires.
+    """
     try:
-        if not authorization.startswith('Bearer '):
-            logger.error("Authorization header missing Bearer prefix")
-            raise HTTPException(status_code=401, detail="Invalid authorization format")
-            
-        token = authorization.split("Bearer ")[1]
-        logger.info("Attempting to verify Firebase token")
-        
+        response = request(ID_TOKEN_CERT_URL)
+        if response.status != 200:
+            raise ValueError(f"HTTP {response.status}")
+        metrics.increment("auth.cert_prefetches")
+        return True
+    except Exception as e:
+        metrics.increment("auth.cert_prefetch_failures")
+        logger.warning(f"Firebase certificate prefetch failed: {str(e)}")
+        return False
+
+
+async def run_certificate_refresh(interval_seconds: float = settings.AUTH_CERT_REFRESH_SECONDS):
+    """Prefetch the certificates at startup and keep them fresh; stops if prefetching is unavailable"""
+    request = _certificate_request()
+    if request is None:
+        return
+    while True:
+        await asyncio.to_thread(prefetch_public_certificates, request)
+        await asyncio.sleep(interval_seconds)
+
+
+async def verify_firebase_token(authorization: str = Header(...)):
+    if not authorization.startswith('Bearer '):
+        logger.error("Authorization header missing Bearer prefix")
+        raise HTTPException(status_code=401, detail="Invalid authorization format")
+
+    token = authorization.split("Bearer ")[1]
+    metrics.increment("auth.token_cache.lookups")
+
+    key = VerifiedTokenCache.key(token)
+    uid = token_cache.get(key)
+    if uid is not None:
+        metrics.increment("auth.token_cache.hits")
+    else:
         try:
-            decoded_token = auth.verify_id_token(token)
-            logger.info(f"Successfully verified token for user: {decoded_token['uid']}")
-            return decoded_token['uid']
+            # Signature verification (and any certificate download) stays off the event loop
+            decoded_token = await asyncio.to_thread(auth.verify_id_token, token)
         except Exception as e:
             logger.error(f"Firebase token verification failed: {str(e)}")
             raise HTTPException(status_code=401, detail="Invalid token")
-            
-    except Exception as e:
-        logger.error(f"Token verification error: {str(e)}")
-        raise HTTPException(status_code=401, detail="Invalid authentication")
\ No newline at end of file
+
+        uid = decoded_token['uid']
+        token_cache.put(key, uid, decoded_token['exp'])
+
+    metrics.set_gauge("auth.token_cache.hit_rate", metrics.ratio("auth.token_cache.hits", "auth.token_cache.lookups"))
+
+    record_activity(uid)
+    return uid
+
+
+ADMIN_USER_IDS = frozenset(uid.strip() for uid in settings.ADMIN_USER_IDS.split(',') if uid.strip())
+
+
+async def verify_admin(user_id: str = Depends(verify_firebase_token)):
+    """Authenticated user who is listed in ADMIN_USER_IDS, for process-wide operational data"""
+    if user_id not in ADMIN_USER_IDS:
+        logger.warning(f"User {user_id} denied access to an admin endpoint")
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user_id
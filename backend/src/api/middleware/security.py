@@ -1,12 +1,56 @@
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from src.config.settings import get_settings
-from typing import Callable
 import logging
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+ALLOWED_METHODS = frozenset({"GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"})
+
+# Helmet-equivalent headers added to every HTTP response
+SECURITY_HEADERS = {
+    "X-Frame-Options": "DENY",
+    "X-Content-Type-Options": "nosniff",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains"
+}
+
+
+class SecurityMiddleware:
+    """
+    Method check and security headers in one pure ASGI middleware.
+
+    Unlike @app.middleware("http") (BaseHTTPMiddleware), this doesn't run the
+    app in a separate task or re-wrap the response body stream; it only edits
+    the response start message, so streaming responses pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in SECURITY_HEADERS.items():
+                    headers[name] = value
+            await send(message)
+
+        if scope["method"] not in ALLOWED_METHODS:
+            logger.warning(f"Blocked request with method: {scope['method']}")
+            await Response(status_code=405)(scope, receive, send_with_headers)
+            return
+
+        await self.app(scope, receive, send_with_headers)
+
+
 def setup_security_middleware(app: FastAPI):
     # 1. CORS middleware
     origins = [origin.strip() for origin in settings.CORS_ORIGINS.split(',')]
@@ -22,22 +66,7 @@ def setup_security_middleware(app: FastAPI):
         max_age=3600
     )
 
-    # 2. Security headers (helmet equivalent)
-    @app.middleware("http")
-    async def security_headers(request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        return response
-
-    # 3. Method check middleware
-    @app.middleware("http")
-    async def method_check(request: Request, call_next: Callable) -> Response:
-        if request.method not in ["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"]:
-            logger.warning(f"Blocked request with method: {request.method}")
-            return Response(status_code=405)
-        return await call_next(request)
-
-    # Note: Auth check is already handled by verify_firebase_token in auth.py
\ No newline at end of file
+    # 2. Method check and security headers (helmet equivalent), outside CORS
+    app.add_middleware(SecurityMiddleware)
+
+    # Note: Auth check is already handled by verify_firebase_token in auth.py
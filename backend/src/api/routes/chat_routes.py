@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from src.models.chat import ChatRequest, ChatResponse, ChatMessage, ChatList, Chat
 from src.services.chat_service import ChatService
+from src.services.admission_control import admission_controller, AdmissionRejected, Priority
 from src.api.middleware.auth import verify_firebase_token
 from typing import List
 import logging
@@ -23,17 +24,19 @@ async def chat(
     Otherwise creates a new chat
     
     Optional previous_response_id can be provided to maintain conversation context
-    Optional previous_messages can be provided for resuming conversations after logout
+    Conversation history is rebuilt on the server; last_message_id lets it detect a stale cache
     """
     try:
-        # Generate response from OpenAI
-        response_message, response_id, chat_id = await ChatService.generate_response(
-            message_content=request.message, 
-            user_id=user_id,
-            chat_id=request.chat_id,
-            previous_response_id=request.previous_response_id,
-            previous_messages=request.previous_messages
-        )
+        # Generate response from OpenAI, within the per-user and global concurrency limits
+        async with admission_controller.admit(user_id, Priority.CHAT):
+            response_message, response_id, chat_id = await ChatService.generate_response(
+                message_content=request.message, 
+                user_id=user_id,
+                chat_id=request.chat_id,
+                previous_response_id=request.previous_response_id,
+                last_message_id=request.last_message_id,
+                allow_fast_path=request.allow_fast_path
+            )
         
         # Return the response with chat_id
         return ChatResponse(
@@ -41,6 +44,8 @@ async def chat(
             response_id=response_id,
             chat_id=chat_id
         )
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         # Log the error
         logger.error(f"Error processing chat request: {str(e)}", exc_info=True)
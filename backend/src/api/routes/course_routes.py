@@ -1,8 +1,13 @@
 from fastapi import APIRouter, Depends, Query, Body, HTTPException
 from src.models.course import Course, CourseBase, ModuleItem
+from src.models.workload import WorkloadForecast
+from src.models.grades import GradeReport, WhatIfRequest
 from src.services.course_service import CourseService
+from src.services.course_index import get_course_index
+from src.services.workload_forecast import WorkloadForecastService, MAX_FORECAST_WEEKS
+from src.services.grade_engine import GradeService
 from src.api.middleware.auth import verify_firebase_token
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -44,6 +49,49 @@ async def get_courses_last_updated(
 ):
     return await CourseService.get_courses_last_updated(user_id)
 
+@router.get("/workload-forecast", response_model=WorkloadForecast)
+async def get_workload_forecast(
+    weeks: int = Query(4, ge=1, le=MAX_FORECAST_WEEKS),
+    time_zone: Optional[str] = Query(None, description="IANA time zone for day boundaries, defaults to the courses' time zone"),
+    user_id: str = Depends(verify_firebase_token)
+):
+    """Due assignments, open points and estimated effort per day and per course for the next weeks"""
+    index = await get_course_index(user_id)
+    return WorkloadForecastService.forecast(user_id, index, weeks, time_zone)
+
+@router.get("/{course_id}/grades", response_model=GradeReport)
+async def get_course_grades(
+    course_id: int,
+    user_id: str = Depends(verify_firebase_token)
+):
+    """Current grade with a per-group breakdown, computed from the synced gradebook"""
+    index = await get_course_index(user_id)
+    report = GradeService.course_grades(index, course_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="No grading data for this course, try syncing again")
+    return report
+
+@router.post("/{course_id}/grades/what-if", response_model=GradeReport)
+async def get_what_if_grades(
+    course_id: int,
+    request: WhatIfRequest,
+    user_id: str = Depends(verify_firebase_token)
+):
+    """Projected grade with hypothetical scores, and optionally the score needed on one assignment for a target"""
+    if (request.target_percent is None) != (request.solve_for_assignment_id is None):
+        raise HTTPException(status_code=422, detail="target_percent and solve_for_assignment_id must be given together")
+    index = await get_course_index(user_id)
+    report = GradeService.course_grades(
+        index,
+        course_id,
+        hypothetical_scores={item.assignment_id: item.score for item in request.scores},
+        target_percent=request.target_percent,
+        solve_for_assignment_id=request.solve_for_assignment_id
+    )
+    if report is None:
+        raise HTTPException(status_code=404, detail="No grading data for this course, try syncing again")
+    return report
+
 @router.get("/{course_id}/modules/{module_id}/items", response_model=List[ModuleItem])
 async def get_module_items(
     course_id: int,
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from src.api.middleware.auth import verify_admin
+from src.utils import metrics
+from typing import Dict, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics(
+    user_id: str = Depends(verify_admin)
+) -> Dict[str, Any]:
+    """
+    Process-local counters, gauges (e.g. admission queue depth) and timing summaries.
+    Process-wide data, so only users in ADMIN_USER_IDS may read it.
+    """
+    return metrics.snapshot()
@@ -7,6 +7,25 @@ class Settings(BaseSettings):
     ENCRYPTION_KEY: str
     CANVAS_API_BASE_URL: str
     OPENAI_API_KEY: str
+    CHAT_FAST_PATH_ENABLED: bool = True  # Answer simple lookups from cached data without the model
+    CHAT_MODEL: str = "gpt-5-mini"
+    CHAT_COMPLEX_MODEL: str = ""  # Optional stronger model for complex turns, empty to use CHAT_MODEL
+    MODEL_MAX_CONCURRENT_REQUESTS: int = 16  # Chat turns and plan generations running at once
+    MODEL_MAX_QUEUE_DEPTH: int = 64  # Requests allowed to wait for a slot before shedding with 503
+    MODEL_MAX_REQUESTS_PER_USER: int = 2  # Admitted or queued requests per user before 429
+    MODEL_QUEUE_TIMEOUT_SECONDS: float = 20.0
+    PLAN_JOB_WORKERS: int = 4  # Background AI plan generations running at once
+    PLAN_REFRESH_ON_SYNC: bool = True  # Regenerate plans in the background when a sync changes course data
+    PLAN_REFRESH_DEBOUNCE_SECONDS: float = 30.0
+    OPENAI_FAKE_CLIENT: bool = False  # Local stand-in for offline load tests, never in production
+    PLAN_PREGENERATION_HOUR_UTC: int = -1  # Hour of the nightly plan pre-generation run, -1 to disable
+    PLAN_PREGENERATION_ACTIVE_DAYS: int = 7
+    PLAN_PREGENERATION_CONCURRENCY: int = 4
+    PLAN_PREGENERATION_MAX_TOKENS: int = 2_000_000  # Model token budget per run
+    PLAN_PREGENERATION_STATE_PATH: str = "plan_pregeneration_state.json"
+    AUTH_TOKEN_CACHE_SIZE: int = 10_000  # Verified Firebase ID tokens kept until they expire
+    AUTH_CERT_REFRESH_SECONDS: float = 600.0  # How often Firebase public certificates are refetched off the request path
+    ADMIN_USER_IDS: str = ""  # Comma-separated Firebase UIDs allowed to read operational endpoints such as /api/metrics
 
     class Config:
         env_file = ".env"
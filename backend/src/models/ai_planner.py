@@ -0,0 +1,70 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+
+class TodoItem(BaseModel):
+    id: str
+    title: str
+    description: str
+    priority: str  # 'high' | 'medium' | 'low'
+    dueDate: Optional[str] = None
+    estimatedTime: Optional[str] = None
+    course: Optional[str] = None
+    completed: bool = False
+
+
+class DeadlineItem(BaseModel):
+    id: str
+    title: str
+    course: str
+    dueDate: str
+    priority: str  # 'urgent' | 'important' | 'normal'
+    points: Optional[int] = None
+    description: Optional[str] = None
+
+
+class StudyBlock(BaseModel):
+    id: str
+    title: str
+    course: str
+    duration: str
+    topics: List[str]
+    difficulty: str  # 'easy' | 'medium' | 'hard'
+
+
+class InsightCard(BaseModel):
+    id: str
+    type: str  # 'tip' | 'warning' | 'success' | 'info'
+    title: str
+    message: str
+    action: Optional[str] = None
+
+
+class PlanSummary(BaseModel):
+    totalTasks: int
+    highPriorityCount: int
+    upcomingDeadlines: int
+    estimatedStudyTime: str
+
+
+class AIPlannerResponse(BaseModel):
+    todos: List[TodoItem]
+    deadlines: List[DeadlineItem]
+    studyBlocks: List[StudyBlock]
+    insights: List[InsightCard]
+    summary: PlanSummary
+    generated_at: str
+    course_count: int
+    assignment_count: int
+
+
+class PlanJobStatus(BaseModel):
+    job_id: str
+    status: str  # 'queued' | 'running' | 'completed' | 'failed'
+    stage: str
+    progress: int = 0  # 0-100
+    plan: Optional[AIPlannerResponse] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -33,7 +33,8 @@ class ChatRequest(BaseModel):
     message: str
     previous_response_id: Optional[str] = None
     chat_id: Optional[str] = None  # ID of the chat this message belongs to
-    previous_messages: Optional[List[ChatMessage]] = None  # Previous messages when resuming a chat
+    last_message_id: Optional[str] = None  # Last message the client has seen; history is built server-side
+    allow_fast_path: bool = True  # Set to False to always route the message through the model
 
 
 class ChatResponse(BaseModel):
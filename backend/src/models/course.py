@@ -44,6 +44,13 @@ class ModuleItem(BaseModel):
     url: Optional[str] = None
     completion_requirement: Optional[Dict[str, Any]] = None
 
+class CourseGrades(BaseModel):
+    """The user's overall grade in a course, as computed by Canvas"""
+    current_score: Optional[float] = None
+    final_score: Optional[float] = None
+    current_grade: Optional[str] = None
+    final_grade: Optional[str] = None
+
 class Module(BaseModel):
     id: int
     name: str
@@ -72,6 +79,7 @@ class Course(BaseModel):
     time_zone: str = "UTC"
     homepage: Optional[str] = None  # Will be populated separately from front_page endpoint
     colorId: Optional[int] = None  # For consistent course coloring
+    grades: Optional[CourseGrades] = None  # From the enrollment, refreshed at sync
     
 def course_to_dict(course: Course) -> dict:
     return {
@@ -86,5 +94,6 @@ def course_to_dict(course: Course) -> dict:
         "end_at": course.end_at,
         "time_zone": course.time_zone,
         "homepage": course.homepage,
-        "colorId": course.colorId
+        "colorId": course.colorId,
+        "grades": course.grades.dict() if course.grades else None
     }
\ No newline at end of file
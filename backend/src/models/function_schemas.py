@@ -28,9 +28,22 @@ CANVAS_TOOLS = [
                 "days_due": {
                     "type": ["integer", "null"],
                     "description": "Filter assignments to only those due within this many days."
+                },
+                "limit": {
+                    "type": ["integer", "null"],
+                    "description": "Maximum number of assignments to return (default 25). Output is also capped by a size budget."
+                },
+                "offset": {
+                    "type": ["integer", "null"],
+                    "description": "Number of assignments to skip. Pass the previous result's next_offset to get the next page."
+                },
+                "fields": {
+                    "type": ["array", "null"],
+                    "items": {"type": "string"},
+                    "description": "Only return these fields of each assignment (e.g. name, due_at, points_possible). Null returns all non-empty fields."
                 }
             },
-            "required": ["course_id", "days_due"],
+            "required": ["course_id", "days_due", "limit", "offset", "fields"],
             "additionalProperties": False
         },
         "strict": True
@@ -67,9 +80,22 @@ CANVAS_TOOLS = [
                     "type": "integer",
                     "description": "Number of days to look ahead for assignments due",
                     "default": 7
+                },
+                "limit": {
+                    "type": ["integer", "null"],
+                    "description": "Maximum number of assignments to return (default 25). Output is also capped by a size budget."
+                },
+                "offset": {
+                    "type": ["integer", "null"],
+                    "description": "Number of assignments to skip. Pass the previous result's next_offset to get the next page."
+                },
+                "fields": {
+                    "type": ["array", "null"],
+                    "items": {"type": "string"},
+                    "description": "Only return these fields of each assignment (e.g. name, due_at, course_code). Null returns all non-empty fields."
                 }
             },
-            "required": ["days"],
+            "required": ["days", "limit", "offset", "fields"],
             "additionalProperties": False
         },
         "strict": True
@@ -89,9 +115,18 @@ CANVAS_TOOLS = [
                     "type": "integer",
                     "description": "Maximum number of announcements to return",
                     "default": 10
+                },
+                "offset": {
+                    "type": ["integer", "null"],
+                    "description": "Number of announcements to skip. Pass the previous result's next_offset to get the next page."
+                },
+                "fields": {
+                    "type": ["array", "null"],
+                    "items": {"type": "string"},
+                    "description": "Only return these fields of each announcement (e.g. title, posted_at). Null returns all non-empty fields."
                 }
             },
-            "required": ["course_id", "limit"],
+            "required": ["course_id", "limit", "offset", "fields"],
             "additionalProperties": False
         },
         "strict": True
@@ -106,9 +141,22 @@ CANVAS_TOOLS = [
                 "course_id": {
                     "type": "integer",
                     "description": "The ID of the course to get modules from"
+                },
+                "limit": {
+                    "type": ["integer", "null"],
+                    "description": "Maximum number of modules to return (default 10). Output is also capped by a size budget."
+                },
+                "offset": {
+                    "type": ["integer", "null"],
+                    "description": "Number of modules to skip. Pass the previous result's next_offset to get the next page."
+                },
+                "fields": {
+                    "type": ["array", "null"],
+                    "items": {"type": "string"},
+                    "description": "Only return these fields of each module (e.g. name, position; leaving out items skips the item lists). Null returns all non-empty fields."
                 }
             },
-            "required": ["course_id"],
+            "required": ["course_id", "limit", "offset", "fields"],
             "additionalProperties": False
         },
         "strict": True
@@ -134,6 +182,97 @@ CANVAS_TOOLS = [
         },
         "strict": True
     },
+    {
+        "type": "function",
+        "name": "search_course_content",
+        "description": "Full-text search across assignment names and descriptions, announcements, syllabi, and module and module item titles. Returns the best matching snippets with their IDs. Use it to find which assignment, announcement or module mentions a topic instead of paging through whole collections.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search terms, e.g. a topic or keyword"
+                },
+                "course_id": {
+                    "type": ["integer", "null"],
+                    "description": "Restrict the search to one course. Null searches all courses."
+                },
+                "content_types": {
+                    "type": ["array", "null"],
+                    "items": {
+                        "type": "string",
+                        "enum": ["assignment", "announcement", "syllabus", "module", "module_item"]
+                    },
+                    "description": "Only search these kinds of content. Null searches everything."
+                },
+                "limit": {
+                    "type": ["integer", "null"],
+                    "description": "Maximum number of results to return (default 5, max 20)."
+                }
+            },
+            "required": ["query", "course_id", "content_types", "limit"],
+            "additionalProperties": False
+        },
+        "strict": True
+    },
+    {
+        "type": "function",
+        "name": "get_grades",
+        "description": "Get the student's overall grade (current score, final score and letter grade) in each course, or in one course",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "course_id": {
+                    "type": ["integer", "null"],
+                    "description": "The ID of the course. If not provided, returns grades for all courses."
+                }
+            },
+            "required": ["course_id"],
+            "additionalProperties": False
+        },
+        "strict": True
+    },
+    {
+        "type": "function",
+        "name": "calculate_grade",
+        "description": "Calculate the student's current grade in a course from their synced scores, assignment group weights and drop rules, optionally with hypothetical scores (what-if) or the score needed on one assignment to reach a target grade. Answers the whole question in one call.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "course_id": {
+                    "type": "integer",
+                    "description": "The ID of the course"
+                },
+                "hypothetical_scores": {
+                    "type": ["array", "null"],
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "assignment_id": {"type": "integer"},
+                            "score": {
+                                "type": "number",
+                                "description": "Points earned, not a percentage"
+                            }
+                        },
+                        "required": ["assignment_id", "score"],
+                        "additionalProperties": False
+                    },
+                    "description": "Scores to assume for assignments (graded or not). Null uses the actual scores only."
+                },
+                "target_percent": {
+                    "type": ["number", "null"],
+                    "description": "Target course grade in percent, used with solve_for_assignment_id"
+                },
+                "solve_for_assignment_id": {
+                    "type": ["integer", "null"],
+                    "description": "Assignment to solve for: returns the lowest score on it that reaches target_percent"
+                }
+            },
+            "required": ["course_id", "hypothetical_scores", "target_percent", "solve_for_assignment_id"],
+            "additionalProperties": False
+        },
+        "strict": True
+    },
     {
         "type": "function",
         "name": "get_user_info",
@@ -165,12 +304,15 @@ You can help with course-related questions, assignments, deadlines, announcement
 - **get_course_modules**: Get modules for a specific course
 - **get_module_items**: Get items for a specific module in a course
 - **get_user_info**: Get basic user information
+- **search_course_content**: Search course content by topic or keyword and get matching snippets
+- **get_grades**: Get the overall grade in each course
+- **calculate_grade**: Calculate the current grade in a course, what-if grades and the score needed for a target grade
 
 ## Function Usage Guidelines
 
 **For course-specific requests**, always follow this pattern:
-1. Call `get_courses` to get the course list and find the course ID
-2. Look through the course list to find the course matching the user's description
+1. Find the course matching the user's description in the **Course Catalog** at the end of these instructions
+2. Only call `get_courses` if there is no catalog or the course is not listed in it
 3. Call the appropriate function with the specific `course_id`
 4. Provide a well-formatted response based on the retrieved data
 
@@ -183,6 +325,11 @@ You can help with course-related questions, assignments, deadlines, announcement
 - **Course content/modules**: Use `get_course_modules` with `course_id`
 - **Module items**: Use `get_module_items` with `course_id` and `module_id`
 - **User context**: Use `get_user_info`
+- **Finding content by topic** (e.g. "which assignment covers recursion?"): Use `search_course_content`, then `get_assignment` for full details of a hit
+- **Overall grades** (e.g. "how am I doing in Biology?"): Use `get_grades`
+- **Grades and what-if questions** (e.g. "what do I need on the final to get an A?"): Use `calculate_grade` once with `hypothetical_scores`, `target_percent` and `solve_for_assignment_id` as needed; do not compute grades yourself
+
+**Paginated results:** `get_assignments`, `get_upcoming_due_dates`, `get_announcements` and `get_course_modules` return `{"items": [...], "total": N, "next_offset": ...}`. Pass `fields` to fetch only what you need. If `next_offset` is not null and you need more, call again with `offset` set to it.
 
 ## Response Formatting Requirements
 
@@ -227,7 +374,22 @@ You can help with course-related questions, assignments, deadlines, announcement
 - **Stay academic-focused**: Only respond to education, learning, and academic support topics
 - **Be helpful and thorough**: Provide context and insights, not just raw data
 - **Use multiple function calls** when needed to provide comprehensive answers
-- **Always use actual course IDs** from the `get_courses` response when calling other functions
+- **Always use actual course IDs** from the Course Catalog or the `get_courses` response when calling other functions
 
 Remember: Students can see this information in Canvas, but you provide value by organizing, prioritizing, and contextualizing it in a helpful way.
-""" 
\ No newline at end of file
+"""
+
+
+def format_course_catalog(courses: List[Dict[str, Any]]) -> str:
+    """
+    Render the course catalog appended to SYSTEM_MESSAGE_WITH_TOOLS.
+    Sorted by course ID so the instructions stay byte-identical across turns
+    (required for provider-side prompt caching).
+    """
+    if not courses:
+        return ""
+
+    lines = ["", "## Course Catalog", "id | code | name"]
+    for course in sorted(courses, key=lambda c: c.get("id") or 0):
+        lines.append(f"{course.get('id')} | {course.get('code') or ''} | {course.get('name') or ''}")
+    return "\n".join(lines) + "\n"
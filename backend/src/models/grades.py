@@ -0,0 +1,51 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+
+class HypotheticalScore(BaseModel):
+    assignment_id: int
+    score: float = Field(..., ge=0)
+
+
+class WhatIfRequest(BaseModel):
+    scores: List[HypotheticalScore] = []
+    target_percent: Optional[float] = Field(None, ge=0)
+    solve_for_assignment_id: Optional[int] = None
+
+
+class GroupGrade(BaseModel):
+    name: Optional[str] = None
+    weight: Optional[float] = None
+    earned: float
+    possible: float
+    percent: Optional[float] = None
+
+
+class UngradedAssignment(BaseModel):
+    id: int
+    name: Optional[str] = None
+    points_possible: float
+
+
+class RequiredScore(BaseModel):
+    assignment_id: int
+    assignment_name: Optional[str] = None
+    points_possible: float
+    target_percent: float
+    achievable: bool
+    required_score: Optional[float] = None
+    required_percent_of_points: Optional[float] = None
+    best_possible_percent: Optional[float] = None
+
+
+class GradeReport(BaseModel):
+    course_id: int
+    course_name: Optional[str] = None
+    weighted: bool
+    current_percent: Optional[float] = None
+    groups: List[GroupGrade]
+    ungraded_assignments: List[UngradedAssignment]
+    hypothetical_scores: Dict[str, float] = {}
+    projected_percent: Optional[float] = None
+    required: Optional[RequiredScore] = None
+    unknown_assignment_ids: List[int] = []
@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class WorkloadSeries(BaseModel):
+    """Per-day values over the forecast window"""
+    assignments: List[int]
+    open_assignments: List[int]
+    points: List[float]
+    hours: List[float]
+
+
+class CourseWorkload(BaseModel):
+    id: int
+    name: Optional[str] = None
+    code: Optional[str] = None
+    daily: WorkloadSeries
+    total_points: float
+    total_hours: float
+
+
+class WorkloadForecast(BaseModel):
+    start_date: str
+    days: List[str]
+    time_zone: str
+    daily: WorkloadSeries
+    weekly: WorkloadSeries
+    courses: List[CourseWorkload]
+    peak_day: Optional[str] = None
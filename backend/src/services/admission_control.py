@@ -0,0 +1,144 @@
+from src.config.settings import get_settings
+from src.utils import metrics
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Dict, List, Tuple
+import asyncio
+import heapq
+import itertools
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class Priority(IntEnum):
+    """Lower values are admitted first"""
+    CHAT = 0
+    PLANNER = 1
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; routes turn it into 429/503 with Retry-After"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounds concurrent model-backed requests.
+
+    Each user may have at most per_user_limit requests admitted or waiting. Up to
+    max_concurrent requests run at once; the rest wait in a priority queue (chat
+    before planner, FIFO within a priority) of at most max_queue_depth entries.
+    Requests over these limits, or that wait longer than queue_timeout, are rejected.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue_depth: int, per_user_limit: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue_depth = max_queue_depth
+        self.per_user_limit = per_user_limit
+        self.queue_timeout = queue_timeout
+
+        self._running = 0
+        self._per_user: Dict[str, int] = {}
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @asynccontextmanager
+    async def admit(self, user_id: str, priority: Priority = Priority.CHAT):
+        """Hold a slot for the duration of the block, waiting in the queue if needed"""
+        label = priority.name.lower()
+
+        if self._per_user.get(user_id, 0) >= self.per_user_limit:
+            metrics.increment(f"admission.rejected.user_limit.{label}")
+            logger.warning(f"[Admission] User {user_id} already has {self.per_user_limit} requests in flight, rejecting {label}")
+            raise AdmissionRejected(429, "Too many requests in progress, please wait for the current one to finish", retry_after=2)
+
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+        try:
+            start = time.perf_counter()
+            await self._acquire(priority)
+            metrics.observe(f"admission.wait_ms.{label}", (time.perf_counter() - start) * 1000)
+            try:
+                yield
+            finally:
+                self._release()
+        finally:
+            self._per_user[user_id] -= 1
+            if self._per_user[user_id] <= 0:
+                del self._per_user[user_id]
+            self._update_gauges()
+
+    async def _acquire(self, priority: Priority):
+        label = priority.name.lower()
+
+        if self._running < self.max_concurrent and not self._queue:
+            self._running += 1
+            self._update_gauges()
+            return
+
+        if len(self._queue) >= self.max_queue_depth:
+            metrics.increment(f"admission.rejected.queue_full.{label}")
+            logger.warning(f"[Admission] Queue full ({len(self._queue)} waiting), rejecting {label} request")
+            raise AdmissionRejected(503, "Server is busy, please try again shortly", retry_after=self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (int(priority), next(self._sequence), waiter))
+        self._update_gauges()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            metrics.increment(f"admission.rejected.timeout.{label}")
+            raise AdmissionRejected(503, "Server is busy, please try again shortly", retry_after=self._retry_after())
+        except asyncio.CancelledError:
+            # Client disconnected while queued
+            self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter: asyncio.Future):
+        """Leave the queue; a slot handed over in the meantime is passed on"""
+        if waiter.done():
+            self._release()
+            return
+
+        waiter.cancel()
+        self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+        heapq.heapify(self._queue)
+        self._update_gauges()
+
+    def _release(self):
+        """Hand the slot to the highest-priority live waiter, or free it"""
+        if self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            waiter.set_result(None)
+            self._update_gauges()
+            return
+
+        self._running -= 1
+        self._update_gauges()
+
+    def _retry_after(self) -> int:
+        return max(1, min(30, len(self._queue) // max(1, self.max_concurrent) + 1))
+
+    def _update_gauges(self):
+        metrics.set_gauge("admission.in_flight", self._running)
+        metrics.set_gauge("admission.queue_depth", len(self._queue))
+        metrics.set_gauge("admission.users_in_flight", len(self._per_user))
+
+
+# Shared by chat and planner so they compete for the same OpenAI capacity
+admission_controller = AdmissionController(
+    max_concurrent=settings.MODEL_MAX_CONCURRENT_REQUESTS,
+    max_queue_depth=settings.MODEL_MAX_QUEUE_DEPTH,
+    per_user_limit=settings.MODEL_MAX_REQUESTS_PER_USER,
+    queue_timeout=settings.MODEL_QUEUE_TIMEOUT_SECONDS
+)
@@ -1,5 +1,8 @@
 from src.config.firebase import db
+from src.services.course_service import CourseService, should_refresh_courses
+from src.services.plan_engine import CROSS_COURSE_FRAGMENT
 from google.cloud import firestore
+import asyncio
 import logging
 import hashlib
 import json
@@ -36,47 +39,95 @@ def should_refresh_ai_plan(last_updated: Optional[datetime], course_data_hash: s
     logger.info(f"Hours elapsed since last update: {hours_elapsed:.1f}h, refresh needed: {should_refresh}")
     return should_refresh
 
-def create_course_data_hash(courses: list) -> str:
+def create_course_hash(course: Dict[str, Any]) -> str:
     """
-    Create a hash of course data to detect changes.
-    Only includes relevant fields that would affect AI planning.
+    Hash of one course's plan-relevant data, used to detect which courses changed.
     """
-    # Extract only the fields that matter for AI planning
-    plan_relevant_data = []
+    course_summary = {
+        'id': course.get('id'),
+        'name': course.get('name'),
+        'assignments': []
+    }
     
-    for course in courses:
-        course_summary = {
-            'id': course.get('id'),
-            'name': course.get('name'),
-            'assignments': []
+    # Include assignment data that affects planning
+    for assignment in course.get('assignments', []):
+        assignment_summary = {
+            'id': assignment.get('id'),
+            'name': assignment.get('name'),
+            'due_at': assignment.get('due_at'),
+            'points_possible': assignment.get('points_possible'),
+            'has_submitted_submissions': assignment.get('has_submitted_submissions')
         }
-        
-        # Include assignment data that affects planning
-        for assignment in course.get('assignments', []):
-            assignment_summary = {
-                'id': assignment.get('id'),
-                'name': assignment.get('name'),
-                'due_at': assignment.get('due_at'),
-                'points_possible': assignment.get('points_possible'),
-                'has_submitted_submissions': assignment.get('has_submitted_submissions')
-            }
-            course_summary['assignments'].append(assignment_summary)
-        
-        # Include announcements count
-        course_summary['announcements_count'] = len(course.get('announcements', []))
-        plan_relevant_data.append(course_summary)
+        course_summary['assignments'].append(assignment_summary)
+    
+    # Include announcements count
+    course_summary['announcements_count'] = len(course.get('announcements', []))
     
-    # Create hash from sorted JSON representation
-    data_json = json.dumps(plan_relevant_data, sort_keys=True, default=str)
+    data_json = json.dumps(course_summary, sort_keys=True, default=str)
     return hashlib.sha256(data_json.encode()).hexdigest()
 
+def create_course_hashes(courses: list) -> Dict[str, str]:
+    """Per-course hashes keyed by course ID (as a string, for Firestore map keys)"""
+    return {str(course.get('id')): create_course_hash(course) for course in courses}
+
+def create_course_data_hash(courses: list, course_hashes: Optional[Dict[str, str]] = None) -> str:
+    """
+    Create a hash of course data to detect changes.
+    Combines the per-course hashes, so it changes whenever any course does.
+    """
+    course_hashes = course_hashes or create_course_hashes(courses)
+    combined = json.dumps(sorted(course_hashes.items()))
+    return hashlib.sha256(combined.encode()).hexdigest()
+
 class AIPlannerService:
     """Service for AI Planner caching and persistence"""
     
     @staticmethod
-    async def get_cached_ai_plan(user_id: str, courses: list) -> Optional[Dict[str, Any]]:
+    async def get_current_plan_document(user_id: str) -> Optional[Dict[str, Any]]:
         """
-        Get cached AI plan if it's still valid (not expired and course data unchanged)
+        Cached plan document if it matches the current course snapshot, without
+        loading any courses: one projected snapshot read and one plan read, compared
+        by the course data hash stored at sync time.
+        
+        Returns None when the plan is missing, stale or expired, or when the snapshot
+        itself is due for a Canvas sync (the full path handles both).
+        """
+        try:
+            snapshot_meta, plan_doc = await asyncio.gather(
+                CourseService.get_snapshot_meta(user_id),
+                asyncio.to_thread(db.collection('aiPlans').document(user_id).get)
+            )
+            if not snapshot_meta or not plan_doc.exists:
+                return None
+            
+            snapshot_hash = snapshot_meta.get('courseDataHash')
+            if not snapshot_hash or should_refresh_courses(snapshot_meta.get('lastUpdated')):
+                return None
+            
+            cached_data = plan_doc.to_dict()
+            last_updated = cached_data.get('lastUpdated')
+            if not cached_data.get('plan') or not last_updated:
+                return None
+            
+            if should_refresh_ai_plan(last_updated, snapshot_hash, cached_data.get('courseDataHash') or ''):
+                return None
+            
+            logger.info("🗄️ [AI Plan Cache] Plan matches the current course snapshot")
+            return cached_data
+            
+        except Exception as e:
+            logger.error(f"🗄️ [AI Plan Cache] Error checking current plan: {str(e)}")
+            return None
+    
+    @staticmethod
+    async def get_plan_cache_state(user_id: str, courses: list) -> Optional[Dict[str, Any]]:
+        """
+        Compare the cached plan with the current course data.
+        
+        Returns None when there is no usable cached plan, otherwise a dict with the
+        cached plan, its per-course fragments, which courses changed or were removed
+        since it was generated, whether it has expired, and whether it is fresh
+        (usable as-is).
         """
         try:
             logger.info(f"🗄️ [AI Plan Cache] Checking cached plan for user: {user_id}")
@@ -106,38 +157,74 @@ class AIPlannerService:
             else:
                 last_updated_dt = last_updated
             
-            # Create hash of current course data
-            current_hash = create_course_data_hash(courses)
+            # Create hashes of current course data
+            course_hashes = create_course_hashes(courses)
+            current_hash = create_course_data_hash(courses, course_hashes)
+            stored_course_hashes = cached_data.get('courseHashes') or {}
+            
+            changed = [course_id for course_id, course_hash in course_hashes.items()
+                       if stored_course_hashes.get(course_id) != course_hash]
+            removed = [course_id for course_id in stored_course_hashes if course_id not in course_hashes]
             
             # Check if refresh is needed
-            if should_refresh_ai_plan(last_updated_dt, current_hash, stored_hash):
-                logger.info("🗄️ [AI Plan Cache] Cached plan is stale, refresh needed")
-                return None
+            fresh = not should_refresh_ai_plan(last_updated_dt, current_hash, stored_hash)
+            expired = (datetime.now(timezone.utc) - last_updated_dt).total_seconds() >= 24 * 3600
             
-            logger.info("🗄️ [AI Plan Cache] Using valid cached plan")
-            logger.debug(f"🗄️ [AI Plan Cache] Plan has {len(cached_plan.get('todos', []))} todos, "
-                        f"{len(cached_plan.get('deadlines', []))} deadlines")
+            if fresh:
+                logger.info("🗄️ [AI Plan Cache] Using valid cached plan")
+            else:
+                logger.info(f"🗄️ [AI Plan Cache] Cached plan is stale ({len(changed)} courses changed, "
+                            f"{len(removed)} removed, expired: {expired})")
             
-            return cached_plan
+            return {
+                'plan': cached_plan,
+                'fragments': cached_data.get('fragments') or {},
+                'changed_course_ids': changed,
+                'removed_course_ids': removed,
+                'expired': expired,
+                'fresh': fresh
+            }
             
         except Exception as e:
             logger.error(f"🗄️ [AI Plan Cache] Error retrieving cached plan: {str(e)}")
             return None
     
     @staticmethod
-    async def save_ai_plan(user_id: str, plan: Dict[str, Any], courses: list):
+    async def get_cached_ai_plan(user_id: str, courses: list) -> Optional[Dict[str, Any]]:
         """
-        Save AI plan to Firestore with metadata for cache invalidation
+        Get cached AI plan if it's still valid (not expired and course data unchanged)
+        """
+        state = await AIPlannerService.get_plan_cache_state(user_id, courses)
+        if not state or not state['fresh']:
+            return None
+        
+        logger.debug(f"🗄️ [AI Plan Cache] Plan has {len(state['plan'].get('todos', []))} todos, "
+                    f"{len(state['plan'].get('deadlines', []))} deadlines")
+        return state['plan']
+    
+    @staticmethod
+    async def save_ai_plan(user_id: str, plan: Dict[str, Any], courses: list,
+                           fragments: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Save AI plan to Firestore with metadata for cache invalidation.
+        Per-course fragments let later changes regenerate only the affected courses.
         """
         try:
             logger.info(f"🗄️ [AI Plan Cache] Saving AI plan for user: {user_id}")
             
-            # Create course data hash for future comparison
-            course_data_hash = create_course_data_hash(courses)
+            # Create course data hashes for future comparison
+            course_hashes = create_course_hashes(courses)
+            course_data_hash = create_course_data_hash(courses, course_hashes)
+            
+            # Drop fragments of courses the user is no longer enrolled in
+            fragments = {key: fragment for key, fragment in (fragments or {}).items()
+                         if key in course_hashes or key == CROSS_COURSE_FRAGMENT}
             
             # Prepare document data
             doc_data = {
                 'plan': plan,
+                'fragments': fragments,
+                'courseHashes': course_hashes,
                 'courseDataHash': course_data_hash,
                 'lastUpdated': firestore.SERVER_TIMESTAMP,
                 'courseCount': len(courses),
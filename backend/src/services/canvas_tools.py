@@ -1,14 +1,80 @@
 from typing import List, Dict, Any, Optional
 import json
-from datetime import datetime, timedelta, timezone
 from src.services.firestore_service import FirestoreService
 from src.services.course_service import CourseService
+from src.services.course_index import get_course_index
+from src.services.course_search import CourseSearchService, CONTENT_TYPES
+from src.services.grade_engine import GradeService
 from src.services.user_service import UserService
+import time
 import logging
 
 # Get logger
 logger = logging.getLogger(__name__)
 
+# Output budget for list tools (~2k tokens at 4 characters per token)
+MAX_TOOL_OUTPUT_CHARS = 8000
+MAX_FIELD_CHARS = 1500  # Long HTML bodies are clipped, get_assignment returns the full text
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+DEFAULT_SEARCH_RESULTS = 5
+MAX_SEARCH_RESULTS = 20
+
+# Fields that repeat information the model already has
+MODULE_DROP_FIELDS = ('items_url', 'workflow_state')
+MODULE_ITEM_DROP_FIELDS = ('module_id', 'url')
+COURSE_FIELDS = ('course_id', 'course_name', 'course_code')
+# Epoch-second copies of the ISO dates (due_at_ts, posted_at_ts, ...) are for sorting, not for the model
+EPOCH_FIELD_SUFFIX = '_ts'
+
+
+def _compact_record(record: Dict[str, Any], fields: Optional[List[str]] = None, drop: tuple = ()) -> Dict[str, Any]:
+    """Drop null/empty and redundant fields, keep only the requested fields, clip long strings"""
+    compact = {}
+    for key, value in record.items():
+        if value is None or value == [] or value == "" or key in drop or key.endswith(EPOCH_FIELD_SUFFIX):
+            continue
+        if fields and key not in fields and key != 'id':
+            continue
+        if isinstance(value, str) and len(value) > MAX_FIELD_CHARS:
+            value = value[:MAX_FIELD_CHARS] + "…"
+        compact[key] = value
+    return compact
+
+
+def _paginate(items: List[Dict[str, Any]], limit: Optional[int], offset: Optional[int],
+              fields: Optional[List[str]] = None, drop: tuple = (),
+              default_limit: int = DEFAULT_PAGE_SIZE, extra: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Serialize one page of a tool result within MAX_TOOL_OUTPUT_CHARS.
+
+    Returns {"items", "total", "offset", "next_offset"}; next_offset is the
+    continuation cursor, null when there is nothing left.
+    """
+    offset = max(offset or 0, 0)
+    limit = default_limit if not limit or limit <= 0 else min(limit, MAX_PAGE_SIZE)
+
+    page = []
+    size = 0
+    for record in items[offset:offset + limit]:
+        compact = _compact_record(record, fields, drop)
+        encoded_size = len(json.dumps(compact, separators=(',', ':'), default=str)) + 1
+        # Always return at least one item so the cursor advances
+        if page and size + encoded_size > MAX_TOOL_OUTPUT_CHARS:
+            break
+        page.append(compact)
+        size += encoded_size
+
+    end = offset + len(page)
+    result = dict(extra or {})
+    result.update({
+        "items": page,
+        "total": len(items),
+        "offset": offset,
+        "next_offset": end if end < len(items) else None
+    })
+    return json.dumps(result, separators=(',', ':'), default=str)
+
 class CanvasTools:
     """Tools for accessing Canvas data from the chatbot"""
 
@@ -16,26 +82,18 @@ class CanvasTools:
     async def get_courses(user_id: str) -> str:
         """Get a list of the user's Canvas courses"""
         try:
-            # Get courses from Firebase (already fetched from Canvas)
-            courses = await CourseService._get_cached_courses(user_id)
-            
-            # Format the courses for display
-            course_list = []
-            for course in courses:
-                course_list.append({
-                    "id": course["id"],
-                    "name": course["name"],
-                    "code": course["code"],
-                })
-            
-            return json.dumps(course_list)
+            # Courses come from the indexed snapshot (already fetched from Canvas)
+            index = await get_course_index(user_id)
+            return json.dumps(index.course_list)
         except Exception as e:
             logger.error(f"Error in get_courses: {str(e)}", exc_info=True)
             return json.dumps({"error": f"Failed to retrieve courses: {str(e)}"})
     
 
     @staticmethod
-    async def get_assignments(user_id: str, course_id: Optional[int] = None, days_due: Optional[int] = None) -> str:
+    async def get_assignments(user_id: str, course_id: Optional[int] = None, days_due: Optional[int] = None,
+                              limit: Optional[int] = None, offset: Optional[int] = None,
+                              fields: Optional[List[str]] = None) -> str:
         """
         Get assignments for a specific course or all courses
         
@@ -43,101 +101,61 @@ class CanvasTools:
             user_id: User ID
             course_id: Optional course ID to filter assignments
             days_due: Optional number of days to filter assignments due within
+            limit: Optional page size
+            offset: Optional number of assignments to skip
+            fields: Optional list of fields to return per assignment
         """
         try:
-            # Get courses from Firebase
-            courses = await CourseService._get_cached_courses(user_id)
+            index = await get_course_index(user_id)
             
-            assignments_list = []
-            now = datetime.now(timezone.utc)  # Use timezone-aware datetime
+            # The days_due window runs from now to the end of the days_due-th day
+            start = end = None
+            if days_due is not None:
+                start = time.time()
+                end = start + (days_due + 1) * 86400
             
-            for course in courses:
-                # Filter by course_id if provided
-                if course_id is not None and course["id"] != course_id:
-                    continue
-                
-                for assignment in course["assignments"]:
-                    # Create a minimal assignment object with only essential fields
-                    assignment_summary = {
-                        "id": assignment.get("id"),
-                        "name": assignment.get("name"),
-                        "due_at": assignment.get("due_at"),
-                        "points_possible": assignment.get("points_possible"),
-                        "grade": assignment.get("grade"),
-                        "course_id": assignment.get("course_id"),
-                        "course_name": course["name"],
-                        "course_code": course["code"],
-                        "published": assignment.get("published"),
-                        "submission_types": assignment.get("submission_types"),
-                        "html_url": assignment.get("html_url"),
-                        "has_submitted_submissions": assignment.get("has_submitted_submissions")
-                    }
-                    
-                    # Filter by due date if days_due is provided
-                    if days_due is not None and assignment.get("due_at"):
-                        try:
-                            # Parse the due date, ensuring it's timezone-aware
-                            due_date_str = assignment["due_at"]
-                            if due_date_str.endswith('Z'):
-                                # Convert 'Z' format to +00:00 format
-                                due_date_str = due_date_str.replace('Z', '+00:00')
-                            
-                            due_date = datetime.fromisoformat(due_date_str)
-                            
-                            # Ensure the datetime is timezone-aware
-                            if due_date.tzinfo is None:
-                                logger.warning(f"Assignment due date is not timezone-aware: {due_date_str}")
-                                due_date = due_date.replace(tzinfo=timezone.utc)
-                            
-                            # Calculate days until due
-                            days_until_due = (due_date - now).days
-                            
-                            if days_until_due < 0 or days_until_due > days_due:
-                                continue
-                        except Exception as e:
-                            logger.error(f"Error parsing due date '{assignment.get('due_at')}': {str(e)}")
-                            # Include the assignment anyway if we can't parse the date
-                    
-                    assignments_list.append(assignment_summary)
+            # Summaries are pre-sorted by due date in the index
+            assignments_list = index.assignments(course_id=course_id, start=start, end=end)
+            logger.info(f"Found {len(assignments_list)} assignments matching criteria")
             
-            # Sort assignments by due date
-            try:
-                assignments_list.sort(
-                    key=lambda a: datetime.fromisoformat(
-                        a["due_at"].replace('Z', '+00:00') if a.get("due_at") and a["due_at"].endswith('Z')
-                        else a.get("due_at", "9999-12-31T23:59:59+00:00")
-                    ) if a.get("due_at") else datetime.max.replace(tzinfo=timezone.utc)
-                )
-                
-            except Exception as e:
-                logger.error(f"Error sorting assignments: {str(e)}")
-                # If sorting fails, return unsorted list
+            # Course details are stated once instead of on every assignment
+            drop = ()
+            extra = None
+            if course_id is not None:
+                course = index.get_course(course_id)
+                if course:
+                    drop = COURSE_FIELDS
+                    extra = {"course": {"id": course_id, "name": course.get("name"), "code": course.get("code")}}
             
-            logger.info(f"Found {len(assignments_list)} assignments matching criteria")
-            return json.dumps(assignments_list)
+            return _paginate(assignments_list, limit, offset, fields, drop, extra=extra)
         except Exception as e:
             logger.error(f"Error in get_assignments: {str(e)}", exc_info=True)
             return json.dumps({"error": f"Failed to retrieve assignments: {str(e)}"})
 
     @staticmethod
-    async def get_upcoming_due_dates(user_id: str, days: int = 7) -> str:
+    async def get_upcoming_due_dates(user_id: str, days: int = 7, limit: Optional[int] = None,
+                                     offset: Optional[int] = None, fields: Optional[List[str]] = None) -> str:
         """
         Get assignments due in the next specified number of days
         
         Args:
             user_id: User ID
             days: Number of days to look ahead (default: 7)
+            limit: Optional page size
+            offset: Optional number of assignments to skip
+            fields: Optional list of fields to return per assignment
         """
         try:
             logger.info(f"Looking for assignments due in the next {days} days")
             # Reuse the get_assignments function with days_due filter
-            return await CanvasTools.get_assignments(user_id, days_due=days)
+            return await CanvasTools.get_assignments(user_id, days_due=days, limit=limit, offset=offset, fields=fields)
         except Exception as e:
             logger.error(f"Error in get_upcoming_due_dates: {str(e)}", exc_info=True)
             return json.dumps({"error": f"Failed to retrieve upcoming due dates: {str(e)}"})
 
     @staticmethod
-    async def get_announcements(user_id: str, course_id: Optional[int] = None, limit: int = 10) -> str:
+    async def get_announcements(user_id: str, course_id: Optional[int] = None, limit: int = 10,
+                                offset: Optional[int] = None, fields: Optional[List[str]] = None) -> str:
         """
         Get recent announcements from courses
         
@@ -145,45 +163,53 @@ class CanvasTools:
             user_id: User ID
             course_id: Optional course ID to filter announcements
             limit: Maximum number of announcements to return (default: 10)
+            offset: Optional number of announcements to skip
+            fields: Optional list of fields to return per announcement
         """
         try:
-            # Get courses from Firebase
-            courses = await CourseService._get_cached_courses(user_id)
+            index = await get_course_index(user_id)
             
-            announcements_list = []
+            # Newest first, already sorted by posted_at in the index
+            announcements_list = index.announcements(course_id=course_id, limit=None)
+            drop = ('course_name', 'course_code') if course_id is not None else ()
             
-            for course in courses:
-                # Filter by course_id if provided
-                if course_id is not None and course["id"] != course_id:
-                    continue
-                
-                for announcement in course.get("announcements", []):
-                    # Add course information to each announcement
-                    announcement_with_course = announcement.copy()
-                    announcement_with_course["course_name"] = course["name"]
-                    announcement_with_course["course_code"] = course["code"]
-                    announcements_list.append(announcement_with_course)
+            return _paginate(announcements_list, limit, offset, fields, drop, default_limit=10)
+        except Exception as e:
+            logger.error(f"Error in get_announcements: {str(e)}", exc_info=True)
+            return json.dumps({"error": f"Failed to retrieve announcements: {str(e)}"})
+
+    @staticmethod
+    async def search_course_content(user_id: str, query: str, course_id: Optional[int] = None,
+                                    content_types: Optional[List[str]] = None, limit: Optional[int] = None) -> str:
+        """
+        Full-text search over assignments, announcements, syllabi and module titles
+        
+        Args:
+            user_id: User ID
+            query: Search terms
+            course_id: Optional course ID to restrict the search
+            content_types: Optional subset of CONTENT_TYPES to search
+            limit: Maximum number of results (default: 5)
+        """
+        try:
+            index = await get_course_index(user_id)
+            search_index = await CourseSearchService.get_index(user_id, index.courses, index.version)
             
-            # Sort announcements by posted_at date (newest first)
-            try:
-                announcements_list.sort(
-                    key=lambda a: datetime.fromisoformat(
-                        a["posted_at"].replace('Z', '+00:00') if a["posted_at"].endswith('Z') 
-                        else a["posted_at"]
-                    ),
-                    reverse=True
-                )
-            except Exception as e:
-                logger.error(f"Error sorting announcements: {str(e)}")
-                # If sorting fails, return unsorted list
+            limit = max(1, min(limit or DEFAULT_SEARCH_RESULTS, MAX_SEARCH_RESULTS))
+            content_types = [t for t in content_types if t in CONTENT_TYPES] if content_types else None
+            results = search_index.search(query, limit=limit, course_id=course_id, content_types=content_types)
             
-            # Limit the number of announcements
-            announcements_list = announcements_list[:limit]
+            for result in results:
+                course = index.get_course(result.get("course_id")) or {}
+                result["course_code"] = course.get("code")
             
-            return json.dumps(announcements_list)
+            return json.dumps({
+                "query": query,
+                "results": [_compact_record(result) for result in results]
+            })
         except Exception as e:
-            logger.error(f"Error in get_announcements: {str(e)}", exc_info=True)
-            return json.dumps({"error": f"Failed to retrieve announcements: {str(e)}"})
+            logger.error(f"Error in search_course_content: {str(e)}", exc_info=True)
+            return json.dumps({"error": f"Failed to search course content: {str(e)}"})
 
     @staticmethod
     async def get_assignment(user_id: str, assignment_id: int, course_id: Optional[int] = None) -> str:
@@ -196,52 +222,54 @@ class CanvasTools:
             course_id: Optional course ID to narrow the search
         """
         try:
-            # Get courses from Firebase
-            courses = await CourseService._get_cached_courses(user_id)
+            index = await get_course_index(user_id)
             
-            # Search for the assignment
-            for course in courses:
-                # Filter by course_id if provided
-                if course_id is not None and course["id"] != course_id:
-                    continue
-                
-                for assignment in course["assignments"]:
-                    if assignment.get("id") == assignment_id:
-                        # Add course information to the assignment
-                        assignment_with_course = assignment.copy()
-                        assignment_with_course["course_name"] = course["name"]
-                        assignment_with_course["course_code"] = course["code"]
-                        
-                        return json.dumps(assignment_with_course)
+            entry = index.get_assignment(assignment_id, course_id)
+            if entry is None:
+                return json.dumps({"error": f"Assignment with ID {assignment_id} not found"})
+            
+            # Add course information to the assignment
+            assignment, course = entry
+            assignment_with_course = {key: value for key, value in assignment.items()
+                                      if not key.endswith(EPOCH_FIELD_SUFFIX)}
+            assignment_with_course["course_name"] = course["name"]
+            assignment_with_course["course_code"] = course["code"]
             
-            # Assignment not found
-            return json.dumps({"error": f"Assignment with ID {assignment_id} not found"})
+            return json.dumps(assignment_with_course)
         except Exception as e:
             logger.error(f"Error in get_assignment: {str(e)}", exc_info=True)
             return json.dumps({"error": f"Failed to retrieve assignment: {str(e)}"})
 
     @staticmethod
-    async def get_course_modules(user_id: str, course_id: int) -> str:
+    async def get_course_modules(user_id: str, course_id: int, limit: Optional[int] = None,
+                                 offset: Optional[int] = None, fields: Optional[List[str]] = None) -> str:
         """
         Get modules for a specific course
         
         Args:
             user_id: User ID
             course_id: Course ID
+            limit: Optional page size
+            offset: Optional number of modules to skip
+            fields: Optional list of fields to return per module
         """
         try:
-            # Get courses from Firebase
-            courses = await CourseService._get_cached_courses(user_id)
+            index = await get_course_index(user_id)
             
             # Find the specified course
-            course = next((c for c in courses if c["id"] == course_id), None)
+            course = index.get_course(course_id)
             if not course:
                 return json.dumps({"error": f"Course with ID {course_id} not found"})
             
-            # Extract modules
-            modules = course.get("modules", [])
+            # Extract modules, without the per-item fields that repeat the module
+            modules = []
+            for module in course.get("modules", []):
+                module = dict(module)
+                if module.get("items"):
+                    module["items"] = [_compact_record(item, drop=MODULE_ITEM_DROP_FIELDS) for item in module["items"]]
+                modules.append(module)
             
-            return json.dumps(modules)
+            return _paginate(modules, limit, offset, fields, MODULE_DROP_FIELDS, default_limit=10)
         except Exception as e:
             logger.error(f"Error in get_course_modules: {str(e)}", exc_info=True)
             return json.dumps({"error": f"Failed to retrieve course modules: {str(e)}"})
@@ -272,6 +300,70 @@ class CanvasTools:
             logger.error(f"Error in get_module_items: {str(e)}", exc_info=True)
             return json.dumps({"error": f"Failed to retrieve module items: {str(e)}"})
 
+    @staticmethod
+    async def get_grades(user_id: str, course_id: Optional[int] = None) -> str:
+        """
+        Get the user's overall grade in each course, as synced from their enrollments
+        
+        Args:
+            user_id: User ID
+            course_id: Optional course ID to get a single course's grade
+        """
+        try:
+            index = await get_course_index(user_id)
+            
+            if course_id is not None:
+                course = index.get_course(course_id)
+                if not course:
+                    return json.dumps({"error": f"Course with ID {course_id} not found"})
+                courses = [course]
+            else:
+                courses = index.courses
+            
+            grades = []
+            for course in courses:
+                entry = {"course_id": course.get("id"), "course_name": course.get("name"), "course_code": course.get("code")}
+                entry.update(course.get("grades") or {})
+                entry = _compact_record(entry)
+                if "current_score" not in entry:
+                    entry["grade_available"] = False  # Not a student enrollment, or the course hides totals
+                grades.append(entry)
+            
+            return json.dumps(grades)
+        except Exception as e:
+            logger.error(f"Error in get_grades: {str(e)}", exc_info=True)
+            return json.dumps({"error": f"Failed to retrieve grades: {str(e)}"})
+
+    @staticmethod
+    async def calculate_grade(user_id: str, course_id: int, hypothetical_scores: Optional[List[Dict[str, Any]]] = None,
+                              target_percent: Optional[float] = None,
+                              solve_for_assignment_id: Optional[int] = None) -> str:
+        """
+        Calculate current and what-if grades for a course from the synced gradebook
+        
+        Args:
+            user_id: User ID
+            course_id: Course ID
+            hypothetical_scores: Optional list of {assignment_id, score} to assume
+            target_percent: Optional target course percentage
+            solve_for_assignment_id: Optional assignment to solve the required score for
+        """
+        if (target_percent is None) != (solve_for_assignment_id is None):
+            return json.dumps({"error": "target_percent and solve_for_assignment_id must be given together"})
+        
+        try:
+            index = await get_course_index(user_id)
+            
+            scores = {item["assignment_id"]: item["score"] for item in hypothetical_scores or []}
+            report = GradeService.course_grades(index, course_id, scores, target_percent, solve_for_assignment_id)
+            if report is None:
+                return json.dumps({"error": f"No grading data for course with ID {course_id}"})
+            
+            return json.dumps(report)
+        except Exception as e:
+            logger.error(f"Error in calculate_grade: {str(e)}", exc_info=True)
+            return json.dumps({"error": f"Failed to calculate grade: {str(e)}"})
+
     @staticmethod
     async def get_user_info(user_id: str) -> str:
         """Get basic information about the user"""
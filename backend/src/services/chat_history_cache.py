@@ -0,0 +1,98 @@
+from src.models.chat import ChatMessage
+from src.utils import metrics
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Text messages kept per chat: the verbatim window plus turns not yet summarized
+HISTORY_WINDOW_SIZE = 40
+MAX_CACHED_CHATS = 500
+
+
+def to_window_entry(message: Union[ChatMessage, Dict[str, Any]]) -> Dict[str, Any]:
+    """Reduce a stored or in-memory message to what the model context needs"""
+    if isinstance(message, ChatMessage):
+        message = message.model_dump()
+
+    timestamp = message.get('timestamp')
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+
+    role = message.get('role')
+    return {
+        "message_id": message.get('message_id'),
+        "role": getattr(role, 'value', role),
+        "content": message.get('content', ''),
+        "timestamp": timestamp or ""
+    }
+
+
+def is_context_message(message: Dict[str, Any]) -> bool:
+    """Only user/assistant text messages are replayed to the model"""
+    message_type = message.get('type') or 'text'
+    role = message.get('role')
+    return getattr(message_type, 'value', message_type) == 'text' and getattr(role, 'value', role) in ('user', 'assistant')
+
+
+class RecentMessageWindow:
+    """The last HISTORY_WINDOW_SIZE text messages of one chat, oldest first"""
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self._entries = deque(entries[-HISTORY_WINDOW_SIZE:], maxlen=HISTORY_WINDOW_SIZE)
+
+    def contains(self, message_id: str) -> bool:
+        return any(entry["message_id"] == message_id for entry in self._entries)
+
+    def append(self, entry: Dict[str, Any]):
+        if entry["message_id"] and self.contains(entry["message_id"]):
+            return
+        self._entries.append(entry)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        return list(self._entries)
+
+
+# chat_id -> window, least recently used first
+_windows: "OrderedDict[str, RecentMessageWindow]" = OrderedDict()
+
+
+def get_recent_window(chat_id: str, last_message_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Cached recent messages for a chat, None on a miss.
+
+    A window that doesn't contain the client's last-seen message is stale (another
+    worker served a turn since) and counts as a miss.
+    """
+    window = _windows.get(chat_id)
+    if window is None or (last_message_id and not window.contains(last_message_id)):
+        metrics.increment("chat.history_window.misses")
+        return None
+
+    _windows.move_to_end(chat_id)
+    metrics.increment("chat.history_window.hits")
+    return window.entries()
+
+
+def store_recent_window(chat_id: str, entries: List[Dict[str, Any]]):
+    """Cache the recent messages loaded for a chat"""
+    _windows[chat_id] = RecentMessageWindow(entries)
+    _windows.move_to_end(chat_id)
+    while len(_windows) > MAX_CACHED_CHATS:
+        _windows.popitem(last=False)
+
+
+def append_to_window(chat_id: str, *messages: Union[ChatMessage, Dict[str, Any]]):
+    """Add saved messages to a cached window; chats that aren't cached are left alone"""
+    window = _windows.get(chat_id)
+    if window is None:
+        return
+    for message in messages:
+        window.append(to_window_entry(message))
+
+
+def drop_recent_window(chat_id: str):
+    """Forget a chat's window, e.g. after it was deleted or a turn failed midway"""
+    _windows.pop(chat_id, None)
@@ -0,0 +1,185 @@
+from src.services.course_index import CourseIndex
+from src.utils.timestamps import record_ts
+from datetime import datetime, timedelta, timezone, tzinfo, date
+from zoneinfo import ZoneInfo
+from typing import Dict, Any, Optional, Tuple
+import html
+import re
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Longer messages are real questions, always sent to the model
+MAX_FAST_PATH_CHARS = 80
+
+# Words allowed around each intent; any other word sends the message to the model
+COMMON_WORDS = {
+    "what", "whats", "what's", "which", "is", "are", "do", "i", "have", "my", "me", "show", "list",
+    "get", "give", "tell", "about", "all", "the", "any", "anything", "please", "can", "you", "of",
+    "hey", "hi", "so", "far", "s"
+}
+DUE_WORDS = COMMON_WORDS | {
+    "due", "deadline", "deadlines", "upcoming", "coming", "up", "assignments", "assignment",
+    "homework", "work", "this", "week", "today", "tomorrow", "next", "in", "days", "day", "for", "soon"
+}
+COURSE_WORDS = COMMON_WORDS | {"courses", "classes", "course", "class", "enrolled", "in", "taking", "current", "this", "semester", "term"}
+ANNOUNCEMENT_WORDS = COMMON_WORDS | {"latest", "recent", "new", "announcements", "announcement", "news", "updates", "from", "courses", "classes"}
+
+MAX_ANNOUNCEMENTS = 5
+ANNOUNCEMENT_PREVIEW_CHARS = 200
+
+
+def _words(message: str) -> list:
+    return re.findall(r"[a-z0-9']+", message.lower().replace("\u2019", "'"))
+
+
+def match_intent(message: str) -> Optional[Dict[str, Any]]:
+    """
+    Recognize simple lookups the cached snapshot can answer without the model.
+    Returns {"intent": ..., **params} or None.
+    """
+    if not message or len(message) > MAX_FAST_PATH_CHARS:
+        return None
+
+    words = _words(message)
+    if not words:
+        return None
+    vocabulary = set(w for w in words if not w.isdigit())
+
+    if vocabulary & {"due", "deadline", "deadlines", "upcoming"} and vocabulary <= DUE_WORDS:
+        text = " ".join(words)
+        days_match = re.search(r"next (\d+) days?", text) or re.search(r"in (\d+) days?", text)
+        if days_match:
+            return {"intent": "upcoming_due", "window": "days", "days": min(int(days_match.group(1)), 60)}
+        for window in ("today", "tomorrow", "next week", "this week"):
+            if window in text:
+                return {"intent": "upcoming_due", "window": window.replace(" ", "_")}
+        return {"intent": "upcoming_due", "window": "days", "days": 7}
+
+    if vocabulary & {"courses", "classes"} and vocabulary <= COURSE_WORDS:
+        return {"intent": "list_courses"}
+
+    if vocabulary & {"announcements", "announcement", "news", "updates"} and vocabulary <= ANNOUNCEMENT_WORDS:
+        return {"intent": "latest_announcements"}
+
+    return None
+
+
+def _zone(time_zone: Optional[str]) -> tzinfo:
+    try:
+        return ZoneInfo(time_zone) if time_zone else timezone.utc
+    except Exception:
+        return timezone.utc
+
+
+def _format_date(timestamp: float, time_zone: Optional[str]) -> str:
+    return datetime.fromtimestamp(timestamp, _zone(time_zone)).strftime("%a %b %d, %I:%M %p %Z")
+
+
+def _due_window(intent: Dict[str, Any], tz: tzinfo, now: float) -> Tuple[float, float, str, str]:
+    """
+    (start, end, phrase, title) of an upcoming_due intent, on calendar days in tz:
+    today ends at midnight, weeks run Monday to Sunday.
+    """
+    today = datetime.fromtimestamp(now, tz).date()
+
+    def midnight(day: date) -> float:
+        return datetime.combine(day, datetime.min.time(), tz).timestamp()
+
+    next_monday = today + timedelta(days=7 - today.weekday())
+    window = intent.get("window", "days")
+    if window == "today":
+        return now, midnight(today + timedelta(days=1)), "today", "Due Today"
+    if window == "tomorrow":
+        return midnight(today + timedelta(days=1)), midnight(today + timedelta(days=2)), "tomorrow", "Due Tomorrow"
+    if window == "this_week":
+        return now, midnight(next_monday), "this week", "Due This Week"
+    if window == "next_week":
+        return (midnight(next_monday), midnight(next_monday + timedelta(days=7)),
+                f"next week ({next_monday:%b %d} – {next_monday + timedelta(days=6):%b %d})", "Due Next Week")
+
+    days = intent.get("days", 7)
+    return (now, midnight(today + timedelta(days=days + 1)),
+            f"in the next {days} days", f"Due in the Next {days} Days")
+
+
+def _strip_html(text: Optional[str]) -> str:
+    plain = html.unescape(re.sub(r"<[^>]+>", " ", text or ""))
+    return re.sub(r"\s+", " ", plain).strip()
+
+
+def _render_upcoming(index: CourseIndex, intent: Dict[str, Any]) -> str:
+    # Calendar days follow the user's time zone, taken from their courses like the workload forecast
+    time_zone = next((course.get("time_zone") for course in index.courses if course.get("time_zone")), None)
+    start, end, window, title = _due_window(intent, _zone(time_zone), time.time())
+    upcoming = index.assignments(start=start, end=end, include_undated=False)
+
+    if not upcoming:
+        return f"""## ✅ All Clear!
+
+You don't have any assignments due **{window}**.
+
+> 💡 Want to look further ahead? Try asking: "What's due in the next 14 days?\""""
+
+    pending = sum(1 for a in upcoming if not a.get("has_submitted_submissions"))
+    rows = []
+    for assignment in upcoming:
+        course = index.get_course(assignment.get("course_id")) or {}
+        due = _format_date(assignment["due_at_ts"], course.get("time_zone"))
+        points = assignment.get("points_possible")
+        status = "✅ Submitted" if assignment.get("has_submitted_submissions") else "⏳ To do"
+        rows.append(f"| {assignment.get('course_code') or ''} | {assignment.get('name')} | **{due}** | "
+                    f"{points if points is not None else '-'} | {status} |")
+
+    return f"""## 🗓️ {title}
+
+You have **{len(upcoming)} assignment{'s' if len(upcoming) != 1 else ''}** due {window}, **{pending}** still to do.
+
+| Course | Assignment | Due | Points | Status |
+|--------|------------|-----|--------|--------|
+""" + "\n".join(rows)
+
+
+def _render_courses(index: CourseIndex) -> str:
+    rows = [f"| {course.get('code') or ''} | {course.get('name')} |" for course in index.course_list]
+    return f"""## 📚 Your Courses
+
+You're enrolled in **{len(rows)} course{'s' if len(rows) != 1 else ''}**:
+
+| Code | Course |
+|------|--------|
+""" + "\n".join(rows)
+
+
+def _render_announcements(index: CourseIndex) -> str:
+    announcements = index.announcements(limit=MAX_ANNOUNCEMENTS)
+    if not announcements:
+        return "## 📢 Announcements\n\nThere are no recent announcements in your courses."
+
+    sections = []
+    for announcement in announcements:
+        posted_ts = record_ts(announcement, "posted_at")
+        posted = _format_date(posted_ts, None) if posted_ts is not None else "Unknown date"
+        preview = _strip_html(announcement.get("message"))
+        if len(preview) > ANNOUNCEMENT_PREVIEW_CHARS:
+            preview = preview[:ANNOUNCEMENT_PREVIEW_CHARS].rsplit(" ", 1)[0] + "…"
+        sections.append(f"### {announcement.get('title')}\n"
+                        f"**{announcement.get('course_code') or announcement.get('course_name')}** · {posted}\n\n"
+                        f"> {preview}")
+
+    return "## 📢 Latest Announcements\n\n" + "\n\n".join(sections)
+
+
+def render_fast_path_answer(intent: Dict[str, Any], index: CourseIndex) -> Optional[str]:
+    """Render the markdown answer for a matched intent, None if the snapshot can't answer it"""
+    if not index.course_list:
+        return None
+
+    if intent["intent"] == "upcoming_due":
+        return _render_upcoming(index, intent)
+    if intent["intent"] == "list_courses":
+        return _render_courses(index)
+    if intent["intent"] == "latest_announcements":
+        return _render_announcements(index)
+    return None
@@ -1,76 +1,89 @@
-from openai import OpenAI
 from datetime import datetime
 import asyncio
 import json
+import time
+import uuid
 from functools import partial
-from concurrent.futures import ThreadPoolExecutor
 from src.models.chat import ChatMessage, MessageRole
 from src.services.firestore_service import FirestoreService
+from src.services.openai_client import client, executor
 from src.config.settings import get_settings
 from typing import Optional, List, Dict, Tuple, Any
 from src.models.function_schemas import CANVAS_TOOLS, SYSTEM_MESSAGE_WITH_TOOLS
 from src.services.canvas_tools import CanvasTools
+from src.services.conversation_summary_service import ConversationSummaryService, compact_history, chat_message_count
+from src.services.tool_result_memo import ToolResultMemo, get_chat_memo
+from src.services.course_index import CourseIndex, get_course_index
+from src.services.chat_intents import match_intent, render_fast_path_answer
+from src.services.model_router import route_chat_round
+from src.services.chat_history_cache import (
+    HISTORY_WINDOW_SIZE, get_recent_window, store_recent_window, append_to_window,
+    drop_recent_window, to_window_entry, is_context_message
+)
+from src.utils import metrics
+from src.utils.tokens import estimate_token_count
 import logging
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-executor = ThreadPoolExecutor()
 
 # Token counting constants
 MAX_CONTEXT_TOKENS = 8000  # 8k token limit for conversation history
 RESPONSE_TOKEN_BUFFER = int(MAX_CONTEXT_TOKENS * 0.25)  # Reserve 25% for response
 AVAILABLE_INPUT_TOKENS = MAX_CONTEXT_TOKENS - RESPONSE_TOKEN_BUFFER
 
-def estimate_token_count(text: str) -> int:
-    """
-    Estimate the number of tokens in a string.
-    This is a rough approximation - about 4 characters per token for English text.
-    """
-    return max(1, len(text) // 4)
-
 def truncate_conversation_by_tokens(messages: list, max_tokens: int) -> list:
     """
     Truncate conversation messages to fit within token limit.
-    Always keeps the system message (first message) and truncates from the beginning.
+    Always keeps the leading system messages (instructions and the rolling
+    conversation summary) and truncates from the beginning of the rest.
     """
     if not messages:
         return messages
     
     logger.info(f"Truncating conversation: input has {len(messages)} messages, max_tokens={max_tokens}")
     
-    # Always keep the system message
-    system_message = messages[0]
-    other_messages = messages[1:]
+    # Always keep the system messages
+    pinned = 1
+    while pinned < len(messages) and messages[pinned].get('role') == 'system':
+        pinned += 1
+    system_messages = messages[:pinned]
+    other_messages = messages[pinned:]
     
-    # Calculate tokens for system message
-    system_tokens = estimate_token_count(system_message.get('content', ''))
+    # Calculate tokens for system messages
+    system_tokens = sum(estimate_token_count(message.get('content', '')) for message in system_messages)
     available_tokens = max_tokens - system_tokens
     
-    logger.info(f"System message uses {system_tokens} tokens, {available_tokens} tokens available for other messages")
+    logger.info(f"{len(system_messages)} system messages use {system_tokens} tokens, {available_tokens} tokens available for other messages")
     
     # Work backwards from the most recent messages
     selected_messages = []
     current_tokens = 0
     
-    for i, message in enumerate(reversed(other_messages)):
+    for message in reversed(other_messages):
         message_tokens = estimate_token_count(message.get('content', ''))
-        logger.info(f"Message {len(other_messages) - i - 1}: {message_tokens} tokens, role={message.get('role', 'unknown')}")
         
         if current_tokens + message_tokens <= available_tokens:
             selected_messages.insert(0, message)
             current_tokens += message_tokens
-            logger.info(f"  -> Included (total: {current_tokens} tokens)")
         else:
-            logger.info(f"  -> Excluded (would exceed limit: {current_tokens + message_tokens} > {available_tokens})")
             break
     
-    result = [system_message] + selected_messages
+    result = system_messages + selected_messages
     logger.info(f"Truncated conversation from {len(messages)} to {len(result)} messages ({current_tokens + system_tokens} estimated tokens)")
     return result
 
+def _uses_catalog_course_id(arguments: str, course_index) -> bool:
+    """Whether a tool call's course_id names a course from the user's catalog"""
+    try:
+        course_id = json.loads(arguments or "{}").get("course_id")
+    except (json.JSONDecodeError, AttributeError):
+        return False
+    return isinstance(course_id, int) and course_index.get_course(course_id) is not None
+
+
 class ChatService:
     @staticmethod
     async def generate_response(
@@ -78,7 +91,8 @@ class ChatService:
         user_id: str,
         chat_id: Optional[str] = None, 
         previous_response_id: Optional[str] = None,
-        previous_messages: Optional[List[ChatMessage]] = None
+        last_message_id: Optional[str] = None,
+        allow_fast_path: bool = True
     ) -> Tuple[ChatMessage, str, str]:
         """
         Generate a response using OpenAI API and save to Firestore
@@ -88,84 +102,94 @@ class ChatService:
             user_id: The user's ID
             chat_id: Optional chat ID for existing chats
             previous_response_id: Optional ID of the previous response to maintain conversation context
-            previous_messages: Optional list of previous messages for context
+            last_message_id: ID of the last message the client has seen, used to validate the cached history
+            allow_fast_path: Whether simple lookups may be answered from cached data without the model
             
         Returns:
             A tuple containing (ChatMessage response, response_id, chat_id)
         """
+        persist_task = None
         try:
-            # Create user message object
+            metrics.increment("chat.turns")
+            
+            # Create user message object; its ID is assigned up front so the write can run in the background
             user_message = ChatMessage(
                 role=MessageRole.USER,
                 content=message_content,
-                timestamp=datetime.utcnow()
+                timestamp=datetime.utcnow(),
+                message_id=str(uuid.uuid4())
             )
             
-            # Create or get chat
-            if not chat_id:
+            # New chats get their ID locally so nothing waits on the chat document being created
+            title = None
+            is_new_chat = not chat_id
+            if is_new_chat:
+                chat_id = str(uuid.uuid4())
                 # Create a new chat with first few words as the title
                 title = message_content[:30] + "..." if len(message_content) > 30 else message_content
-                chat_id = await FirestoreService.create_chat(user_id, title)
             
-            # Save user message to Firestore
-            user_message_id = await FirestoreService.save_message(chat_id, user_message)
-            user_message.message_id = user_message_id
+            # Persist the chat and user message off the critical path; awaited before the reply is saved
+            persist_task = asyncio.create_task(
+                ChatService._persist_user_message(user_id, chat_id, title, user_message)
+            )
+            
+            # Chat metadata, recent history and the course index load concurrently
+            load_tasks = [get_course_index(user_id)]
+            if not is_new_chat:
+                load_tasks += [FirestoreService.get_chat(chat_id), ChatService._load_recent_history(chat_id, last_message_id)]
+            else:
+                store_recent_window(chat_id, [])
+            loaded = await asyncio.gather(*load_tasks, return_exceptions=True)
+            
+            course_index = loaded[0]
+            if isinstance(course_index, Exception):
+                logger.warning(f"Could not load course index: {course_index}")
+                course_index = None
+            
+            chat_data = None
+            stored_messages = []
+            if not is_new_chat:
+                chat_data = loaded[1] if not isinstance(loaded[1], Exception) else None
+                if isinstance(loaded[2], Exception):
+                    logger.warning(f"Could not load recent messages from database: {loaded[2]}")
+                else:
+                    # The concurrent write may or may not be visible yet, so drop the current message
+                    stored_messages = [m for m in loaded[2] if m.get('message_id') != user_message.message_id]
+            
+            # Rolling summary of older turns, if the chat has been compacted
+            summary = chat_data.get('summary') if chat_data else None
+            summary_message_count = chat_data.get('summary_message_count', 0) if chat_data else 0
+            summary_until = chat_data.get('summary_until') if chat_data else None
+            message_count = chat_message_count(chat_data, stored_messages) + 2
+            
+            # Common lookups are answered straight from the cached snapshot
+            if allow_fast_path and settings.CHAT_FAST_PATH_ENABLED and course_index:
+                fast_path_message = ChatService._try_fast_path(message_content, course_index)
+                if fast_path_message:
+                    await persist_task
+                    assistant_message_id = await FirestoreService.save_message(chat_id, fast_path_message)
+                    fast_path_message.message_id = assistant_message_id
+                    append_to_window(chat_id, user_message, fast_path_message)
+                    ConversationSummaryService.schedule_refresh(chat_id, message_count, summary_message_count)
+                    return fast_path_message, None, chat_id
             
             # Run the synchronous OpenAI API call in a separate thread to avoid blocking
             loop = asyncio.get_event_loop()
             
+            # Preload the course catalog so the model can skip the get_courses round
+            course_catalog = course_index.catalog if course_index else ""
+            
             # Build the conversation input array
-            # Always start with the system message
+            # Always start with the system message (static instructions first, then the catalog)
             conversation_input = [{
                 "role": "system",
-                "content": SYSTEM_MESSAGE_WITH_TOOLS
+                "content": SYSTEM_MESSAGE_WITH_TOOLS + course_catalog
             }]
             
-            # If there are previous messages, add them to build the full conversation
-            if previous_messages and len(previous_messages) > 0:
-                logger.info(f"Adding {len(previous_messages)} previous messages to conversation")
-                
-                added_count = 0
-                for i, msg in enumerate(previous_messages):
-                    # Log each message for debugging
-                    msg_type = getattr(msg, 'type', None)
-                    logger.info(f"Processing previous message {i}: role={msg.role}, type={msg_type}, content_length={len(msg.content)}")
-                    
-                    # Handle regular text messages (skip function call messages)
-                    if not hasattr(msg, 'type') or msg.type is None or msg.type == "text":
-                        conversation_input.append({
-                            "role": msg.role,
-                            "content": msg.content
-                        })
-                        added_count += 1
-                        logger.info(f"Added message {i} to conversation")
-                    else:
-                        logger.info(f"Skipped message {i} with type {msg_type}")
-                
-                logger.info(f"Successfully added {added_count} out of {len(previous_messages)} previous messages to conversation")
-            
-            # If no previous messages but we have a chat_id, try to load recent messages from the database
-            elif chat_id:
-                logger.info(f"No previous messages provided, attempting to load recent messages from chat {chat_id}")
-                try:
-                    # Load recent messages from the database
-                    recent_messages = await FirestoreService.get_chat_messages(chat_id)
-                    
-                    # Sort by timestamp and take the most recent ones
-                    if recent_messages:
-                        sorted_messages = sorted(recent_messages, key=lambda x: x.get('timestamp', datetime.min))
-                        
-                        # Add recent messages to conversation (limit to avoid token overflow)
-                        for msg_data in sorted_messages[-40:]:  # Take last 40 messages
-                            if msg_data.get('role') in ['user', 'assistant']:
-                                conversation_input.append({
-                                    "role": msg_data['role'],
-                                    "content": msg_data['content']
-                                })
-                        
-                        logger.info(f"Added {len(sorted_messages[-40:])} recent messages from database")
-                except Exception as e:
-                    logger.warning(f"Could not load recent messages from database: {e}")
+            # History comes from the server-side window; the summary replaces turns it already covers
+            if stored_messages:
+                conversation_input.extend(compact_history(stored_messages, summary, summary_until))
+                logger.info(f"Added {len(conversation_input) - 1} context messages from the recent history window")
             
             # Add the current user message
             conversation_input.append({
@@ -173,36 +197,20 @@ class ChatService:
                 "content": message_content
             })
             
-            # Log conversation before truncation
-            logger.info(f"Conversation before truncation has {len(conversation_input)} messages:")
-            for i, msg in enumerate(conversation_input):
-                role = msg.get('role', 'unknown')
-                content_length = len(msg.get('content', ''))
-                logger.info(f"  Message {i}: role={role}, content_length={content_length}")
-            
             # Truncate conversation based on token limits
-            logger.info(f"About to truncate conversation with {len(conversation_input)} messages using {AVAILABLE_INPUT_TOKENS} available tokens")
             conversation_input = truncate_conversation_by_tokens(conversation_input, AVAILABLE_INPUT_TOKENS)
             
             logger.info(f"Built final conversation with {len(conversation_input)} messages")
             
-            # Print the conversation input being sent to OpenAI
-            print(f"\n📤 INPUT TO OPENAI:")
-            print(f"Model: o4-mini-2025-04-16")
-            print(f"Messages ({len(conversation_input)}):")
-            for i, msg in enumerate(conversation_input):
-                role = msg.get('role', 'unknown')
-                content = msg.get('content', '')
-                content_preview = content[:200] + "..." if len(content) > 200 else content
-                print(f"  [{i}] {role}: {content_preview}")
-            print()
+            # Effort (and optionally the model) is chosen per turn and per round
+            route = route_chat_round(message_content, 0)
             
             # Set up the API call parameters
             kwargs = {
-                "model": "gpt-5-mini",
+                "model": route["model"],
                 "store": True,
                 "tools": CANVAS_TOOLS,
-                "reasoning": {"effort": "medium"},
+                "reasoning": {"effort": route["effort"]},
                 "input": conversation_input
             }
             
@@ -214,35 +222,6 @@ class ChatService:
                     partial(client.responses.create, **kwargs)
                 )
                 
-                # Print the raw response from OpenAI
-                print(f"\n📥 RESPONSE FROM OPENAI:")
-                print(f"Response ID: {response.id}")
-                if response.output:
-                    print(f"Output items ({len(response.output)}):")
-                    for i, item in enumerate(response.output):
-                        print(f"  [{i}] Type: {item.type}")
-                        if item.type == "message":
-                            content_preview = item.content[:200] + "..." if len(item.content) > 200 else item.content
-                            print(f"      Content: {content_preview}")
-                        elif item.type == "function_call":
-                            print(f"      Function: {item.name}")
-                            print(f"      Arguments: {item.arguments}")
-                        elif item.type == "reasoning":
-                            # Reasoning items might have different attributes
-                            try:
-                                if hasattr(item, 'content'):
-                                    reasoning_preview = item.content[:200] + "..." if len(item.content) > 200 else item.content
-                                    print(f"      Reasoning: {reasoning_preview}")
-                                else:
-                                    print(f"      Reasoning: [reasoning data available but no content attribute]")
-                            except Exception as e:
-                                print(f"      Reasoning: [error accessing reasoning: {e}]")
-                        else:
-                            print(f"      [Unknown item type: {item.type}]")
-                if response.output_text:
-                    print(f"Output text: {response.output_text}")
-                print()
-                
                 # Log the response structure
                 logger.info(f"OpenAI response received, response ID: {response.id}")
                 logger.info(f"Response has output: {response.output is not None}")
@@ -253,6 +232,9 @@ class ChatService:
                 if response.output and any(item.type == "function_call" for item in response.output):
                     logger.info("Function calls detected in response")
                     
+                    # Tool results are shared across rounds and recent turns of this chat
+                    tool_memo = get_chat_memo(chat_id)
+                    
                     # Handle multiple rounds of function calls
                     current_response = response
                     input_messages = kwargs["input"].copy()
@@ -284,7 +266,7 @@ class ChatService:
                             
                             # Execute the function
                             logger.info(f"Executing function {name} with user_id {user_id}")
-                            result = await ChatService._execute_function(name, arguments, user_id)
+                            result = await ChatService._execute_function(name, arguments, user_id, tool_memo)
                             logger.info(f"Function execution complete. Result length: {len(result)}")
                             
                             # Add the function result to the messages
@@ -294,17 +276,12 @@ class ChatService:
                                 "call_id": item.call_id,
                                 "output": result
                             })
-                            
-                            # Print the full function result being sent to the model
-                            print(f"\n🔧 FUNCTION RESULT SENT TO MODEL:")
-                            print(f"Call ID: {item.call_id}")
-                            print(f"Function: {name}")
-                            print(f"Result: {result}")
-                            print()
+                            logger.debug(f"Function {name} result: {result[:200]}")
                         
                         # Make another call with the function results
                         logger.info(f"Making API call round {round_count + 1} with function results")
                         kwargs["input"] = input_messages
+                        kwargs["reasoning"] = {"effort": route_chat_round(message_content, round_count)["effort"]}
                         
                         # Log the input messages for debugging
                         logger.info(f"Round {round_count + 1} call input message count: {len(input_messages)}")
@@ -326,6 +303,22 @@ class ChatService:
                             logger.error(f"Error in round {round_count + 1} API call: {str(func_error)}", exc_info=True)
                             break
                     
+                    tool_memo.log_stats(f"chat {chat_id}, {round_count} rounds")
+                    
+                    # A round was saved only when the model took a course id from the preloaded
+                    # catalog instead of looking it up with get_courses
+                    function_calls = [item for item in input_messages if getattr(item, "type", None) == "function_call"]
+                    called_get_courses = any(item.name == "get_courses" for item in function_calls)
+                    used_catalog_id = bool(course_catalog) and not called_get_courses and any(
+                        _uses_catalog_course_id(item.arguments, course_index) for item in function_calls
+                    )
+                    metrics.increment("chat.tool_turns")
+                    metrics.observe("chat.tool_rounds", round_count)
+                    if used_catalog_id:
+                        metrics.increment("chat.catalog_rounds_saved")
+                    logger.info(f"Tool turn finished in {round_count} rounds, catalog preloaded: {bool(course_catalog)}, "
+                                f"get_courses called: {called_get_courses}, course id from catalog: {used_catalog_id}")
+                    
                     # Get the final response text
                     assistant_message = current_response.output_text
                     logger.info(f"Final response message length: {len(assistant_message) if assistant_message else 0}")
@@ -455,10 +448,12 @@ I couldn't find any courses in your Canvas account.
 Is there anything else I can help you with?"""
                         elif function_data.get("name") == "get_upcoming_due_dates":
                             days = function_data.get('arguments', {}).get('days', 7)
-                            if isinstance(result_data, list) and len(result_data) > 0:
+                            # Paginated tools wrap their results as {"items": [...], "total": N}
+                            upcoming_total = result_data.get('total', 0) if isinstance(result_data, dict) else 0
+                            if upcoming_total > 0:
                                 assistant_message = f"""## 🗓️ Upcoming Deadlines
 
-I found **{len(result_data)} assignments** due in the next **{days} days**, but had trouble formatting the details.
+I found **{upcoming_total} assignments** due in the next **{days} days**, but had trouble formatting the details.
 
 ### 🔄 Try asking:
 - "What's due this week?"
@@ -522,8 +517,7 @@ I'm experiencing a temporary issue processing your request.
 I'm here to help once the issue resolves! 🌟"""
                 response_id = None
             
-            # Print the assistant's response to console
-            print(f"\n🤖 Assistant Response: {assistant_message}\n")
+            logger.debug(f"Assistant response ({len(assistant_message)} characters): {assistant_message[:200]}")
             
             # Create assistant message object
             assistant_chat_message = ChatMessage(
@@ -532,9 +526,16 @@ I'm here to help once the issue resolves! 🌟"""
                 timestamp=datetime.utcnow()
             )
             
+            # The chat and user message must exist before the reply is stored
+            await persist_task
+            
             # Save assistant message to Firestore
             assistant_message_id = await FirestoreService.save_message(chat_id, assistant_chat_message)
             assistant_chat_message.message_id = assistant_message_id
+            append_to_window(chat_id, user_message, assistant_chat_message)
+            
+            # Fold turns that left the recent window into the rolling summary, off the request path
+            ConversationSummaryService.schedule_refresh(chat_id, message_count, summary_message_count)
             
             logger.info(f"Returning assistant message, ID: {assistant_message_id}")
             return assistant_chat_message, response_id, chat_id
@@ -565,7 +566,10 @@ I'll be back to help you soon! 🌟""",
             
             # If we have a chat_id, try to save the error message
             if chat_id:
+                drop_recent_window(chat_id)
                 try:
+                    if persist_task is not None:
+                        await persist_task
                     await FirestoreService.save_message(chat_id, error_message)
                 except Exception:
                     pass  # Silently fail if we can't save the error message
@@ -573,7 +577,58 @@ I'll be back to help you soon! 🌟""",
             return error_message, None, chat_id
     
     @staticmethod
-    async def _execute_function(name: str, arguments: Dict[str, Any], user_id: str) -> str:
+    async def _persist_user_message(user_id: str, chat_id: str, title: Optional[str], user_message: ChatMessage):
+        """Create the chat if it is new, then store the user message"""
+        if title is not None:
+            await FirestoreService.create_chat(user_id, title, chat_id=chat_id)
+        await FirestoreService.save_message(chat_id, user_message)
+    
+    @staticmethod
+    async def _load_recent_history(chat_id: str, last_message_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Recent text messages of a chat, from the in-process window or a bounded Firestore read"""
+        window = get_recent_window(chat_id, last_message_id)
+        if window is not None:
+            return window
+        
+        stored = await FirestoreService.get_recent_chat_messages(chat_id, HISTORY_WINDOW_SIZE)
+        entries = [to_window_entry(msg) for msg in stored if is_context_message(msg)]
+        store_recent_window(chat_id, entries)
+        logger.info(f"Loaded {len(entries)} recent messages for chat {chat_id} into the history window")
+        return entries
+    
+    @staticmethod
+    def _try_fast_path(message_content: str, index: CourseIndex) -> Optional[ChatMessage]:
+        """
+        Answer a recognized simple intent from the course index.
+        Returns None when the message needs the model.
+        """
+        intent = match_intent(message_content)
+        if not intent:
+            return None
+        
+        try:
+            start = time.perf_counter()
+            answer = render_fast_path_answer(intent, index)
+            if not answer:
+                return None
+            
+            metrics.increment("chat.fast_path_turns")
+            metrics.observe("chat.fast_path_ms", (time.perf_counter() - start) * 1000)
+            logger.info(f"Fast path answered intent {intent} in {(time.perf_counter() - start) * 1000:.1f} ms "
+                        f"({metrics.ratio('chat.fast_path_turns', 'chat.turns'):.0%} of chat turns so far)")
+            
+            return ChatMessage(
+                role=MessageRole.ASSISTANT,
+                content=answer,
+                timestamp=datetime.utcnow()
+            )
+        except Exception as e:
+            logger.warning(f"Fast path failed for intent {intent}, falling back to the model: {e}")
+            return None
+    
+    @staticmethod
+    async def _execute_function(name: str, arguments: Dict[str, Any], user_id: str,
+                                memo: Optional[ToolResultMemo] = None) -> str:
         """
         Execute a function called by the model
         
@@ -581,6 +636,7 @@ I'll be back to help you soon! 🌟""",
             name: The name of the function to call
             arguments: The arguments to pass to the function
             user_id: The user's ID
+            memo: Optional memo of earlier results for the same course snapshot
             
         Returns:
             The result of the function call as a string
@@ -595,7 +651,10 @@ I'll be back to help you soon! 🌟""",
                 "get_announcements": CanvasTools.get_announcements,
                 "get_course_modules": CanvasTools.get_course_modules,
                 "get_module_items": CanvasTools.get_module_items,
-                "get_user_info": CanvasTools.get_user_info
+                "get_user_info": CanvasTools.get_user_info,
+                "search_course_content": CanvasTools.search_course_content,
+                "get_grades": CanvasTools.get_grades,
+                "calculate_grade": CanvasTools.calculate_grade
             }
             
             # Check if the function exists
@@ -603,11 +662,24 @@ I'll be back to help you soon! 🌟""",
                 logger.warning(f"Function {name} not found in function map")
                 return json.dumps({"error": f"Function {name} not found"})
             
+            # Reuse an earlier result for the same call against the same snapshot
+            version = None
+            if memo is not None:
+                version = (await get_course_index(user_id)).version
+                cached_result = memo.get(name, arguments, version)
+                if cached_result is not None:
+                    logger.info(f"Function {name} served from tool memo")
+                    return cached_result
+            
             # Call the function with the arguments
             logger.info(f"Calling function {name} with arguments {arguments}")
             function = function_map[name]
             result = await function(user_id, **arguments)
             
+            # Errors are not memoized so the next round can retry
+            if memo is not None and not result.startswith('{"error"'):
+                memo.put(name, arguments, version, result)
+            
             # Log a sample of the result (first 100 chars)
             result_sample = result[:100] + "..." if len(result) > 100 else result
             logger.info(f"Function {name} returned result: {result_sample}")
@@ -642,4 +714,5 @@ I'll be back to help you soon! 🌟""",
     @staticmethod
     async def delete_chat(chat_id: str) -> bool:
         """Delete a chat and all its messages"""
+        drop_recent_window(chat_id)
         return await FirestoreService.delete_chat(chat_id) 
\ No newline at end of file
@@ -0,0 +1,154 @@
+from src.services.firestore_service import FirestoreService
+from src.services.openai_client import client, executor
+from src.config.settings import get_settings
+from src.utils.timestamps import parse_timestamp
+from functools import partial
+from typing import List, Dict, Any, Optional, Set
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Compaction settings
+RECENT_MESSAGE_WINDOW = 12  # Most recent text messages always sent verbatim
+SUMMARY_REFRESH_TURNS = 4  # Regenerate the summary every K user/assistant turns
+SUMMARY_MAX_CHARS = 2400  # ~600 tokens, keeps the summary from growing with the chat
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a student and an academic "
+    "assistant with access to Canvas LMS. Merge the existing summary with the new messages. "
+    "Keep course names, assignment names, IDs, dates, decisions and open questions. "
+    "Drop greetings and formatting. Write plain concise bullet points, at most 250 words."
+)
+
+# Chats with a summary refresh currently running in the background
+_refreshes_in_progress: Set[str] = set()
+
+
+def compact_history(history: List[Dict[str, Any]], summary: Optional[str], summary_until: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Replace the messages covered by the rolling summary with the summary itself.
+
+    Args:
+        history: Recent text messages of the chat in chronological order ({"role", "content", "timestamp"} dicts)
+        summary: Rolling summary stored on the chat document, if any
+        summary_until: Timestamp of the last message the summary covers
+    """
+    # Parsed, since stored ISO strings differ in offset suffix and fractional precision
+    until = parse_timestamp(summary_until) if summary else None
+    if until is None:
+        return [{"role": msg["role"], "content": msg["content"]} for msg in history]
+
+    context = []
+    for msg in history:
+        timestamp = parse_timestamp(msg.get("timestamp"))
+        if timestamp is None or timestamp > until:
+            context.append({"role": msg["role"], "content": msg["content"]})
+
+    logger.info(f"Compacted {len(history) - len(context)} older messages into the rolling summary, {len(context)} kept verbatim")
+    return [{
+        "role": "system",
+        "content": f"Summary of the earlier conversation:\n{summary}"
+    }] + context
+
+
+def chat_message_count(chat_data: Optional[Dict[str, Any]], loaded_history: List[Dict[str, Any]]) -> int:
+    """
+    Text messages in the chat before the current turn. Chats created before the
+    message_count field existed started counting from zero, so the loaded history
+    is a lower bound until the next summary refresh stores the real count.
+    """
+    stored = (chat_data or {}).get('message_count') or 0
+    return max(stored, len(loaded_history))
+
+
+def needs_summary_refresh(message_count: int, summary_message_count: int) -> bool:
+    """Check whether enough turns fell out of the recent window since the last summary"""
+    unsummarized = message_count - summary_message_count - RECENT_MESSAGE_WINDOW
+    return unsummarized >= SUMMARY_REFRESH_TURNS * 2
+
+
+class ConversationSummaryService:
+    """Rolling summary of older chat turns, refreshed incrementally in the background"""
+
+    @staticmethod
+    def schedule_refresh(chat_id: str, message_count: int, summary_message_count: int) -> bool:
+        """
+        Start a background summary refresh if the chat is due for one.
+        Returns True if a refresh was scheduled.
+        """
+        if not needs_summary_refresh(message_count, summary_message_count):
+            return False
+
+        if chat_id in _refreshes_in_progress:
+            logger.debug(f"Summary refresh already running for chat {chat_id}")
+            return False
+
+        _refreshes_in_progress.add(chat_id)
+        asyncio.create_task(ConversationSummaryService._refresh_summary(chat_id))
+        logger.info(f"Scheduled rolling summary refresh for chat {chat_id} ({message_count} messages)")
+        return True
+
+    @staticmethod
+    async def _refresh_summary(chat_id: str):
+        """Fold the messages that left the recent window into the stored summary"""
+        try:
+            chat = await FirestoreService.get_chat(chat_id)
+            if not chat:
+                return
+
+            previous_summary = chat.get('summary') or ""
+            summary_message_count = chat.get('summary_message_count', 0)
+
+            messages = await FirestoreService.get_chat_messages(chat_id)
+            history = [
+                msg for msg in messages
+                if msg.get('type', 'text') == 'text' and msg.get('role') in ['user', 'assistant']
+            ]
+
+            fold_until = len(history) - RECENT_MESSAGE_WINDOW
+            if fold_until <= summary_message_count:
+                return
+
+            new_messages = history[summary_message_count:fold_until]
+            summary = await ConversationSummaryService._generate_summary(previous_summary, new_messages)
+            if not summary:
+                return
+
+            # Backfill the count of chats whose message_count started after they had messages
+            message_count = len(history) if (chat.get('message_count') or 0) < len(history) else None
+            await FirestoreService.update_chat_summary(chat_id, summary[:SUMMARY_MAX_CHARS], fold_until,
+                                                       history[fold_until - 1].get('timestamp', ''), message_count)
+            logger.info(f"Rolling summary for chat {chat_id} now covers {fold_until} messages ({len(summary)} chars)")
+        except Exception as e:
+            logger.error(f"Failed to refresh summary for chat {chat_id}: {str(e)}", exc_info=True)
+        finally:
+            _refreshes_in_progress.discard(chat_id)
+
+    @staticmethod
+    async def _generate_summary(previous_summary: str, new_messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Ask the model to merge new messages into the existing summary"""
+        transcript = "\n\n".join(
+            f"{msg.get('role')}: {msg.get('content', '')}" for msg in new_messages
+        )
+        prompt = (
+            f"EXISTING SUMMARY:\n{previous_summary or '(none)'}\n\n"
+            f"NEW MESSAGES:\n{transcript}\n\n"
+            "Return the updated summary only."
+        )
+
+        kwargs = {
+            "model": settings.CHAT_MODEL,
+            "store": False,
+            "reasoning": {"effort": "low"},
+            "input": [
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+        }
+
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(executor, partial(client.responses.create, **kwargs))
+        return response.output_text
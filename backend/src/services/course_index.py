@@ -0,0 +1,171 @@
+from src.services.course_service import CourseService
+from src.models.function_schemas import format_course_catalog
+from src.utils.timestamps import record_ts
+from bisect import bisect_left
+from typing import List, Dict, Any, Optional, Tuple
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How long an index is trusted before re-checking the snapshot version in Firestore
+INDEX_TTL_SECONDS = 60
+
+# Sort key for assignments without a due date (after every real date)
+NO_DUE_DATE = float('inf')
+
+
+class _SortedView:
+    """Records kept sorted by an epoch-second key, searchable with bisect"""
+
+    def __init__(self, keyed_records: List[Tuple[float, Dict[str, Any]]]):
+        keyed_records.sort(key=lambda pair: pair[0])
+        self.keys = [key for key, _ in keyed_records]
+        self.records = [record for _, record in keyed_records]
+
+    def between(self, start: float, end: float) -> List[Dict[str, Any]]:
+        """Records with start <= key < end, in ascending order"""
+        lo = bisect_left(self.keys, start)
+        hi = bisect_left(self.keys, end)
+        return self.records[lo:hi]
+
+
+class CourseIndex:
+    """Read-optimized view over one cached course snapshot, built once per version"""
+
+    def __init__(self, courses: List[Dict[str, Any]], version: Optional[str] = None):
+        self.version = version
+        self.courses = courses
+        self.courses_by_id: Dict[int, Dict[str, Any]] = {}
+        self.assignments_by_id: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        self.course_list: List[Dict[str, Any]] = []
+
+        all_assignments = []
+        all_announcements = []
+        self._assignments_by_course: Dict[int, _SortedView] = {}
+        self._announcements_by_course: Dict[int, _SortedView] = {}
+
+        for course in courses:
+            course_id = course.get("id")
+            self.courses_by_id[course_id] = course
+            self.course_list.append({
+                "id": course_id,
+                "name": course.get("name"),
+                "code": course.get("code"),
+            })
+
+            course_assignments = []
+            for assignment in course.get("assignments", []):
+                self.assignments_by_id[assignment.get("id")] = (assignment, course)
+
+                due_ts = record_ts(assignment, "due_at")
+                summary = {
+                    "id": assignment.get("id"),
+                    "name": assignment.get("name"),
+                    "due_at": assignment.get("due_at"),
+                    "due_at_ts": due_ts,
+                    "points_possible": assignment.get("points_possible"),
+                    "grade": assignment.get("grade"),
+                    "course_id": assignment.get("course_id"),
+                    "course_name": course.get("name"),
+                    "course_code": course.get("code"),
+                    "published": assignment.get("published"),
+                    "submission_types": assignment.get("submission_types"),
+                    "html_url": assignment.get("html_url"),
+                    "has_submitted_submissions": assignment.get("has_submitted_submissions")
+                }
+                keyed = (due_ts if due_ts is not None else NO_DUE_DATE, summary)
+                course_assignments.append(keyed)
+                all_assignments.append(keyed)
+
+            course_announcements = []
+            for announcement in course.get("announcements", []):
+                announcement_with_course = announcement.copy()
+                announcement_with_course["course_name"] = course.get("name")
+                announcement_with_course["course_code"] = course.get("code")
+
+                posted_ts = record_ts(announcement, "posted_at")
+                announcement_with_course["posted_at_ts"] = posted_ts
+                keyed = (posted_ts if posted_ts is not None else float('-inf'), announcement_with_course)
+                course_announcements.append(keyed)
+                all_announcements.append(keyed)
+
+            self._assignments_by_course[course_id] = _SortedView(course_assignments)
+            self._announcements_by_course[course_id] = _SortedView(course_announcements)
+
+        self._assignments = _SortedView(all_assignments)
+        self._announcements = _SortedView(all_announcements)
+
+        # Rendered once per snapshot so the system prompt is byte-stable between turns
+        self.catalog = format_course_catalog(self.course_list)
+
+    def get_course(self, course_id: int) -> Optional[Dict[str, Any]]:
+        return self.courses_by_id.get(course_id)
+
+    def get_assignment(self, assignment_id: int, course_id: Optional[int] = None) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Return (assignment, course) for an assignment ID, optionally constrained to a course"""
+        entry = self.assignments_by_id.get(assignment_id)
+        if entry is None:
+            return None
+        if course_id is not None and entry[1].get("id") != course_id:
+            return None
+        return entry
+
+    def assignments(self, course_id: Optional[int] = None, start: Optional[float] = None,
+                    end: Optional[float] = None, include_undated: bool = True) -> List[Dict[str, Any]]:
+        """
+        Assignment summaries sorted by due date (undated last).
+
+        start and end (epoch seconds) keep assignments due in [start, end); an open
+        bound is unlimited. Assignments without a due date are kept unless
+        include_undated is False.
+        """
+        view = self._assignments if course_id is None else self._assignments_by_course.get(course_id)
+        if view is None:
+            return []
+
+        dated = view.between(float('-inf') if start is None else start, NO_DUE_DATE if end is None else end)
+        if not include_undated:
+            return dated
+        return dated + view.records[bisect_left(view.keys, NO_DUE_DATE):]
+
+    def announcements(self, course_id: Optional[int] = None, limit: Optional[int] = 10) -> List[Dict[str, Any]]:
+        """Announcements newest first, all of them when limit is None"""
+        view = self._announcements if course_id is None else self._announcements_by_course.get(course_id)
+        if view is None or (limit is not None and limit <= 0):
+            return []
+        return view.records[::-1][:limit]
+
+
+# Per-user index cache: user_id -> (index, checked_at)
+_indexes: Dict[str, Tuple[CourseIndex, float]] = {}
+
+
+async def get_course_index(user_id: str) -> CourseIndex:
+    """
+    Get the course index for a user, rebuilding only when the cached snapshot changed.
+    """
+    cached = _indexes.get(user_id)
+    now = time.monotonic()
+    if cached and now - cached[1] < INDEX_TTL_SECONDS:
+        return cached[0]
+
+    version = await CourseService._get_cached_courses_version(user_id)
+    if cached and version is not None and cached[0].version == version:
+        _indexes[user_id] = (cached[0], now)
+        return cached[0]
+
+    courses = await CourseService._get_cached_courses(user_id)
+    start = time.perf_counter()
+    index = CourseIndex(courses, version)
+    logger.info(f"[Course Index] Built index for user {user_id} (version {version}): "
+                f"{len(index.courses_by_id)} courses, {len(index.assignments_by_id)} assignments "
+                f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    _indexes[user_id] = (index, now)
+    return index
+
+
+def invalidate_course_index(user_id: str):
+    """Drop a user's index after their snapshot is rewritten"""
+    _indexes.pop(user_id, None)
@@ -0,0 +1,239 @@
+from src.config.firebase import db
+from google.cloud import firestore
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+import asyncio
+import html
+import json
+import math
+import re
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_BOOST = 3  # Title terms count this many times toward term frequency
+
+SNIPPET_CHARS = 240
+MAX_STORED_INDEX_CHARS = 900_000  # Firestore documents are capped at 1 MiB
+
+CONTENT_TYPES = ("assignment", "announcement", "syllabus", "module", "module_item")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with", "you", "your",
+    "which", "what", "about", "does", "do", "my", "me", "i"
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def plain_text(value: Optional[str]) -> str:
+    """Strip HTML tags and collapse whitespace"""
+    text = html.unescape(re.sub(r"<[^>]+>", " ", value or ""))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, with a light plural strip"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS or len(token) < 2:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _iter_documents(courses: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], str, str]]:
+    """Yield (ref, title, plain body) for every searchable record, in a stable order"""
+    for course in courses:
+        course_id = course.get("id")
+
+        if course.get("syllabus_body"):
+            yield ({"type": "syllabus", "course_id": course_id, "id": course_id},
+                   f"{course.get('name')} syllabus", plain_text(course.get("syllabus_body")))
+
+        for assignment in course.get("assignments", []):
+            yield ({"type": "assignment", "course_id": course_id, "id": assignment.get("id"),
+                    "html_url": assignment.get("html_url")},
+                   assignment.get("name") or "", plain_text(assignment.get("description")))
+
+        for announcement in course.get("announcements", []):
+            yield ({"type": "announcement", "course_id": course_id, "id": announcement.get("id"),
+                    "posted_at": announcement.get("posted_at"), "html_url": announcement.get("url")},
+                   announcement.get("title") or "", plain_text(announcement.get("message")))
+
+        for module in course.get("modules", []):
+            yield ({"type": "module", "course_id": course_id, "id": module.get("id")},
+                   module.get("name") or "", "")
+
+            for item in module.get("items", []):
+                yield ({"type": "module_item", "course_id": course_id, "id": item.get("id"),
+                        "module_id": module.get("id"), "html_url": item.get("html_url")},
+                       item.get("title") or "", "")
+
+
+class SearchIndex:
+    """BM25 inverted index over one course snapshot"""
+
+    def __init__(self, refs: List[Dict[str, Any]], doc_lengths: List[int],
+                 postings: Dict[str, List[List[int]]], version: Optional[str] = None):
+        self.refs = refs
+        self.doc_lengths = doc_lengths
+        self.postings = postings  # term -> [[doc, term frequency], ...]
+        self.version = version
+        self.avg_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+        self._texts: Optional[List[Tuple[str, str]]] = None
+
+    @classmethod
+    def build(cls, courses: List[Dict[str, Any]], version: Optional[str] = None) -> "SearchIndex":
+        refs, doc_lengths, texts = [], [], []
+        postings: Dict[str, List[List[int]]] = {}
+
+        for doc, (ref, title, body) in enumerate(_iter_documents(courses)):
+            terms = Counter(tokenize(body))
+            for term in tokenize(title):
+                terms[term] += TITLE_BOOST
+            for term, frequency in terms.items():
+                postings.setdefault(term, []).append([doc, frequency])
+
+            refs.append(ref)
+            doc_lengths.append(sum(terms.values()))
+            texts.append((title, body))
+
+        index = cls(refs, doc_lengths, postings, version)
+        index._texts = texts
+        return index
+
+    def to_json(self) -> str:
+        return json.dumps({"refs": self.refs, "lengths": self.doc_lengths, "postings": self.postings},
+                          separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, payload: str, version: Optional[str] = None) -> "SearchIndex":
+        data = json.loads(payload)
+        return cls(data["refs"], data["lengths"], data["postings"], version)
+
+    def attach_texts(self, courses: List[Dict[str, Any]]) -> bool:
+        """Attach titles and bodies from the snapshot for snippets; False if it doesn't line up"""
+        texts = [(title, body) for _, title, body in _iter_documents(courses)]
+        if len(texts) != len(self.refs):
+            return False
+        self._texts = texts
+        return True
+
+    def search(self, query: str, limit: int = 5, course_id: Optional[int] = None,
+               content_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Top results as {**ref, title, score, snippet}, best first"""
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms or not self.refs:
+            return []
+
+        doc_count = len(self.refs)
+        scores: Dict[int, float] = {}
+        for term in query_terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, frequency in postings:
+                ref = self.refs[doc]
+                if course_id is not None and ref.get("course_id") != course_id:
+                    continue
+                if content_types and ref.get("type") not in content_types:
+                    continue
+                norm = 1 - BM25_B + BM25_B * self.doc_lengths[doc] / (self.avg_length or 1)
+                scores[doc] = scores.get(doc, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+
+        ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)[:limit]
+        results = []
+        for doc, score in ranked:
+            title, body = self._texts[doc] if self._texts else ("", "")
+            results.append({
+                **self.refs[doc],
+                "title": title,
+                "score": round(score, 3),
+                "snippet": make_snippet(body, query_terms)
+            })
+        return results
+
+
+def make_snippet(text: str, query_terms: List[str], width: int = SNIPPET_CHARS) -> str:
+    """Window of text around the first query term match"""
+    if not text:
+        return ""
+
+    lowered = text.lower()
+    positions = [pos for pos in (lowered.find(term) for term in query_terms) if pos >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    if start > 0:
+        # Start on a word boundary
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < start + 20 else start
+
+    snippet = text[start:start + width].strip()
+    return ("…" if start > 0 else "") + snippet + ("…" if start + width < len(text) else "")
+
+
+# Per-user in-memory search indexes: user_id -> index (validated by snapshot version)
+_search_indexes: Dict[str, SearchIndex] = {}
+
+
+class CourseSearchService:
+    """Builds, stores and loads the content search index that accompanies each course snapshot"""
+
+    @staticmethod
+    async def save_index(user_id: str, courses: List[Dict[str, Any]], version: Optional[str]):
+        """Build the index for a freshly saved snapshot and store it next to it"""
+        start = time.perf_counter()
+        index = await asyncio.to_thread(SearchIndex.build, courses, version)
+        payload = index.to_json()
+        _search_indexes[user_id] = index
+
+        logger.info(f"[Course Search] Built index for user {user_id}: {len(index.refs)} documents, "
+                    f"{len(index.postings)} terms, {len(payload)} chars in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        if len(payload) > MAX_STORED_INDEX_CHARS:
+            logger.warning(f"[Course Search] Index for user {user_id} is too large to store ({len(payload)} chars), "
+                           f"it will be rebuilt in memory on demand")
+            return
+
+        doc_ref = db.collection('userCourseSearch').document(user_id)
+        await asyncio.to_thread(doc_ref.set, {
+            'version': version,
+            'index': payload,
+            'builtAt': firestore.SERVER_TIMESTAMP
+        })
+
+    @staticmethod
+    async def get_index(user_id: str, courses: List[Dict[str, Any]], version: Optional[str]) -> SearchIndex:
+        """
+        Index for the given snapshot: from memory, then from the stored copy, else
+        built from the snapshot itself.
+        """
+        cached = _search_indexes.get(user_id)
+        if cached is not None and cached.version == version:
+            if cached._texts is not None or cached.attach_texts(courses):
+                return cached
+
+        try:
+            doc = await asyncio.to_thread(db.collection('userCourseSearch').document(user_id).get)
+            if doc.exists:
+                data = doc.to_dict()
+                if data.get('version') == version and data.get('index'):
+                    index = SearchIndex.from_json(data['index'], version)
+                    if index.attach_texts(courses):
+                        _search_indexes[user_id] = index
+                        return index
+        except Exception as e:
+            logger.warning(f"[Course Search] Could not load stored index for user {user_id}: {e}")
+
+        index = await asyncio.to_thread(SearchIndex.build, courses, version)
+        _search_indexes[user_id] = index
+        logger.info(f"[Course Search] Rebuilt index in memory for user {user_id} (version {version})")
+        return index
@@ -6,12 +6,17 @@ import logging
 import asyncio
 from fastapi import HTTPException
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from canvasapi import Canvas
 from src.utils.logging import setup_logger
 from src.models.course import ModuleItem
+from src.utils.timestamps import (
+    add_epoch_fields, ASSIGNMENT_TIMESTAMP_FIELDS, ANNOUNCEMENT_TIMESTAMP_FIELDS, MODULE_TIMESTAMP_FIELDS
+)
+from src.config.settings import get_settings
 
 logger = setup_logger(__name__)
+settings = get_settings()
 
 def should_refresh_courses(last_updated) -> bool:
     logger.debug(f"Checking last_updated: {last_updated}")
@@ -92,7 +97,8 @@ class CourseService:
             
             # Fetch courses
             try:
-                all_courses = canvas.get_courses()
+                # total_scores adds the user's course grades to each enrollment, so no per-course grade requests are needed
+                all_courses = canvas.get_courses(include=['total_scores'])
                 course_tasks = []
                 
                 for course in all_courses:
@@ -146,15 +152,23 @@ class CourseService:
             'start_at': getattr(course, 'start_at', None),
             'end_at': getattr(course, 'end_at', None),
             'time_zone': getattr(course, 'time_zone', 'UTC'),
+            'grades': CourseService._enrollment_grades(course),
         }
         
         try:
+            # Assignment groups with the student's submissions: weights, drop rules and scores in one request
+            scores = None
+            try:
+                course_data['grading'], scores = await CourseService._process_assignment_groups(course)
+            except Exception as e:
+                logger.error(f"Error fetching assignment groups for course {course.id}: {str(e)}")
+            
             # Process assignments
             assignments = course.get_assignments()
             assignment_tasks = []
             for assignment in assignments:
                 if getattr(assignment, 'published', True):
-                    task = CourseService._process_assignment(assignment, canvas_user_id)
+                    task = CourseService._process_assignment(assignment, canvas_user_id, scores)
                     assignment_tasks.append(task)
             
             # Process modules with items included
@@ -239,7 +253,76 @@ class CourseService:
         return course_data
 
     @staticmethod
-    async def _process_assignment(assignment, canvas_user_id: int) -> Dict[str, Any]:
+    def _enrollment_grades(course) -> Optional[Dict[str, Any]]:
+        """
+        The user's overall grade in a course, from the student enrollment returned
+        with the course list. None for non-student enrollments; scores are None when
+        the course hides totals.
+        """
+        for enrollment in getattr(course, 'enrollments', None) or []:
+            if enrollment.get('type') == 'student':
+                return {
+                    'current_score': enrollment.get('computed_current_score'),
+                    'final_score': enrollment.get('computed_final_score'),
+                    'current_grade': enrollment.get('computed_current_grade'),
+                    'final_grade': enrollment.get('computed_final_grade')
+                }
+        return None
+
+    @staticmethod
+    async def _process_assignment_groups(course) -> Tuple[Dict[str, Any], Dict[int, Optional[float]]]:
+        """
+        Grading data for a course in array form, plus each assignment's score.
+        
+        assignment_ids, group_index, points_possible, scores and omit_from_final are
+        parallel lists (one entry per gradable assignment); scores are None until
+        graded, and excused work counts as ungraded. groups holds each group's
+        weight and drop rules, indexed by group_index.
+        """
+        groups = course.get_assignment_groups(include=['assignments', 'submission'])
+        
+        grading = {
+            'apply_group_weights': bool(getattr(course, 'apply_assignment_group_weights', False)),
+            'groups': [],
+            'assignment_ids': [],
+            'group_index': [],
+            'points_possible': [],
+            'scores': [],
+            'omit_from_final': []
+        }
+        scores: Dict[int, Optional[float]] = {}
+        
+        for position, group in enumerate(groups):
+            rules = getattr(group, 'rules', None) or {}
+            grading['groups'].append({
+                'id': group.id,
+                'name': getattr(group, 'name', ''),
+                'weight': getattr(group, 'group_weight', 0) or 0,
+                'drop_lowest': rules.get('drop_lowest', 0) or 0,
+                'drop_highest': rules.get('drop_highest', 0) or 0,
+                'never_drop': rules.get('never_drop', []) or []
+            })
+            
+            for assignment in getattr(group, 'assignments', None) or []:
+                if not assignment.get('published', True):
+                    continue
+                submission = assignment.get('submission') or {}
+                score = None if submission.get('excused') else submission.get('score')
+                scores[assignment['id']] = score
+                
+                grading['assignment_ids'].append(assignment['id'])
+                grading['group_index'].append(position)
+                grading['points_possible'].append(assignment.get('points_possible') or 0)
+                grading['scores'].append(score)
+                grading['omit_from_final'].append(bool(assignment.get('omit_from_final_grade')))
+        
+        logger.debug(f"Captured {len(grading['groups'])} assignment groups and "
+                     f"{len(grading['assignment_ids'])} gradable assignments for course {course.id}")
+        return grading, scores
+
+    @staticmethod
+    async def _process_assignment(assignment, canvas_user_id: int,
+                                  scores: Optional[Dict[int, Optional[float]]] = None) -> Dict[str, Any]:
         assignment_data = {
             'id': assignment.id,
             'name': assignment.name,
@@ -252,6 +335,13 @@ class CourseService:
             'has_submitted_submissions': getattr(assignment, 'has_submitted_submissions', False),
             'course_id': assignment.course_id
         }
+        add_epoch_fields(assignment_data, ASSIGNMENT_TIMESTAMP_FIELDS)
+
+        # Scores from the assignment groups request, when it succeeded, save a request per assignment
+        if scores is not None and assignment.id in scores:
+            score = scores[assignment.id]
+            assignment_data['grade'] = str(score) if score is not None else 'N/A'
+            return assignment_data
 
         try:
             if assignment.has_submitted_submissions:
@@ -273,20 +363,45 @@ class CourseService:
             # Create the document in userCourses collection
             doc_ref = db.collection('userCourses').document(user_id)
             
+            # Hash of the plan-relevant course data, so AI plan cache hits don't need to load and rehash courses
+            from src.services.ai_planner_service import create_course_data_hash
+            
+            course_data_hash = create_course_data_hash(courses)
+            previous_doc = await asyncio.to_thread(doc_ref.get, field_paths=['courseDataHash'])
+            previous_hash = previous_doc.to_dict().get('courseDataHash') if previous_doc.exists else None
+            
             # Prepare the data
             data = {
                 'courses': courses,
+                'courseDataHash': course_data_hash,
                 'lastUpdated': firestore.SERVER_TIMESTAMP
             }
             
             # Set the document with merge=True to create if it doesn't exist
             doc_ref.set(data, merge=True)
             
+            # The in-memory course index for this user now points at an old snapshot
+            from src.services.course_index import invalidate_course_index
+            invalidate_course_index(user_id)
+            
             # Verify the save
             saved_doc = doc_ref.get()
             if saved_doc.exists:
                 saved_data = saved_doc.to_dict()
                 logger.info(f"Successfully saved {len(saved_data.get('courses', []))} courses to Firestore")
+                
+                # Content search index for this snapshot, keyed by its server timestamp
+                try:
+                    from src.services.course_search import CourseSearchService
+                    last_updated = saved_data.get('lastUpdated')
+                    await CourseSearchService.save_index(user_id, courses, last_updated.isoformat() if last_updated else None)
+                except Exception as e:
+                    logger.error(f"Failed to build course search index: {str(e)}")
+                
+                # Assignments added, due dates moved or submissions made: refresh the AI plan ahead of the next visit
+                if previous_hash and previous_hash != course_data_hash and settings.PLAN_REFRESH_ON_SYNC:
+                    from src.services.plan_refresh import plan_refresh_scheduler
+                    plan_refresh_scheduler.notify_courses_changed(user_id, course_data_hash)
             else:
                 logger.error("Failed to verify saved courses document")
                 raise Exception("Failed to verify saved courses")
@@ -300,7 +415,7 @@ class CourseService:
         try:
             logger.info(f"[Cache] Attempting to retrieve cached courses for user: {user_id}")
             doc_ref = db.collection('userCourses').document(user_id)
-            doc = doc_ref.get()
+            doc = await asyncio.to_thread(doc_ref.get)
             
             if doc.exists:
                 data = doc.to_dict()
@@ -315,6 +430,32 @@ class CourseService:
             logger.error(f"[Error] Failed to retrieve cached courses: {str(e)}")
             return []
 
+    @staticmethod
+    async def _get_cached_courses_version(user_id: str) -> Optional[str]:
+        """Read only the snapshot timestamp, used as the cached snapshot version"""
+        try:
+            doc_ref = db.collection('userCourses').document(user_id)
+            doc = await asyncio.to_thread(doc_ref.get, field_paths=['lastUpdated'])
+            if not doc.exists:
+                return None
+            
+            timestamp = doc.to_dict().get('lastUpdated')
+            return timestamp.isoformat() if timestamp else None
+        except Exception as e:
+            logger.error(f"[Error] Failed to read cached courses version: {str(e)}")
+            return None
+
+    @staticmethod
+    async def get_snapshot_meta(user_id: str) -> Optional[Dict[str, Any]]:
+        """Read only the snapshot timestamp and course data hash, not the courses themselves"""
+        try:
+            doc_ref = db.collection('userCourses').document(user_id)
+            doc = await asyncio.to_thread(doc_ref.get, field_paths=['lastUpdated', 'courseDataHash'])
+            return doc.to_dict() if doc.exists else None
+        except Exception as e:
+            logger.error(f"[Error] Failed to read course snapshot metadata: {str(e)}")
+            return None
+
     @staticmethod
     async def get_courses_last_updated(user_id: str):
         try:
@@ -441,6 +582,7 @@ class CourseService:
             'prerequisite_module_ids': getattr(module, 'prerequisite_module_ids', []),
             'items': []  # Empty items array for consistency with _process_module_with_items
         }
+        add_epoch_fields(module_data, MODULE_TIMESTAMP_FIELDS)
         
         # Also fetch module items separately for consistency
         try:
@@ -544,6 +686,7 @@ class CourseService:
                     'posted_at': getattr(announcement, 'posted_at', None),
                     'url': getattr(announcement, 'html_url', None),
                 }
+                add_epoch_fields(announcement_data, ANNOUNCEMENT_TIMESTAMP_FIELDS)
                 processed_announcements.append(announcement_data)
             return processed_announcements
         except Exception as e:
@@ -568,6 +711,7 @@ class CourseService:
             'prerequisite_module_ids': getattr(module, 'prerequisite_module_ids', []),
             'items': []
         }
+        add_epoch_fields(module_data, MODULE_TIMESTAMP_FIELDS)
         
         # Process items if they're included with the module
         if hasattr(module, 'items') and module.items:
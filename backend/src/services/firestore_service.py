@@ -2,6 +2,7 @@ import firebase_admin
 from firebase_admin import firestore
 from datetime import datetime
 import uuid
+import asyncio
 from typing import List, Dict, Any, Optional
 import json
 
@@ -22,12 +23,12 @@ class FirestoreService:
         return firestore.client()
     
     @staticmethod
-    async def create_chat(user_id: str, title: str) -> str:
+    async def create_chat(user_id: str, title: str, chat_id: Optional[str] = None) -> str:
         """Create a new chat for a user and return the chat ID"""
         db = FirestoreService.get_db()
         
-        # Generate a unique ID for the chat
-        chat_id = str(uuid.uuid4())
+        # Generate a unique ID for the chat unless the caller already picked one
+        chat_id = chat_id or str(uuid.uuid4())
         
         # Create chat document
         chat_ref = db.collection('chats').document(chat_id)
@@ -38,11 +39,12 @@ class FirestoreService:
             'user_id': user_id,
             'title': title,
             'created_at': firestore.SERVER_TIMESTAMP,
-            'updated_at': firestore.SERVER_TIMESTAMP
+            'updated_at': firestore.SERVER_TIMESTAMP,
+            'message_count': 0
         }
         
-        # Firestore set() is not actually async, so we don't use await
-        chat_ref.set(chat_data)
+        # Firestore set() is blocking, so run it off the event loop
+        await asyncio.to_thread(chat_ref.set, chat_data)
         logger.info(f"Created new chat {chat_id} for user {user_id}")
         
         return chat_id
@@ -52,7 +54,7 @@ class FirestoreService:
         """Get a chat by ID"""
         db = FirestoreService.get_db()
         chat_ref = db.collection('chats').document(chat_id)
-        chat_doc = chat_ref.get()  # Removed await
+        chat_doc = await asyncio.to_thread(chat_ref.get)
         
         if not chat_doc.exists:
             logger.warning(f"Chat {chat_id} not found")
@@ -86,7 +88,6 @@ class FirestoreService:
         
         # Add message to chat
         message_ref = db.collection('chats').document(chat_id).collection('messages').document(message_id)
-        message_ref.set(message_dict)  # Removed await
         
         # Update chat's updated_at timestamp
         # Only update last_message for user/assistant text messages (not function calls)
@@ -95,8 +96,13 @@ class FirestoreService:
         
         if message.type == MessageType.TEXT:
             update_data['last_message'] = message.content[:100]  # Store truncated message for preview
+            update_data['message_count'] = firestore.Increment(1)  # Drives rolling summary refreshes
         
-        chat_ref.update(update_data)  # Removed await
+        # Both writes go in one batch (one round trip), off the event loop
+        batch = db.batch()
+        batch.set(message_ref, message_dict)
+        batch.update(chat_ref, update_data)
+        await asyncio.to_thread(batch.commit)
         
         return message_id
     
@@ -109,7 +115,7 @@ class FirestoreService:
         messages_query = messages_ref.order_by('timestamp')
         
         messages = []
-        messages_docs = messages_query.get()  # Removed await
+        messages_docs = await asyncio.to_thread(messages_query.get)
         
         for doc in messages_docs:
             message_data = doc.to_dict()
@@ -122,6 +128,47 @@ class FirestoreService:
             
         return messages
     
+    @staticmethod
+    async def get_recent_chat_messages(chat_id: str, limit: int) -> List[Dict]:
+        """Get the most recent messages of a chat, oldest first"""
+        db = FirestoreService.get_db()
+        
+        messages_ref = db.collection('chats').document(chat_id).collection('messages')
+        messages_query = messages_ref.order_by('timestamp', direction=firestore.Query.DESCENDING).limit(limit)
+        
+        messages_docs = await asyncio.to_thread(messages_query.get)
+        
+        messages = []
+        for doc in reversed(list(messages_docs)):
+            message_data = doc.to_dict()
+            if 'type' not in message_data:
+                message_data['type'] = MessageType.TEXT.value
+            messages.append(message_data)
+        
+        return messages
+    
+    @staticmethod
+    async def update_chat_summary(chat_id: str, summary: str, summary_message_count: int, summary_until: str,
+                                  message_count: Optional[int] = None) -> bool:
+        """
+        Store the rolling summary, how many leading text messages it covers and the timestamp of the last one.
+        message_count, if given, corrects the chat's text message count.
+        """
+        db = FirestoreService.get_db()
+        chat_ref = db.collection('chats').document(chat_id)
+        
+        update_data = {
+            'summary': summary,
+            'summary_message_count': summary_message_count,
+            'summary_until': summary_until,
+            'summary_updated_at': firestore.SERVER_TIMESTAMP
+        }
+        if message_count is not None:
+            update_data['message_count'] = message_count
+        await asyncio.to_thread(chat_ref.update, update_data)
+        
+        return True
+    
     @staticmethod
     async def get_user_chats(user_id: str) -> List[ChatListItem]:
         """Get all chats for a user"""
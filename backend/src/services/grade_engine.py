@@ -0,0 +1,206 @@
+from src.services.course_index import CourseIndex
+from typing import Dict, Any, Optional
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Candidate scores evaluated at once when solving for a required score
+SOLVER_STEPS = 401
+
+
+class Gradebook:
+    """
+    One course's grading data as NumPy arrays, from the "grading" block stored at sync.
+
+    Grades are computed for a batch of score scenarios at once: a (k, n) matrix
+    with one row per scenario and NaN for ungraded work. Like Canvas, only graded
+    work counts, weighted groups are renormalized over the groups that have graded
+    work, and drop rules drop the lowest/highest percentages within a group
+    (never below one graded assignment, never the never_drop ones). Canvas picks
+    drops to maximize the group score, which can differ in rare mixed-points cases.
+    """
+
+    def __init__(self, grading: Dict[str, Any]):
+        self.groups = grading.get('groups', [])
+        self.apply_weights = bool(grading.get('apply_group_weights'))
+        self.assignment_ids = np.asarray(grading.get('assignment_ids', []), dtype=np.int64)
+        self.group_index = np.asarray(grading.get('group_index', []), dtype=np.int64)
+        self.points = np.asarray(grading.get('points_possible', []), dtype=np.float64)
+        self.scores = np.asarray([np.nan if score is None else score for score in grading.get('scores', [])],
+                                 dtype=np.float64)
+        self.counted = ~np.asarray(grading.get('omit_from_final', []), dtype=bool)
+        self.weights = np.asarray([group.get('weight') or 0 for group in self.groups], dtype=np.float64)
+        self.positions = {int(assignment_id): position for position, assignment_id in enumerate(self.assignment_ids)}
+
+        # One-hot assignment -> group matrix, so per-group sums are one matrix product per batch
+        self.membership = np.zeros((len(self.assignment_ids), len(self.groups)))
+        if len(self.assignment_ids):
+            self.membership[np.arange(len(self.assignment_ids)), self.group_index] = 1.0
+
+        never_drop = {int(assignment_id) for group in self.groups for assignment_id in group.get('never_drop', [])}
+        self.droppable = np.array([int(assignment_id) not in never_drop for assignment_id in self.assignment_ids], dtype=bool)
+
+    def scenario(self, overrides: Optional[Dict[int, float]] = None) -> np.ndarray:
+        """Current scores with hypothetical scores applied, as a (1, n) batch"""
+        scores = self.scores.copy()
+        for assignment_id, score in (overrides or {}).items():
+            position = self.positions.get(int(assignment_id))
+            if position is not None:
+                scores[position] = score
+        return scores[np.newaxis, :]
+
+    def _apply_drop_rules(self, scores: np.ndarray, included: np.ndarray) -> np.ndarray:
+        included = included.copy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = np.where(self.points > 0, scores / self.points, np.inf)
+
+        for position, group in enumerate(self.groups):
+            drop_lowest, drop_highest = group.get('drop_lowest', 0), group.get('drop_highest', 0)
+            if not drop_lowest and not drop_highest:
+                continue
+            columns = np.flatnonzero((self.group_index == position) & self.droppable)
+            if len(columns) == 0:
+                continue
+
+            for count, sign in ((drop_lowest, 1.0), (drop_highest, -1.0)):
+                if not count:
+                    continue
+                graded = included[:, columns]
+                group_size = included[:, self.group_index == position].sum(axis=1)
+                # Keep at least one graded assignment in the group
+                drops = np.minimum(count, np.maximum(group_size - 1, 0))
+                keys = np.where(graded, sign * percent[:, columns], np.inf)
+                ranks = np.argsort(np.argsort(keys, axis=1, kind='stable'), axis=1, kind='stable')
+                dropped = graded & (ranks < drops[:, np.newaxis])
+                included[:, columns] &= ~dropped
+
+        return included
+
+    def grade_breakdown(self, scores: np.ndarray) -> Dict[str, np.ndarray]:
+        """Per-scenario total percentage and per-group earned/possible points"""
+        included = ~np.isnan(scores) & self.counted
+        included = self._apply_drop_rules(scores, included)
+
+        earned = np.where(included, scores, 0.0) @ self.membership
+        possible = np.where(included, self.points, 0.0) @ self.membership
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if self.apply_weights and len(self.groups):
+                group_percent = np.where(possible > 0, earned / possible, 0.0)
+                active_weight = np.where(possible > 0, self.weights, 0.0)
+                total = (group_percent * self.weights).sum(axis=1) / active_weight.sum(axis=1) * 100
+            else:
+                total = earned.sum(axis=1) / possible.sum(axis=1) * 100
+
+        return {"percent": total, "earned": earned, "possible": possible}
+
+    def grades(self, scores: np.ndarray) -> np.ndarray:
+        """Total percentage for each scenario row, NaN where nothing counts yet"""
+        return self.grade_breakdown(scores)["percent"]
+
+    def required_score(self, assignment_id: int, target_percent: float,
+                       overrides: Optional[Dict[int, float]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lowest score on one assignment that reaches the target course percentage,
+        found by evaluating a grid of candidate scores as a single batch.
+        """
+        position = self.positions.get(int(assignment_id))
+        if position is None:
+            return None
+
+        points = self.points[position]
+        candidates = np.linspace(0.0, points, SOLVER_STEPS) if points > 0 else np.zeros(1)
+        batch = np.repeat(self.scenario(overrides), len(candidates), axis=0)
+        batch[:, position] = candidates
+        outcomes = self.grades(batch)
+
+        reaching = np.flatnonzero(outcomes >= target_percent - 1e-9)
+        if len(reaching) == 0:
+            return {"achievable": False, "required_score": None,
+                    "best_possible_percent": _rounded(np.nanmax(outcomes) if not np.all(np.isnan(outcomes)) else np.nan)}
+
+        first = reaching[0]
+        required = candidates[first]
+        if first > 0:
+            # Grades are linear between grid points without drops in play; interpolate for precision
+            low, high = outcomes[first - 1], outcomes[first]
+            if high > low:
+                required = candidates[first - 1] + (target_percent - low) / (high - low) * (candidates[first] - candidates[first - 1])
+
+        return {
+            "achievable": True,
+            "required_score": round(float(required), 2),
+            "required_percent_of_points": round(float(required / points * 100), 1) if points > 0 else None
+        }
+
+
+def _rounded(value: float) -> Optional[float]:
+    return None if value is None or np.isnan(value) else round(float(value), 2)
+
+
+class GradeService:
+    """Current and what-if grades from the cached snapshot, without the model or Canvas"""
+
+    @staticmethod
+    def course_grades(index: CourseIndex, course_id: int, hypothetical_scores: Optional[Dict[int, float]] = None,
+                      target_percent: Optional[float] = None,
+                      solve_for_assignment_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Grade report for a course: the current percentage, per-group breakdown, the
+        projected percentage with hypothetical scores, and optionally the score
+        needed on one assignment to reach a target percentage.
+        Returns None if the course is unknown or was synced without grading data.
+        """
+        course = index.get_course(course_id)
+        if course is None or not course.get('grading'):
+            return None
+
+        gradebook = Gradebook(course['grading'])
+        hypothetical_scores = {int(key): float(value) for key, value in (hypothetical_scores or {}).items()}
+        unknown = [assignment_id for assignment_id in hypothetical_scores if assignment_id not in gradebook.positions]
+
+        current = gradebook.grade_breakdown(gradebook.scenario())
+        projected = gradebook.grades(gradebook.scenario(hypothetical_scores))[0]
+
+        names = {assignment.get('id'): assignment.get('name') for assignment in course.get('assignments', [])}
+        report = {
+            "course_id": course_id,
+            "course_name": course.get('name'),
+            "weighted": gradebook.apply_weights,
+            "current_percent": _rounded(current["percent"][0]),
+            "groups": [{
+                "name": group.get('name'),
+                "weight": group.get('weight') if gradebook.apply_weights else None,
+                "earned": round(float(current["earned"][0, position]), 2),
+                "possible": round(float(current["possible"][0, position]), 2),
+                "percent": _rounded(current["earned"][0, position] / current["possible"][0, position] * 100)
+                if current["possible"][0, position] > 0 else None
+            } for position, group in enumerate(gradebook.groups)],
+            "ungraded_assignments": [
+                {"id": int(assignment_id), "name": names.get(int(assignment_id)), "points_possible": float(points)}
+                for assignment_id, points, score in zip(gradebook.assignment_ids, gradebook.points, gradebook.scores)
+                if np.isnan(score)
+            ]
+        }
+
+        if hypothetical_scores:
+            report["hypothetical_scores"] = {str(key): value for key, value in hypothetical_scores.items()}
+            report["projected_percent"] = _rounded(projected)
+        if unknown:
+            report["unknown_assignment_ids"] = unknown
+
+        if target_percent is not None and solve_for_assignment_id is not None:
+            required = gradebook.required_score(solve_for_assignment_id, target_percent, hypothetical_scores)
+            if required is None:
+                report["unknown_assignment_ids"] = sorted(set(unknown) | {solve_for_assignment_id})
+            else:
+                report["required"] = {
+                    "assignment_id": solve_for_assignment_id,
+                    "assignment_name": names.get(solve_for_assignment_id),
+                    "points_possible": float(gradebook.points[gradebook.positions[solve_for_assignment_id]]),
+                    "target_percent": target_percent,
+                    **required
+                }
+
+        return report
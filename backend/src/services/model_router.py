@@ -0,0 +1,65 @@
+from src.config.settings import get_settings
+from src.utils import metrics
+from typing import Dict
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+GREETING_PATTERN = re.compile(r"^(hi|hello|hey|thanks|thank you|ok|okay|cool|great|bye|good (morning|afternoon|evening))\b[\s!.?]*$", re.IGNORECASE)
+
+# Requests that need cross-course reasoning or a written plan rather than a lookup
+COMPLEX_PATTERN = re.compile(
+    r"\b(plan|planning|prioriti[sz]e|schedule|strategy|compare|explain|summari[sz]e|study|prepare|"
+    r"help me understand|should i|how (do|can|should) i|why|workload|overwhelmed|balance)\b",
+    re.IGNORECASE
+)
+COMPLEX_MIN_WORDS = 25  # Long messages are treated as complex regardless of wording
+
+# Mentions of Canvas data mean the first round will be spent choosing tools
+COURSE_DATA_PATTERN = re.compile(
+    r"\b(assignments?|homework|due|deadlines?|courses?|class(es)?|grades?|modules?|announcements?|exams?|quiz(zes)?|syllabus)\b",
+    re.IGNORECASE
+)
+
+
+def classify_message(message: str) -> str:
+    """Classify a user message as 'greeting', 'simple' (lookup) or 'complex' (synthesis)"""
+    text = message.strip()
+    if GREETING_PATTERN.match(text):
+        return "greeting"
+    if COMPLEX_PATTERN.search(text) or len(text.split()) >= COMPLEX_MIN_WORDS:
+        return "complex"
+    return "simple"
+
+
+def route_chat_round(message: str, round_index: int) -> Dict[str, str]:
+    """
+    Pick the model and reasoning effort for one round of a chat turn.
+
+    Round 0 mostly chooses which tools to call, so it runs at low effort unless the
+    message itself needs reasoning. Later rounds synthesize tool results into an
+    answer: medium effort for complex questions, low for simple lookups. The model
+    is fixed per turn because reasoning items are passed back between rounds.
+    """
+    kind = classify_message(message)
+    model = settings.CHAT_COMPLEX_MODEL if kind == "complex" and settings.CHAT_COMPLEX_MODEL else settings.CHAT_MODEL
+
+    if kind == "greeting":
+        effort, reason = "low", "greeting"
+    elif round_index == 0 and kind == "complex" and not COURSE_DATA_PATTERN.search(message):
+        effort, reason = "medium", "complex request answered without course data"
+    elif round_index == 0:
+        effort, reason = "low", f"{kind} request, tool selection"
+    elif kind == "complex":
+        effort, reason = "medium", "synthesis of tool results"
+    else:
+        effort, reason = "low", "simple lookup over tool results"
+
+    if round_index == 0:
+        metrics.increment(f"chat.router.model.{model}")
+    metrics.increment(f"chat.router.effort.{effort}")
+    logger.info(f"[Model Router] round {round_index}: model={model}, effort={effort} ({reason})")
+    return {"model": model, "effort": effort, "reason": reason}
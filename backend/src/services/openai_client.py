@@ -0,0 +1,18 @@
+from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from src.config.settings import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Shared by chat, plan generation and conversation summaries; the SDK is synchronous,
+# so calls run on the executor
+if settings.OPENAI_FAKE_CLIENT:
+    from src.utils.fake_openai import FakeOpenAI
+    logger.warning("Using the local fake OpenAI client (OPENAI_FAKE_CLIENT is set)")
+    client = FakeOpenAI()
+else:
+    client = OpenAI(api_key=settings.OPENAI_API_KEY)
+executor = ThreadPoolExecutor()
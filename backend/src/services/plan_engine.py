@@ -0,0 +1,236 @@
+from src.utils.timestamps import record_ts, filter_between
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from typing import List, Dict, Any, Optional
+import html
+import math
+import re
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Planning horizon and list sizes
+PLAN_HORIZON_DAYS = 14  # Open work due within this window is planned
+UPCOMING_DEADLINE_DAYS = 7  # Counted as upcomingDeadlines in the summary
+MAX_DEADLINES = 7
+MAX_RANKED_FOR_PROMPT = 15  # Highest-priority open assignments handed to the model
+
+# Score thresholds for the priority labels
+URGENT_SCORE = 40
+IMPORTANT_SCORE = 15
+
+DESCRIPTION_PREVIEW_CHARS = 140
+
+# Merged plan sizes and ordering for the cross-course prioritization pass
+MAX_TODOS = 10
+MAX_STUDY_BLOCKS = 5
+MAX_INSIGHTS = 4
+TODO_PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+INSIGHT_TYPE_ORDER = {"warning": 0, "info": 1, "tip": 2, "success": 3}
+
+# Fragment key for generated items that don't belong to a single course
+CROSS_COURSE_FRAGMENT = "crossCourse"
+FRAGMENT_SECTIONS = ("todos", "studyBlocks", "insights")
+
+
+def estimate_hours(points: Optional[float]) -> float:
+    """Rough effort estimate from point value, in half-hour steps between 0.5 and 6 hours"""
+    hours = 0.5 + (points or 0) / 25
+    return min(6.0, max(0.5, round(hours * 2) / 2))
+
+
+def is_graded(assignment: Dict[str, Any]) -> bool:
+    """Whether the student's work has a score; ungraded assignments store grade 'N/A'"""
+    return assignment.get('grade') not in (None, '', 'N/A')
+
+
+def score_assignment(assignment: Dict[str, Any], due_ts: float, now: float) -> float:
+    """
+    Priority score: due-date proximity × point weight × submission state.
+
+    Proximity halves with every day left, points add up to about 2x for a 100-point
+    assignment, and submitted or graded work is mostly discounted.
+    """
+    days_left = max(0.0, (due_ts - now) / 86400)
+    proximity = 1 / (1 + days_left)
+    points_weight = 1 + math.log1p(assignment.get('points_possible') or 0) / math.log1p(100)
+
+    if is_graded(assignment):
+        state = 0.1
+    elif assignment.get('has_submitted_submissions'):
+        state = 0.2
+    else:
+        state = 1.0
+
+    return round(100 * proximity * points_weight * state, 2)
+
+
+def _priority_label(score: float, days_left: float) -> str:
+    if score >= URGENT_SCORE or days_left <= 2:
+        return "urgent"
+    if score >= IMPORTANT_SCORE or days_left <= UPCOMING_DEADLINE_DAYS:
+        return "important"
+    return "normal"
+
+
+def _local_date(timestamp: float, time_zone: Optional[str]) -> str:
+    try:
+        tz = ZoneInfo(time_zone) if time_zone else timezone.utc
+    except Exception:
+        tz = timezone.utc
+    return datetime.fromtimestamp(timestamp, tz).strftime("%Y-%m-%d")
+
+
+def _preview(text: Optional[str]) -> str:
+    plain = re.sub(r"\s+", " ", html.unescape(re.sub(r"<[^>]+>", " ", text or ""))).strip()
+    if len(plain) > DESCRIPTION_PREVIEW_CHARS:
+        plain = plain[:DESCRIPTION_PREVIEW_CHARS].rsplit(" ", 1)[0] + "…"
+    return plain
+
+
+def rank_open_assignments(courses: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Assignments due within the planning horizon, highest priority score first"""
+    now = time.time() if now is None else now
+    horizon = now + PLAN_HORIZON_DAYS * 86400
+
+    ranked = []
+    for course in courses:
+        for assignment in filter_between(course.get('assignments', []), 'due_at', now, horizon):
+            due_ts = record_ts(assignment, 'due_at')
+            score = score_assignment(assignment, due_ts, now)
+            days_left = (due_ts - now) / 86400
+            ranked.append({
+                "id": assignment.get('id'),
+                "name": assignment.get('name', ''),
+                "course": course.get('code') or course.get('name', ''),
+                "due_date": _local_date(due_ts, course.get('time_zone')),
+                "days_left": round(days_left, 1),
+                "points": assignment.get('points_possible'),
+                "submitted": bool(assignment.get('has_submitted_submissions')),
+                "score": score,
+                "priority": _priority_label(score, days_left),
+                "estimated_hours": estimate_hours(assignment.get('points_possible')),
+                "description": _preview(assignment.get('description'))
+            })
+
+    ranked.sort(key=lambda item: (-item["score"], item["days_left"]))
+    return ranked
+
+
+def build_plan_skeleton(courses: List[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Compute the deterministic parts of a plan: ranked open work, the deadlines
+    list and the summary block. The model only writes todos, study blocks and insights.
+    """
+    start = time.perf_counter()
+    ranked = rank_open_assignments(courses, now)
+    open_items = [item for item in ranked if not item["submitted"]]
+
+    deadlines = []
+    for item in sorted(open_items[:MAX_DEADLINES], key=lambda item: item["days_left"]):
+        points = item["points"]
+        deadlines.append({
+            "id": f"deadline-{item['id']}",
+            "title": item["name"],
+            "course": item["course"],
+            "dueDate": item["due_date"],
+            "priority": item["priority"],
+            "points": int(points) if points is not None else None,
+            "description": item["description"] or None
+        })
+
+    study_hours = sum(item["estimated_hours"] for item in open_items)
+    summary = {
+        "totalTasks": len(open_items),
+        "highPriorityCount": sum(1 for item in open_items if item["priority"] == "urgent"),
+        "upcomingDeadlines": sum(1 for item in open_items if item["days_left"] <= UPCOMING_DEADLINE_DAYS),
+        "estimatedStudyTime": f"{study_hours:g} hours"
+    }
+
+    logger.info(f"📐 [Plan Engine] Ranked {len(ranked)} assignments ({len(open_items)} open) "
+                f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    return {
+        "ranked": ranked[:MAX_RANKED_FOR_PROMPT],
+        "deadlines": deadlines,
+        "summary": summary
+    }
+
+
+def _course_key(course: Dict[str, Any]) -> str:
+    return str(course.get('id'))
+
+
+def split_plan_into_fragments(sections: Dict[str, List[Dict[str, Any]]],
+                              courses: List[Dict[str, Any]]) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """
+    Split generated todos, study blocks and insights into per-course fragments by
+    their course code. Items without a recognizable course go to the cross-course fragment.
+    """
+    labels = {}
+    for course in courses:
+        for label in (course.get('code'), course.get('name')):
+            if label:
+                labels[str(label).strip().lower()] = _course_key(course)
+
+    fragments = {_course_key(course): {section: [] for section in FRAGMENT_SECTIONS} for course in courses}
+    fragments[CROSS_COURSE_FRAGMENT] = {section: [] for section in FRAGMENT_SECTIONS}
+
+    for section in FRAGMENT_SECTIONS:
+        for item in sections.get(section, []):
+            key = labels.get(str(item.get('course') or '').strip().lower(), CROSS_COURSE_FRAGMENT)
+            fragments[key][section].append(item)
+
+    return fragments
+
+
+def merge_plan_fragments(fragments: Dict[str, Dict[str, List[Dict[str, Any]]]],
+                         courses: List[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Cross-course prioritization pass over per-course fragments: todos by priority
+    then due date, study blocks by how much urgent work their course has, insights
+    warnings first. Each section is capped and item IDs are made unique.
+    """
+    # Course urgency is the total score of its open work within the planning horizon
+    urgency: Dict[str, float] = {}
+    for item in rank_open_assignments(courses, now):
+        if not item["submitted"]:
+            label = str(item["course"]).strip().lower()
+            urgency[label] = urgency.get(label, 0.0) + item["score"]
+
+    def course_urgency(item: Dict[str, Any]) -> float:
+        return urgency.get(str(item.get('course') or '').strip().lower(), 0.0)
+
+    course_keys = {_course_key(course) for course in courses} | {CROSS_COURSE_FRAGMENT}
+    merged: Dict[str, List[Dict[str, Any]]] = {section: [] for section in FRAGMENT_SECTIONS}
+    for key, fragment in fragments.items():
+        if key not in course_keys:
+            continue  # Course the user is no longer enrolled in
+        for section in FRAGMENT_SECTIONS:
+            merged[section].extend(fragment.get(section, []))
+
+    todos = sorted(merged["todos"], key=lambda item: (
+        TODO_PRIORITY_ORDER.get(item.get('priority'), len(TODO_PRIORITY_ORDER)),
+        item.get('dueDate') or "9999-12-31",
+        -course_urgency(item)
+    ))[:MAX_TODOS]
+    study_blocks = sorted(merged["studyBlocks"], key=lambda item: -course_urgency(item))[:MAX_STUDY_BLOCKS]
+    insights = sorted(merged["insights"], key=lambda item: (
+        INSIGHT_TYPE_ORDER.get(item.get('type'), len(INSIGHT_TYPE_ORDER)),
+        -course_urgency(item)
+    ))[:MAX_INSIGHTS]
+
+    seen_ids = set()
+    result = {"todos": todos, "studyBlocks": study_blocks, "insights": insights}
+    for section, items in result.items():
+        unique = []
+        for item in items:
+            item_id = str(item.get('id') or section)
+            if item_id in seen_ids:
+                item_id = f"{item_id}-{len(seen_ids)}"
+            seen_ids.add(item_id)
+            unique.append({**item, "id": item_id})
+        result[section] = unique
+
+    return result
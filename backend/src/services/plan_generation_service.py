@@ -0,0 +1,478 @@
+from src.services.course_service import CourseService
+from src.services.ai_planner_service import AIPlannerService
+from src.services.plan_engine import (
+    build_plan_skeleton, split_plan_into_fragments, merge_plan_fragments, CROSS_COURSE_FRAGMENT
+)
+from src.services.plan_prompt import (
+    build_course_payload, compact_json, PAYLOAD_LEGEND, PLAN_PAYLOAD_TOKEN_BUDGET, COURSE_FRAGMENT_TOKEN_BUDGET
+)
+from src.services.admission_control import admission_controller, Priority
+from src.services.openai_client import client, executor
+from src.config.settings import get_settings
+from src.models.ai_planner import AIPlannerResponse, TodoItem, DeadlineItem, StudyBlock, InsightCard
+from src.utils.json_stream import JsonArrayItemStream
+from src.utils import metrics
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Any, Optional, Callable, AsyncIterator, Iterator, Tuple, Type
+from datetime import datetime
+from functools import partial
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Called with (stage, percent) as a generation advances
+ProgressCallback = Callable[[str, int], None]
+
+
+# Plan sections streamed item by item, with the model each item must satisfy
+PLAN_SECTION_MODELS: Dict[str, Type[BaseModel]] = {
+    "todos": TodoItem,
+    "deadlines": DeadlineItem,
+    "studyBlocks": StudyBlock,
+    "insights": InsightCard
+}
+GENERATED_SECTIONS = ("todos", "studyBlocks", "insights")
+
+# Changed courses share one prompt; above this share of courses that prompt is nearly
+# as large as a global regeneration, which also refreshes the cross-course items
+MAX_INCREMENTAL_COURSE_SHARE = 1 / 3
+
+PLAN_ITEM_COUNTS = "5-10 todos, 3-5 study blocks, 2-4 insights"
+COURSE_FRAGMENT_ITEM_COUNTS = "1-4 todos, 1-2 study blocks and 0-1 insights per course"
+
+
+def validate_plan_item(section: str, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Item validated against its section's model, None if the section is unknown or the item invalid"""
+    model = PLAN_SECTION_MODELS.get(section)
+    if model is None:
+        return None
+    try:
+        return model(**item).model_dump()
+    except ValidationError as e:
+        logger.warning(f"🚀 [AI Planner] Dropping invalid {section} item: {e.errors()[:1]}")
+        return None
+
+
+def plan_response_events(response: AIPlannerResponse) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """The stream_plan events for a plan that is already complete, e.g. a cache hit"""
+    yield "summary", {
+        "summary": response.summary.model_dump(),
+        "course_count": response.course_count,
+        "assignment_count": response.assignment_count
+    }
+    for deadline in response.deadlines:
+        yield "deadlines", deadline.model_dump()
+    for section in GENERATED_SECTIONS:
+        for item in getattr(response, section):
+            yield section, item.model_dump()
+    yield "done", response.model_dump()
+
+
+def record_token_usage(usage: Any):
+    """Count model tokens spent on plans; the pre-generation batch budgets against these counters"""
+    if usage is None:
+        return
+    metrics.increment("planner.tokens.input", getattr(usage, "input_tokens", 0) or 0)
+    metrics.increment("planner.tokens.output", getattr(usage, "output_tokens", 0) or 0)
+
+
+def _report(progress: Optional[ProgressCallback], stage: str, percent: int):
+    if progress is not None:
+        progress(stage, percent)
+
+
+def _incremental_targets(cache_state: Optional[Dict[str, Any]],
+                         courses: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Courses whose fragments must be regenerated, or None when the plan needs a
+    global regeneration (no usable fragments, expired, or too much changed).
+    """
+    if not cache_state or cache_state['expired'] or not cache_state['fragments']:
+        return None
+
+    changed = set(cache_state['changed_course_ids'])
+    if len(changed) > len(courses) * MAX_INCREMENTAL_COURSE_SHARE:
+        return None
+    return [course for course in courses if str(course.get('id')) in changed]
+
+
+class PlanGenerationService:
+    """Builds AI planner responses, from the plan cache or a fresh model generation"""
+
+    @staticmethod
+    async def get_cached_plan_response(user_id: str) -> Optional[AIPlannerResponse]:
+        """
+        Cached plan if it matches the current course snapshot, None if it must be regenerated.
+
+        Courses are not loaded: deadlines and the summary are the ones stored with the
+        plan, minus deadlines that have passed since it was generated.
+        """
+        cached_data = await AIPlannerService.get_current_plan_document(user_id)
+        if not cached_data:
+            return None
+
+        logger.info(f"🚀 [AI Planner] Using cached plan! Skipping course load and AI generation")
+        cached_plan = cached_data['plan']
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        return AIPlannerResponse(
+            todos=cached_plan.get("todos", []),
+            deadlines=[deadline for deadline in cached_plan.get("deadlines", [])
+                       if (deadline.get("dueDate") or today) >= today],
+            studyBlocks=cached_plan.get("studyBlocks", []),
+            insights=cached_plan.get("insights", []),
+            summary=cached_plan.get("summary") or build_plan_skeleton([])["summary"],
+            generated_at=str(datetime.utcnow()),
+            course_count=cached_data.get("courseCount") or 0,
+            assignment_count=cached_data.get("assignmentCount") or 0
+        )
+
+    @staticmethod
+    async def load_courses(user_id: str) -> List[Dict[str, Any]]:
+        courses = await CourseService.get_user_courses(user_id, force=False)
+        logger.info(f"🚀 [AI Planner] Retrieved {len(courses) if courses else 0} courses")
+
+        if not courses:
+            logger.warning(f"🚀 [AI Planner] No courses found for user {user_id}")
+            raise HTTPException(status_code=404, detail="No courses found for user")
+        return courses
+
+    @staticmethod
+    async def _regenerate_fragments(user_id: str, cached_fragments: Dict[str, Dict[str, Any]],
+                                    changed_courses: List[Dict[str, Any]]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Regenerate the plan fragments of the changed courses with one prompt covering
+        all of them, keeping every other fragment. None if the regeneration fails.
+        """
+        fragments = dict(cached_fragments)
+        if not changed_courses:
+            logger.info(f"🚀 [AI Planner] No course content changed, re-merging cached fragments")
+            return fragments
+
+        logger.info(f"🚀 [AI Planner] Regenerating fragments for {len(changed_courses)} changed courses: "
+                    f"{[course.get('code') or course.get('name') for course in changed_courses]}")
+
+        token_budget = min(PLAN_PAYLOAD_TOKEN_BUDGET, COURSE_FRAGMENT_TOKEN_BUDGET * len(changed_courses))
+        course_data = format_course_data_for_ai(changed_courses, build_plan_skeleton(changed_courses), token_budget)
+        prompt = create_ai_planner_prompt(course_data, COURSE_FRAGMENT_ITEM_COUNTS)
+
+        async with admission_controller.admit(user_id, Priority.PLANNER):
+            json_response = await generate_structured_plan_with_ai(prompt, user_id)
+
+        try:
+            parsed = json.loads(json_response)
+        except json.JSONDecodeError:
+            logger.warning(f"🚀 [AI Planner] Fragments for changed courses were not valid JSON, "
+                           f"falling back to full regeneration")
+            return None
+
+        # Items naming none of the changed courses are dropped; the cached cross-course fragment stays
+        regenerated = split_plan_into_fragments(parsed, changed_courses)
+        unassigned = sum(map(len, regenerated.pop(CROSS_COURSE_FRAGMENT).values()))
+        if unassigned:
+            logger.info(f"🚀 [AI Planner] Dropped {unassigned} regenerated items without a changed course")
+        fragments.update(regenerated)
+
+        fragments.setdefault(CROSS_COURSE_FRAGMENT, {section: [] for section in GENERATED_SECTIONS})
+        return fragments
+
+    @staticmethod
+    async def stream_plan(user_id: str, force_regenerate: bool = False,
+                          progress: Optional[ProgressCallback] = None,
+                          on_courses_loaded: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+                          ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Produce a plan as (event, payload) pairs while it is generated.
+
+        The locally computed summary and deadlines come first, then every todo,
+        study block and insight as soon as the model has finished writing it,
+        and finally a "done" event with the complete plan. This is the only
+        generation path: it runs on a plan job, whether the plan was requested
+        by the streaming route, a polling client or the nightly pre-generation.
+        on_courses_loaded receives the course snapshot the plan is generated from.
+        """
+        _report(progress, "loading courses", 10)
+        courses = await PlanGenerationService.load_courses(user_id)
+        if on_courses_loaded is not None:
+            on_courses_loaded(courses)
+        total_assignments = sum(len(course.get('assignments', [])) for course in courses)
+        skeleton = build_plan_skeleton(courses)
+
+        yield "summary", {
+            "summary": skeleton["summary"],
+            "course_count": len(courses),
+            "assignment_count": total_assignments
+        }
+        for deadline in skeleton["deadlines"]:
+            yield "deadlines", deadline
+
+        sections: Dict[str, List[Dict[str, Any]]] = {section: [] for section in GENERATED_SECTIONS}
+
+        _report(progress, "checking cached plan", 20)
+        cache_state = None if force_regenerate else await AIPlannerService.get_plan_cache_state(user_id, courses)
+        targets = _incremental_targets(cache_state, courses)
+        cached_plan, fragments = None, None
+        if cache_state and cache_state['fresh']:
+            cached_plan = cache_state['plan']
+        elif targets is not None:
+            _report(progress, f"updating {len(targets)} changed courses", 40)
+            fragments = await PlanGenerationService._regenerate_fragments(user_id, cache_state['fragments'], targets)
+            if fragments is not None:
+                cached_plan = merge_plan_fragments(fragments, courses)
+                await AIPlannerService.save_ai_plan(user_id, {
+                    **cached_plan,
+                    "deadlines": skeleton["deadlines"],
+                    "summary": skeleton["summary"]
+                }, courses, fragments)
+
+        if cached_plan:
+            logger.info(f"🚀 [AI Planner] Streaming cached plan for user {user_id}")
+            for section in GENERATED_SECTIONS:
+                for item in cached_plan.get(section, []):
+                    validated = validate_plan_item(section, item)
+                    if validated is not None:
+                        sections[section].append(validated)
+                        yield section, validated
+        else:
+            _report(progress, "preparing course data", 30)
+            ai_prompt = create_ai_planner_prompt(format_course_data_for_ai(courses, skeleton))
+            parser = JsonArrayItemStream()
+            start = asyncio.get_event_loop().time()
+            first_item_logged = False
+
+            async with admission_controller.admit(user_id, Priority.PLANNER):
+                _report(progress, "generating plan", 40)
+                async for delta in stream_structured_plan_with_ai(ai_prompt, user_id):
+                    for section, item in parser.feed(delta):
+                        validated = validate_plan_item(section, item) if section in sections else None
+                        if validated is None:
+                            continue
+                        if not first_item_logged:
+                            logger.info(f"🚀 [AI Planner] First streamed item after "
+                                        f"{asyncio.get_event_loop().time() - start:.2f} seconds")
+                            first_item_logged = True
+                        sections[section].append(validated)
+                        _report(progress, "generating plan", min(85, 40 + 3 * sum(map(len, sections.values()))))
+                        yield section, validated
+
+            # A cut-off or unusable response must not be cached as the plan for the next 24 hours
+            if not parser.complete or not any(sections.values()):
+                logger.error(f"🚀 [AI Planner] Streamed plan for user {user_id} was "
+                             f"{'empty' if parser.complete else 'incomplete'}, not caching it")
+                metrics.increment("planner.stream.unusable")
+                yield "error", {"detail": "Failed to generate AI plan, please try again", "status": 502}
+                return
+
+            await AIPlannerService.save_ai_plan(user_id, {
+                **sections,
+                "deadlines": skeleton["deadlines"],
+                "summary": skeleton["summary"]
+            }, courses, split_plan_into_fragments(sections, courses))
+
+        _report(progress, "finalizing plan", 90)
+        response = AIPlannerResponse(
+            **sections,
+            deadlines=skeleton["deadlines"],
+            summary=skeleton["summary"],
+            generated_at=str(datetime.utcnow()),
+            course_count=len(courses),
+            assignment_count=total_assignments
+        )
+        yield "done", response.model_dump()
+
+
+def format_course_data_for_ai(courses: List[Dict[str, Any]], skeleton: Dict[str, Any],
+                              token_budget: int = PLAN_PAYLOAD_TOKEN_BUDGET) -> Dict[str, Any]:
+    """
+    Format course data into a compact, token-budgeted structure for AI consumption.
+    Assignments are represented by the locally ranked open work only.
+    """
+    payload, report = build_course_payload(courses, skeleton, token_budget)
+    logger.info(f"🚀 [AI Planner] Course payload: {len(payload['pr'])} ranked open assignments, "
+                f"~{report['estimated_tokens']} tokens (budget {token_budget}), filtered: {report['filtered']}, "
+                f"dropped: {report['dropped'] or 'nothing'}")
+    return payload
+
+
+def create_ai_planner_prompt(course_data: Dict[str, Any], item_counts: str = PLAN_ITEM_COUNTS) -> str:
+    """
+    Create a focused prompt for structured JSON academic planning.
+    Deadlines and summary counts are computed locally, so only todos, study blocks and insights are requested.
+    item_counts is per course when the prompt only covers the changed courses' fragments.
+    """
+    prompt = f"""
+You are an expert academic planner. Based on this Canvas course data, create a structured academic plan.
+
+"pr" lists the student's open assignments for the next 2 weeks, already ranked by urgency and weight,
+with a priority label, days left and an effort estimate in hours.
+{PAYLOAD_LEGEND}
+
+COURSE DATA:
+{compact_json(course_data)}
+
+RETURN ONLY valid JSON matching this exact structure:
+
+{{
+  "todos": [
+    {{
+      "id": "unique-id-1",
+      "title": "Complete Assignment Name", 
+      "description": "Brief description or next steps",
+      "priority": "high|medium|low",
+      "dueDate": "YYYY-MM-DD" or null,
+      "estimatedTime": "2 hours" or null,
+      "course": "Course Code" or null,
+      "completed": false
+    }}
+  ],
+  "studyBlocks": [
+    {{
+      "id": "unique-id-3",
+      "title": "Study Session Name",
+      "course": "Course Code",
+      "duration": "90 minutes",
+      "topics": ["Topic 1", "Topic 2"],
+      "difficulty": "easy|medium|hard"
+    }}
+  ],
+  "insights": [
+    {{
+      "id": "unique-id-4",
+      "type": "tip|warning|success|info",
+      "title": "Insight Title",
+      "message": "Helpful message or tip",
+      "action": "Suggested action" or null
+    }}
+  ]
+}}
+
+REQUIREMENTS:
+- Build todos from "pr", in that order; map urgent to high, important to medium, normal to low
+- Use the given due date and estimated hours for dueDate and estimatedTime
+- Use actual course codes and assignment names
+- Keep descriptions concise (1-2 sentences) and actionable
+- Generate {item_counts}
+- All IDs must be unique
+- Return ONLY the JSON, no other text
+"""
+    
+    return prompt
+
+
+async def generate_structured_plan_with_ai(prompt: str, user_id: str) -> str:
+    """
+    Generate todo list using OpenAI without saving to chat history
+    """
+    try:
+        logger.info(f"🤖 [AI Generation] Starting OpenAI generation for user: {user_id}")
+        logger.info(f"🤖 [AI Generation] Prompt length: {len(prompt)} characters")
+        logger.info(f"🤖 [AI Generation] Prompt preview: {prompt[:300]}...")
+        
+        # Build conversation input for AI
+        conversation_input = [{
+            "role": "system",
+            "content": "You are an expert academic planner. You analyze Canvas course data and return structured JSON plans with todos, study blocks, and insights. Always return valid JSON only, no markdown or explanation text."
+        }, {
+            "role": "user", 
+            "content": prompt
+        }]
+        
+        logger.info(f"🤖 [AI Generation] Conversation input prepared with {len(conversation_input)} messages")
+        
+        # Set up API call parameters (simpler than chat - no tools needed)
+        kwargs = {
+            "model": settings.CHAT_MODEL,
+            "store": False,  # Don't store this conversation
+            "reasoning": {"effort": "medium"},
+            "input": conversation_input
+        }
+        
+        logger.info(f"🤖 [AI Generation] API parameters set: model={kwargs['model']}, store={kwargs['store']}")
+        logger.info(f"🤖 [AI Generation] Making OpenAI API call...")
+        
+        # Make the API call
+        loop = asyncio.get_event_loop()
+        start_time = asyncio.get_event_loop().time()
+        
+        response = await loop.run_in_executor(
+            executor,
+            partial(client.responses.create, **kwargs)
+        )
+        
+        end_time = asyncio.get_event_loop().time()
+        record_token_usage(getattr(response, 'usage', None))
+        logger.info(f"🤖 [AI Generation] OpenAI API call completed in {end_time - start_time:.2f} seconds")
+        logger.info(f"🤖 [AI Generation] Response ID: {getattr(response, 'id', 'No ID')}")
+        logger.info(f"🤖 [AI Generation] Response has output_text: {hasattr(response, 'output_text') and response.output_text is not None}")
+        
+        # Extract the response content
+        if response.output_text:
+            logger.info(f"🤖 [AI Generation] Response text length: {len(response.output_text)} characters")
+            logger.info(f"🤖 [AI Generation] Response preview: {response.output_text[:200]}...")
+            return response.output_text
+        else:
+            # Fallback if no output_text
+            logger.warning(f"🤖 [AI Generation] No output_text in response, using fallback")
+            logger.info(f"🤖 [AI Generation] Response attributes: {dir(response)}")
+            return "I apologize, but I'm having trouble generating your personalized plan right now. Please try again in a moment."
+            
+    except Exception as e:
+        logger.error(f"🤖 [AI Generation] === ERROR IN AI GENERATION ===")
+        logger.error(f"🤖 [AI Generation] Error type: {type(e).__name__}")
+        logger.error(f"🤖 [AI Generation] Error message: {str(e)}")
+        logger.error(f"🤖 [AI Generation] Full error details:", exc_info=True)
+        return f"I encountered an error while creating your plan: {str(e)}. Please try again."
+
+
+async def stream_structured_plan_with_ai(prompt: str, user_id: str) -> AsyncIterator[str]:
+    """
+    Stream the plan JSON from OpenAI as text deltas.
+    The blocking stream is consumed on the shared executor and bridged through a queue.
+    """
+    kwargs = {
+        "model": settings.CHAT_MODEL,
+        "store": False,
+        "reasoning": {"effort": "medium"},
+        "stream": True,
+        "input": [{
+            "role": "system",
+            "content": "You are an expert academic planner. You analyze Canvas course data and return structured JSON plans with todos, study blocks, and insights. Always return valid JSON only, no markdown or explanation text."
+        }, {
+            "role": "user",
+            "content": prompt
+        }]
+    }
+
+    loop = asyncio.get_event_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    def consume():
+        try:
+            for event in client.responses.create(**kwargs):
+                if event.type == "response.output_text.delta":
+                    loop.call_soon_threadsafe(queue.put_nowait, event.delta)
+                elif event.type == "response.completed":
+                    record_token_usage(getattr(event.response, "usage", None))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+    logger.info(f"🤖 [AI Generation] Starting streamed OpenAI generation for user: {user_id}")
+    consumer = loop.run_in_executor(executor, consume)
+
+    while True:
+        chunk = await queue.get()
+        if chunk is finished:
+            break
+        if isinstance(chunk, Exception):
+            logger.error(f"🤖 [AI Generation] Streamed generation failed: {chunk}")
+            raise chunk
+        yield chunk
+
+    await consumer
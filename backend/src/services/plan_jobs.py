@@ -0,0 +1,200 @@
+from src.services.plan_generation_service import PlanGenerationService
+from src.services.ai_planner_service import create_course_data_hash
+from src.services.admission_control import AdmissionRejected
+from src.models.ai_planner import AIPlannerResponse, PlanJobStatus
+from src.config.settings import get_settings
+from src.utils import metrics
+from fastapi import HTTPException
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Finished jobs stay pollable for this long
+JOB_RETENTION_SECONDS = 900
+# A job shed by admission control waits and retries instead of failing
+MAX_ADMISSION_RETRIES = 5
+FINISHED_STATUSES = ("completed", "failed")
+# Sent once per job; a retried generation doesn't repeat them
+SKELETON_EVENTS = ("summary", "deadlines")
+
+
+class PlanJobManager:
+    """
+    Runs AI plan generations as background jobs on a fixed pool of worker tasks.
+
+    Each user has at most one active (queued or running) job; submitting again
+    returns that job instead of starting a second generation. A job records the
+    plan's stream events as they are generated, so any number of streaming
+    clients can follow it (replaying what they missed) while others poll it.
+    """
+
+    def __init__(self, workers: int):
+        self.worker_count = workers
+        self._jobs: Dict[str, PlanJobStatus] = {}
+        self._owners: Dict[str, str] = {}  # job_id -> user_id
+        self._active_by_user: Dict[str, str] = {}  # user_id -> job_id
+        self._finished_at: Dict[str, float] = {}
+        self._events: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        self._input_hashes: Dict[str, str] = {}  # job_id -> courseDataHash of the snapshot it generates from
+        self._updates: Dict[str, asyncio.Condition] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def submit(self, user_id: str, force_regenerate: bool = False) -> Tuple[PlanJobStatus, bool]:
+        """Queue a generation for the user. Returns (job, created); created is False for a deduplicated submit"""
+        self._prune()
+        self._ensure_workers()
+
+        active_id = self._active_by_user.get(user_id)
+        if active_id is not None:
+            metrics.increment("plan_jobs.deduplicated")
+            logger.info(f"📋 [Plan Jobs] User {user_id} already has job {active_id} in progress")
+            return self._jobs[active_id], False
+
+        job = PlanJobStatus(job_id=str(uuid.uuid4()), status="queued", stage="queued")
+        self._jobs[job.job_id] = job
+        self._owners[job.job_id] = user_id
+        self._active_by_user[user_id] = job.job_id
+        self._events[job.job_id] = []
+        self._updates[job.job_id] = asyncio.Condition()
+        self._queue.put_nowait((job.job_id, user_id, force_regenerate, time.perf_counter()))
+
+        metrics.increment("plan_jobs.submitted")
+        metrics.set_gauge("plan_jobs.queue_depth", self._queue.qsize())
+        logger.info(f"📋 [Plan Jobs] Queued job {job.job_id} for user {user_id} (force_regenerate={force_regenerate})")
+        return job, True
+
+    def has_active_job(self, user_id: str) -> bool:
+        return user_id in self._active_by_user
+
+    def active_input_hash(self, user_id: str) -> Optional[str]:
+        """courseDataHash of the snapshot the user's active job generates from, None before it has loaded courses"""
+        active_id = self._active_by_user.get(user_id)
+        return self._input_hashes.get(active_id) if active_id is not None else None
+
+    def get(self, job_id: str, user_id: str) -> Optional[PlanJobStatus]:
+        """Job status, only for the user who submitted it"""
+        if self._owners.get(job_id) != user_id:
+            return None
+        return self._jobs.get(job_id)
+
+    async def follow(self, job_id: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """The job's stream events from the start, then live until it finishes"""
+        job, events, updates = self._jobs[job_id], self._events[job_id], self._updates[job_id]
+        sent = 0
+        while True:
+            while sent < len(events):
+                yield events[sent]
+                sent += 1
+            if job.status in FINISHED_STATUSES:
+                return
+            async with updates:
+                await updates.wait_for(lambda: sent < len(events) or job.status in FINISHED_STATUSES)
+
+    async def _publish(self, job_id: str, event: Optional[Tuple[str, Dict[str, Any]]] = None):
+        if event is not None:
+            self._events[job_id].append(event)
+        async with self._updates[job_id]:
+            self._updates[job_id].notify_all()
+
+    def _ensure_workers(self):
+        # Workers are started lazily so they bind to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.worker_count:
+            self._workers.append(asyncio.create_task(self._worker(len(self._workers))))
+
+    async def _worker(self, number: int):
+        while True:
+            job_id, user_id, force_regenerate, queued_at = await self._queue.get()
+            metrics.set_gauge("plan_jobs.queue_depth", self._queue.qsize())
+            metrics.observe("plan_jobs.queue_wait_ms", (time.perf_counter() - queued_at) * 1000)
+            try:
+                await self._run(job_id, user_id, force_regenerate)
+            except Exception as e:
+                logger.error(f"📋 [Plan Jobs] Worker {number} crashed on job {job_id}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, user_id: str, force_regenerate: bool):
+        job = self._jobs[job_id]
+        start = time.perf_counter()
+
+        def progress(stage: str, percent: int):
+            job.stage = stage
+            job.progress = percent
+            job.updated_at = datetime.utcnow()
+
+        def courses_loaded(courses: List[Dict[str, Any]]):
+            self._input_hashes[job_id] = create_course_data_hash(courses)
+
+        job.status = "running"
+        progress("starting", 5)
+
+        failure: Optional[Dict[str, Any]] = None
+        try:
+            for attempt in range(MAX_ADMISSION_RETRIES + 1):
+                try:
+                    events = PlanGenerationService.stream_plan(user_id, force_regenerate, progress, courses_loaded)
+                    async for event, payload in events:
+                        if attempt > 0 and event in SKELETON_EVENTS:
+                            continue
+                        if event == "done":
+                            job.plan = AIPlannerResponse(**payload)
+                        elif event == "error":
+                            failure = payload
+                            continue  # Published below, once the job is marked failed
+                        await self._publish(job_id, (event, payload))
+                    break
+                except AdmissionRejected as e:
+                    if attempt == MAX_ADMISSION_RETRIES:
+                        raise
+                    progress("waiting for capacity", job.progress)
+                    await asyncio.sleep(e.retry_after)
+
+            if failure is None:
+                job.status = "completed"
+                progress("completed", 100)
+                metrics.increment("plan_jobs.completed")
+        except HTTPException as e:
+            failure = {"detail": str(e.detail), "status": e.status_code}
+        except AdmissionRejected as e:
+            failure = {"detail": e.detail, "status": e.status_code, "retry_after": e.retry_after}
+        except Exception as e:
+            logger.error(f"📋 [Plan Jobs] Job {job_id} failed: {e}", exc_info=True)
+            failure = {"detail": f"Failed to generate AI plan: {str(e)}", "status": 500}
+        finally:
+            if failure is not None:
+                job.status = "failed"
+                job.error = failure["detail"]
+                metrics.increment("plan_jobs.failed")
+                self._events[job_id].append(("error", failure))
+            job.updated_at = datetime.utcnow()
+            self._finished_at[job_id] = time.monotonic()
+            if self._active_by_user.get(user_id) == job_id:
+                del self._active_by_user[user_id]
+            self._input_hashes.pop(job_id, None)
+            metrics.observe("plan_jobs.run_ms", (time.perf_counter() - start) * 1000)
+            logger.info(f"📋 [Plan Jobs] Job {job_id} {job.status} in {time.perf_counter() - start:.1f}s")
+            await self._publish(job_id)
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [job_id for job_id, finished in self._finished_at.items() if now - finished > JOB_RETENTION_SECONDS]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+            self._owners.pop(job_id, None)
+            self._events.pop(job_id, None)
+            self._updates.pop(job_id, None)
+            del self._finished_at[job_id]
+
+
+plan_jobs = PlanJobManager(workers=settings.PLAN_JOB_WORKERS)
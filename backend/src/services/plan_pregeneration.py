@@ -0,0 +1,216 @@
+from src.services.ai_planner_service import AIPlannerService
+from src.services.plan_jobs import plan_jobs
+from src.services.user_activity import find_active_users
+from src.config.settings import get_settings
+from src.utils import metrics
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional
+import asyncio
+import json
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+PLAN_LIFETIME_HOURS = 24
+# Plans expiring within this many hours are regenerated ahead of time
+DEFAULT_EXPIRING_WITHIN_HOURS = 12
+
+
+def _tokens_used() -> float:
+    counters = metrics.snapshot()["counters"]
+    return counters.get("planner.tokens.input", 0) + counters.get("planner.tokens.output", 0)
+
+
+class PregenerationState:
+    """
+    Progress of one run, persisted as JSON after every user so an interrupted run
+    can resume. A state file from an earlier run (different run_id) is ignored.
+    """
+
+    def __init__(self, path: str, run_id: str):
+        self.path = path
+        self.data: Dict[str, Any] = {"run_id": run_id, "completed": {}, "failed": {}, "tokens_used": 0}
+
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    saved = json.load(f)
+                if saved.get("run_id") == run_id:
+                    self.data = saved
+                    logger.info(f"🌙 [Plan Pregeneration] Resuming run {run_id}: "
+                                f"{len(saved['completed'])} users already done, {saved['tokens_used']:.0f} tokens used")
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"🌙 [Plan Pregeneration] Ignoring unreadable state file {path}: {e}")
+
+    def is_done(self, user_id: str) -> bool:
+        return user_id in self.data["completed"]
+
+    def mark(self, user_id: str, outcome: str, tokens_used: float, error: Optional[str] = None):
+        self.data["tokens_used"] = tokens_used
+        if error is None:
+            self.data["completed"][user_id] = outcome
+            self.data["failed"].pop(user_id, None)
+        else:
+            self.data["failed"][user_id] = error
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.data, f)
+        os.replace(temp_path, self.path)
+
+
+async def plan_refresh_reason(user_id: str, expiring_within_hours: float) -> Optional[str]:
+    """Why the user's plan should be pre-generated ("stale" or "expiring"), None if it is fine"""
+    current = await AIPlannerService.get_current_plan_document(user_id)
+    if current is None:
+        return "stale"
+
+    last_updated = current["lastUpdated"]
+    expires_at = last_updated + timedelta(hours=PLAN_LIFETIME_HOURS)
+    if expires_at - datetime.now(timezone.utc) <= timedelta(hours=expiring_within_hours):
+        return "expiring"
+    return None
+
+
+async def _run_plan_job(user_id: str, force_regenerate: bool) -> Optional[Dict[str, Any]]:
+    """
+    Generate the user's plan on a plan job and wait for it; the job's failure
+    payload, or None on success. Going through the job queue keeps one generation
+    per user, so a user-triggered or sync-triggered job is joined rather than raced.
+    """
+    job, created = plan_jobs.submit(user_id, force_regenerate)
+    if not created and force_regenerate:
+        # The job we joined may reuse the expiring plan; wait for it, then force our own
+        await _wait_for_job(job.job_id)
+        job, _ = plan_jobs.submit(user_id, force_regenerate)
+    return await _wait_for_job(job.job_id)
+
+
+async def _wait_for_job(job_id: str) -> Optional[Dict[str, Any]]:
+    failure = None
+    async for event, payload in plan_jobs.follow(job_id):
+        if event == "error":
+            failure = payload
+    return failure
+
+
+async def run_pregeneration(active_days: int = settings.PLAN_PREGENERATION_ACTIVE_DAYS,
+                            concurrency: int = settings.PLAN_PREGENERATION_CONCURRENCY,
+                            max_tokens: int = settings.PLAN_PREGENERATION_MAX_TOKENS,
+                            max_users: Optional[int] = None,
+                            expiring_within_hours: float = DEFAULT_EXPIRING_WITHIN_HOURS,
+                            state_path: str = settings.PLAN_PREGENERATION_STATE_PATH,
+                            user_ids: Optional[List[str]] = None,
+                            dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Regenerate plans for recently active users whose plan is stale or about to expire.
+
+    Generations run as plan jobs, so they share the per-user deduplication and
+    admission retries of interactive requests. At most `concurrency` of them are
+    in flight at once, and no new generation starts
+    once the run has used `max_tokens` model tokens. Stale plans take the normal
+    path (per-course regeneration where possible); expiring ones are regenerated
+    in full. Progress is saved to `state_path`, so rerunning the same day skips
+    users that are already done and retries failures.
+    """
+    run_id = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    state = PregenerationState(state_path, run_id)
+    start = time.perf_counter()
+
+    if user_ids is None:
+        user_ids = await find_active_users(active_days)
+    pending = [user_id for user_id in user_ids if not state.is_done(user_id)]
+    if max_users is not None:
+        pending = pending[:max_users]
+
+    logger.info(f"🌙 [Plan Pregeneration] Run {run_id}: {len(user_ids)} active users, {len(pending)} to check, "
+                f"concurrency {concurrency}, token budget {max_tokens}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"regenerated": 0, "fresh": 0, "no_courses": 0, "failed": 0, "over_budget": 0}
+
+    # Token counters are process-wide, so spend is measured against a baseline for the whole run
+    tokens_resumed, tokens_baseline = state.data["tokens_used"], _tokens_used()
+
+    def spent() -> float:
+        return tokens_resumed + _tokens_used() - tokens_baseline
+
+    async def process(user_id: str):
+        async with semaphore:
+            if spent() >= max_tokens:
+                counts["over_budget"] += 1
+                return
+
+            reason = await plan_refresh_reason(user_id, expiring_within_hours)
+            if reason is None:
+                counts["fresh"] += 1
+                state.mark(user_id, "fresh", spent())
+                return
+            if dry_run:
+                logger.info(f"🌙 [Plan Pregeneration] Would regenerate plan for user {user_id} ({reason})")
+                counts["regenerated"] += 1
+                return
+
+            try:
+                failure = await _run_plan_job(user_id, force_regenerate=(reason == "expiring"))
+            except Exception as e:
+                logger.error(f"🌙 [Plan Pregeneration] Failed for user {user_id}: {e}", exc_info=True)
+                failure = {"detail": str(e), "status": 500}
+
+            if failure is None:
+                state.mark(user_id, reason, spent())
+                counts["regenerated"] += 1
+                metrics.increment("plan_pregeneration.regenerated")
+                return
+            if failure.get("status") == 404:
+                counts["no_courses"] += 1
+                state.mark(user_id, "no courses", spent())
+                return
+
+            state.mark(user_id, reason, spent(), error=failure["detail"])
+            counts["failed"] += 1
+            metrics.increment("plan_pregeneration.failed")
+
+    await asyncio.gather(*(process(user_id) for user_id in pending))
+
+    summary = {
+        "run_id": run_id,
+        **counts,
+        "tokens_used": spent(),
+        "seconds": round(time.perf_counter() - start, 1),
+        "dry_run": dry_run
+    }
+    logger.info(f"🌙 [Plan Pregeneration] Finished: {summary}")
+    return summary
+
+
+def _seconds_until_hour(hour: int) -> float:
+    now = datetime.now(timezone.utc)
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+async def run_nightly_schedule(hour: int = settings.PLAN_PREGENERATION_HOUR_UTC):
+    """
+    Run the pre-generation every day at `hour` UTC. Started from the app when
+    PLAN_PREGENERATION_HOUR_UTC is set; enable it on a single instance only, or
+    use scripts/pregenerate_plans.py from cron instead.
+    """
+    while True:
+        delay = _seconds_until_hour(hour)
+        logger.info(f"🌙 [Plan Pregeneration] Next run in {delay / 3600:.1f} hours")
+        await asyncio.sleep(delay)
+        try:
+            await run_pregeneration()
+        except Exception as e:
+            logger.error(f"🌙 [Plan Pregeneration] Run failed: {e}", exc_info=True)
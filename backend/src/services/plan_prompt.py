@@ -0,0 +1,173 @@
+from src.utils.timestamps import record_ts
+from src.utils.tokens import estimate_token_count
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
+import html
+import json
+import re
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Token budgets for the course payload embedded in planner prompts
+PLAN_PAYLOAD_TOKEN_BUDGET = 3000
+COURSE_FRAGMENT_TOKEN_BUDGET = 1200
+
+ANNOUNCEMENT_WINDOW_DAYS = 14  # Older announcements are not sent
+MAX_ANNOUNCEMENTS_PER_COURSE = 3
+MAX_MODULES_PER_COURSE = 5
+ANNOUNCEMENT_PREVIEW_CHARS = 200
+SHORT_ANNOUNCEMENT_CHARS = 80
+MIN_PRIORITIES = 3  # Truncation never drops below this many ranked assignments
+
+# Short keys used in the payload; the prompt includes this legend
+PRIORITY_KEYS = {
+    "name": "n",
+    "course": "c",
+    "due_date": "due",
+    "days_left": "d",
+    "points": "pts",
+    "priority": "p",
+    "estimated_hours": "h",
+    "description": "desc"
+}
+PAYLOAD_LEGEND = (
+    'Keys: "pr" = open assignments ranked by urgency and weight, each with n=name, c=course, '
+    'due=due date, d=days left, pts=points, p=priority label, h=estimated hours, desc=description; '
+    '"cs" = courses with n=name, c=code, ann=recent announcements [title, posted date, preview], '
+    'mod=unfinished module names.'
+)
+
+
+def compact_json(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def estimate_payload_tokens(payload: Dict[str, Any]) -> int:
+    return estimate_token_count(compact_json(payload))
+
+
+def _plain_preview(text: str, limit: int) -> str:
+    plain = re.sub(r"\s+", " ", html.unescape(re.sub(r"<[^>]+>", " ", text or ""))).strip()
+    return plain if len(plain) <= limit else plain[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def build_course_payload(courses: List[Dict[str, Any]], skeleton: Dict[str, Any],
+                         token_budget: int = PLAN_PAYLOAD_TOKEN_BUDGET) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Compact planner payload within a token budget, and a report of what was left out.
+
+    Only unsubmitted work from the ranked skeleton, announcements from the last
+    two weeks and unfinished modules are included. When the payload is still over
+    budget it is truncated in a fixed order, least important first: announcement
+    previews are shortened, then announcements, modules and assignment
+    descriptions are dropped from the back, and finally the lowest-ranked
+    assignments (keeping at least MIN_PRIORITIES).
+    """
+    cutoff = time.time() - ANNOUNCEMENT_WINDOW_DAYS * 86400
+    report = {"filtered": {"submitted": 0, "old_announcements": 0, "completed_modules": 0}, "dropped": {}}
+
+    priorities = []
+    for item in skeleton["ranked"]:
+        if item["submitted"]:
+            report["filtered"]["submitted"] += 1
+            continue
+        priorities.append({short: item[key] for key, short in PRIORITY_KEYS.items() if item.get(key) not in (None, "")})
+
+    course_entries = []
+    for course in courses:
+        announcements = []
+        for announcement in course.get('announcements', []):
+            posted_ts = record_ts(announcement, 'posted_at')
+            if posted_ts is None or posted_ts < cutoff:
+                report["filtered"]["old_announcements"] += 1
+                continue
+            if len(announcements) < MAX_ANNOUNCEMENTS_PER_COURSE:
+                announcements.append([
+                    announcement.get('title', ''),
+                    str(announcement.get('posted_at', ''))[:10],
+                    _plain_preview(announcement.get('message', ''), ANNOUNCEMENT_PREVIEW_CHARS)
+                ])
+
+        modules = []
+        for module in course.get('modules', []):
+            if module.get('completed_at') is not None:
+                report["filtered"]["completed_modules"] += 1
+            elif len(modules) < MAX_MODULES_PER_COURSE:
+                modules.append(module.get('name', ''))
+
+        entry = {"n": course.get('name', 'Unknown Course'), "c": course.get('code', '')}
+        if announcements:
+            entry["ann"] = announcements
+        if modules:
+            entry["mod"] = modules
+        course_entries.append(entry)
+
+    payload = {
+        "today": datetime.utcnow().strftime("%Y-%m-%d"),
+        "open": skeleton["summary"]["totalTasks"],
+        "pr": priorities,
+        "cs": course_entries
+    }
+
+    def over_budget() -> bool:
+        return estimate_payload_tokens(payload) > token_budget
+
+    def count(reason: str):
+        report["dropped"][reason] = report["dropped"].get(reason, 0) + 1
+
+    # Truncation steps, applied in order until the payload fits
+    def shorten_announcements() -> bool:
+        for entry in reversed(course_entries):
+            for announcement in reversed(entry.get("ann", [])):
+                if len(announcement[2]) > SHORT_ANNOUNCEMENT_CHARS:
+                    announcement[2] = _plain_preview(announcement[2], SHORT_ANNOUNCEMENT_CHARS)
+                    count("announcement_previews_shortened")
+                    return True
+        return False
+
+    def drop_from_courses(key: str, reason: str) -> bool:
+        for entry in reversed(course_entries):
+            if entry.get(key):
+                entry[key].pop()
+                if not entry[key]:
+                    del entry[key]
+                count(reason)
+                return True
+        return False
+
+    def drop_description() -> bool:
+        for item in reversed(priorities):
+            if "desc" in item:
+                del item["desc"]
+                count("assignment_descriptions")
+                return True
+        return False
+
+    def drop_priority() -> bool:
+        if len(priorities) <= MIN_PRIORITIES:
+            return False
+        priorities.pop()
+        count("assignments")
+        return True
+
+    steps = [
+        shorten_announcements,
+        lambda: drop_from_courses("ann", "announcements"),
+        lambda: drop_from_courses("mod", "modules"),
+        drop_description,
+        drop_priority
+    ]
+    for step in steps:
+        while over_budget() and step():
+            pass
+
+    report["estimated_tokens"] = estimate_payload_tokens(payload)
+    report["token_budget"] = token_budget
+    report["over_budget"] = report["estimated_tokens"] > token_budget
+
+    if report["dropped"]:
+        logger.info(f"📐 [Plan Prompt] Truncated payload to ~{report['estimated_tokens']} tokens "
+                    f"(budget {token_budget}), dropped: {report['dropped']}")
+    return payload, report
@@ -0,0 +1,75 @@
+from src.config.firebase import db
+from src.config.settings import get_settings
+from src.utils import metrics
+from typing import Dict, Set
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class PlanRefreshScheduler:
+    """
+    Regenerates AI plans in the background when a course sync changes plan-relevant data.
+
+    Signals are debounced per user, so a burst of syncs leads to one regeneration,
+    which runs through the plan job queue. Users who have never generated a plan
+    are skipped.
+    """
+
+    def __init__(self, debounce_seconds: float):
+        self.debounce_seconds = debounce_seconds
+        self._pending: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def notify_courses_changed(self, user_id: str, course_data_hash: str):
+        """Called after a sync stored course data with a different hash"""
+        metrics.increment("plan_refresh.signals")
+        pending = self._pending.pop(user_id, None)
+        if pending is not None:
+            pending.cancel()
+
+        loop = asyncio.get_running_loop()
+        self._pending[user_id] = loop.call_later(self.debounce_seconds, self._start_refresh, user_id, course_data_hash)
+        logger.info(f"📋 [Plan Refresh] Course data changed for user {user_id}, "
+                    f"regenerating plan in {self.debounce_seconds:.0f}s")
+
+    def _start_refresh(self, user_id: str, course_data_hash: str):
+        task = asyncio.create_task(self._refresh(user_id, course_data_hash))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, user_id: str, course_data_hash: str):
+        self._pending.pop(user_id, None)
+
+        from src.services.plan_jobs import plan_jobs
+        if plan_jobs.has_active_job(user_id):
+            # The sync may have run inside that job (the planner's own course refresh)
+            if plan_jobs.active_input_hash(user_id) == course_data_hash:
+                metrics.increment("plan_refresh.skipped_covered_by_job")
+                logger.info(f"📋 [Plan Refresh] Active job for user {user_id} already uses the new course data")
+                return
+            # A job started before the sync may be working from the old snapshot; check again once it's done
+            self.notify_courses_changed(user_id, course_data_hash)
+            return
+
+        try:
+            plan_doc = await asyncio.to_thread(
+                db.collection('aiPlans').document(user_id).get, field_paths=['lastUpdated']
+            )
+        except Exception as e:
+            logger.error(f"📋 [Plan Refresh] Failed to check plan for user {user_id}: {str(e)}")
+            return
+
+        if not plan_doc.exists:
+            metrics.increment("plan_refresh.skipped_no_plan")
+            return
+
+        job, _ = plan_jobs.submit(user_id)
+        metrics.increment("plan_refresh.enqueued")
+        logger.info(f"📋 [Plan Refresh] Queued background regeneration {job.job_id} for user {user_id}")
+
+
+plan_refresh_scheduler = PlanRefreshScheduler(debounce_seconds=settings.PLAN_REFRESH_DEBOUNCE_SECONDS)
@@ -0,0 +1,97 @@
+from src.utils import metrics
+from typing import Dict, Any, Optional, Tuple
+import json
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How long tool results are reused across turns of the same chat
+CHAT_MEMO_TTL_SECONDS = 120
+MAX_CACHED_CHATS = 500
+
+
+class ToolResultMemo:
+    """
+    Memo of tool results keyed by (tool name, canonical arguments, snapshot version).
+
+    One memo is shared by every round of a generate_response call; memos are kept
+    per chat for a short TTL so follow-up turns can reuse results too.
+    """
+
+    def __init__(self, ttl_seconds: float = CHAT_MEMO_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._results: Dict[Tuple[str, str, Optional[str]], Tuple[str, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(name: str, arguments: Dict[str, Any], version: Optional[str]) -> Tuple[str, str, Optional[str]]:
+        canonical_args = json.dumps(arguments, sort_keys=True, separators=(',', ':'), default=str)
+        return (name, canonical_args, version)
+
+    def get(self, name: str, arguments: Dict[str, Any], version: Optional[str]) -> Optional[str]:
+        key = self.make_key(name, arguments, version)
+        entry = self._results.get(key)
+        metrics.increment("tool_memo.lookups")
+
+        if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+            self.hits += 1
+            metrics.increment("tool_memo.hits")
+            return entry[0]
+
+        if entry is not None:
+            del self._results[key]
+
+        self.misses += 1
+        metrics.increment("tool_memo.misses")
+        return None
+
+    def put(self, name: str, arguments: Dict[str, Any], version: Optional[str], result: str):
+        self._results[self.make_key(name, arguments, version)] = (result, time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._results)
+        }
+
+    def log_stats(self, label: str):
+        stats = self.stats()
+        logger.info(f"[Tool Memo] {label}: {stats['hits']} hits, {stats['misses']} misses "
+                    f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries; "
+                    f"process hit rate {metrics.ratio('tool_memo.hits', 'tool_memo.lookups'):.0%}")
+
+
+# chat_id -> (memo, last_used)
+_chat_memos: Dict[str, Tuple[ToolResultMemo, float]] = {}
+
+
+def get_chat_memo(chat_id: Optional[str]) -> ToolResultMemo:
+    """Memo shared by the turns of one chat, fresh if the chat has been idle past the TTL"""
+    now = time.monotonic()
+
+    if not chat_id:
+        return ToolResultMemo()
+
+    cached = _chat_memos.get(chat_id)
+    if cached and now - cached[1] < CHAT_MEMO_TTL_SECONDS:
+        memo = cached[0]
+        memo.hits = memo.misses = 0  # Stats are reported per turn
+    else:
+        memo = ToolResultMemo()
+
+    _chat_memos[chat_id] = (memo, now)
+
+    # Drop idle chats so the registry stays bounded
+    if len(_chat_memos) > MAX_CACHED_CHATS:
+        expired = [cid for cid, (_, used) in _chat_memos.items() if now - used >= CHAT_MEMO_TTL_SECONDS]
+        for cid in expired:
+            del _chat_memos[cid]
+        while len(_chat_memos) > MAX_CACHED_CHATS:
+            del _chat_memos[next(iter(_chat_memos))]
+
+    return memo
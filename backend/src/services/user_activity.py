@@ -0,0 +1,38 @@
+from src.config.firebase import db
+from google.cloud import firestore
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# lastActiveAt is written at most this often per user and process
+ACTIVITY_WRITE_INTERVAL_SECONDS = 6 * 3600
+
+_last_recorded: Dict[str, float] = {}
+
+
+def _write_activity(user_id: str):
+    try:
+        db.collection('users').document(user_id).update({'lastActiveAt': firestore.SERVER_TIMESTAMP})
+    except Exception as e:
+        logger.warning(f"Failed to record activity for user {user_id}: {str(e)}")
+
+
+def record_activity(user_id: str):
+    """Mark the user as active, without blocking the request that triggered it"""
+    now = time.monotonic()
+    if now - _last_recorded.get(user_id, float('-inf')) < ACTIVITY_WRITE_INTERVAL_SECONDS:
+        return
+    _last_recorded[user_id] = now
+    asyncio.get_running_loop().run_in_executor(None, _write_activity, user_id)
+
+
+async def find_active_users(days: int) -> List[str]:
+    """IDs of users seen within the last `days` days"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    query = db.collection('users').where('lastActiveAt', '>=', cutoff).select(['lastActiveAt'])
+    docs = await asyncio.to_thread(lambda: list(query.stream()))
+    return [doc.id for doc in docs]
@@ -0,0 +1,163 @@
+from src.services.course_index import CourseIndex
+from src.services.plan_engine import is_graded
+from src.utils.timestamps import record_ts
+from fastapi import HTTPException
+from collections import OrderedDict
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_FORECAST_WEEKS = 12
+MAX_CACHED_USERS = 500
+
+# Per-user assignment arrays, rebuilt when the course index is rebuilt: user_id -> (index, arrays),
+# least recently used first
+_arrays_cache: "OrderedDict[str, Tuple[CourseIndex, Dict[str, np.ndarray]]]" = OrderedDict()
+
+
+def is_valid_time_zone(time_zone: str) -> bool:
+    try:
+        ZoneInfo(time_zone)
+        return True
+    except Exception:
+        return False
+
+
+def _assignment_arrays(courses: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Columnar view of every dated assignment: due time, course position, points, submitted"""
+    due, course_pos, points, submitted = [], [], [], []
+    for position, course in enumerate(courses):
+        for assignment in course.get('assignments', []):
+            due_ts = record_ts(assignment, 'due_at')
+            if due_ts is None:
+                continue
+            due.append(due_ts)
+            course_pos.append(position)
+            points.append(assignment.get('points_possible') or 0)
+            submitted.append(bool(assignment.get('has_submitted_submissions')) or is_graded(assignment))
+
+    points_array = np.asarray(points, dtype=np.float64)
+    # Same rule as plan_engine.estimate_hours, vectorized: half-hour steps between 0.5 and 6 hours
+    hours = np.clip(np.round((0.5 + points_array / 25) * 2) / 2, 0.5, 6.0)
+    return {
+        "due": np.asarray(due, dtype=np.int64),
+        "course": np.asarray(course_pos, dtype=np.int64),
+        "points": points_array,
+        "hours": hours,
+        "submitted": np.asarray(submitted, dtype=bool)
+    }
+
+
+def _day_boundaries(time_zone: str, now: float, day_count: int) -> Tuple[np.ndarray, np.datetime64]:
+    """Epoch seconds of each local midnight from today through the end of the window, and today's date"""
+    tz = ZoneInfo(time_zone)
+    today = datetime.fromtimestamp(now, tz).date()
+    start_day = np.datetime64(today.isoformat(), 'D')
+    # Midnights are computed per day so DST changes inside the window land on the right day
+    midnights = [
+        datetime.combine(date.item(), datetime.min.time(), tz).timestamp()
+        for date in start_day + np.arange(day_count + 1)
+    ]
+    return np.asarray(midnights, dtype=np.float64), start_day
+
+
+def _series(counts: np.ndarray, open_counts: np.ndarray, points: np.ndarray, hours: np.ndarray) -> Dict[str, list]:
+    return {
+        "assignments": counts.astype(int).tolist(),
+        "open_assignments": open_counts.astype(int).tolist(),
+        "points": np.round(points, 2).tolist(),
+        "hours": np.round(hours, 2).tolist()
+    }
+
+
+def build_forecast(courses: List[Dict[str, Any]], weeks: int, time_zone: str, now: Optional[float] = None,
+                   arrays: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+    """
+    Per-day and per-course histograms of due assignments for the next `weeks` weeks.
+
+    Days are calendar days in `time_zone` starting today (UTC if the zone is
+    unknown, and the response names the zone used). Points and hours count open
+    (unsubmitted, ungraded) work only; assignment counts include everything due.
+    """
+    if not is_valid_time_zone(time_zone):
+        logger.warning(f"[Workload Forecast] Unknown time zone {time_zone}, using UTC")
+        time_zone = "UTC"
+    now = time.time() if now is None else now
+    arrays = arrays if arrays is not None else _assignment_arrays(courses)
+    day_count = weeks * 7
+    course_count = len(courses)
+
+    # Bin due times into local calendar days by searching the day boundaries
+    boundaries, start_day = _day_boundaries(time_zone, now, day_count)
+    day_index = np.searchsorted(boundaries, arrays["due"], side='right') - 1
+
+    in_window = (day_index >= 0) & (day_index < day_count)
+    day_index = day_index[in_window]
+    course_index = arrays["course"][in_window]
+    open_mask = ~arrays["submitted"][in_window]
+    open_points = np.where(open_mask, arrays["points"][in_window], 0.0)
+    open_hours = np.where(open_mask, arrays["hours"][in_window], 0.0)
+
+    # One bincount over course * days + day gives every course's daily histogram at once
+    cells = course_index * day_count + day_index
+    size = course_count * day_count
+    grid_shape = (course_count, day_count)
+    counts = np.bincount(cells, minlength=size).reshape(grid_shape)
+    open_counts = np.bincount(cells, weights=open_mask, minlength=size).reshape(grid_shape)
+    points = np.bincount(cells, weights=open_points, minlength=size).reshape(grid_shape)
+    hours = np.bincount(cells, weights=open_hours, minlength=size).reshape(grid_shape)
+
+    daily = [grid.sum(axis=0) for grid in (counts, open_counts, points, hours)]
+    weekly = [values.reshape(weeks, 7).sum(axis=1) for values in daily]
+    days = (start_day + np.arange(day_count)).astype(str).tolist()
+    peak = int(np.argmax(daily[3])) if daily[3].any() else None
+
+    return {
+        "start_date": days[0],
+        "days": days,
+        "time_zone": time_zone,
+        "daily": _series(*daily),
+        "weekly": _series(*weekly),
+        "courses": [{
+            "id": course.get('id'),
+            "name": course.get('name'),
+            "code": course.get('code'),
+            "daily": _series(counts[row], open_counts[row], points[row], hours[row]),
+            "total_points": round(float(points[row].sum()), 2),
+            "total_hours": round(float(hours[row].sum()), 2)
+        } for row, course in enumerate(courses)],
+        "peak_day": days[peak] if peak is not None else None
+    }
+
+
+class WorkloadForecastService:
+    """Workload forecasts over the cached course snapshot"""
+
+    @staticmethod
+    def forecast(user_id: str, index: CourseIndex, weeks: int, time_zone: Optional[str] = None) -> Dict[str, Any]:
+        start = time.perf_counter()
+        if time_zone and not is_valid_time_zone(time_zone):
+            raise HTTPException(status_code=422, detail=f"Unknown time zone: {time_zone}")
+
+        cached = _arrays_cache.get(user_id)
+        if cached is not None and cached[0] is index:
+            arrays = cached[1]
+            _arrays_cache.move_to_end(user_id)
+        else:
+            arrays = _assignment_arrays(index.courses)
+            _arrays_cache[user_id] = (index, arrays)
+            while len(_arrays_cache) > MAX_CACHED_USERS:
+                _arrays_cache.popitem(last=False)
+
+        # Default to the time zone of the first course, which Canvas sets per course
+        time_zone = time_zone or next((course.get('time_zone') for course in index.courses if course.get('time_zone')), "UTC")
+        forecast = build_forecast(index.courses, weeks, time_zone, arrays=arrays)
+
+        logger.info(f"[Workload Forecast] {len(arrays['due'])} dated assignments, {len(index.courses)} courses, "
+                    f"{weeks} weeks in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return forecast
@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+from typing import List, Dict, Any, Iterator, Optional
+import json
+import random
+import time
+import uuid
+
+# Rough model timings: time to first token, then output throughput
+DEFAULT_FIRST_TOKEN_SECONDS = 1.5
+DEFAULT_TOKENS_PER_SECOND = 80
+STREAM_CHUNK_CHARS = 24
+
+PRIORITY_MAP = {"urgent": "high", "important": "medium", "normal": "low"}
+
+
+class _FakeResponses:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        return self._owner._create(**kwargs)
+
+
+class FakeOpenAI:
+    """
+    Local stand-in for the OpenAI client's Responses API, for offline load tests.
+
+    Planner prompts get a valid plan built from the prompt's ranked assignments;
+    anything else gets a short text answer. Latency scales with output length and
+    usage is reported like the real API, so admission control, token budgets and
+    streaming behave realistically. Enabled with OPENAI_FAKE_CLIENT=true.
+    """
+
+    def __init__(self, first_token_seconds: float = DEFAULT_FIRST_TOKEN_SECONDS,
+                 tokens_per_second: float = DEFAULT_TOKENS_PER_SECOND, seed: Optional[int] = None):
+        self.first_token_seconds = first_token_seconds
+        self.tokens_per_second = tokens_per_second
+        self.responses = _FakeResponses(self)
+        self._random = random.Random(seed)
+
+    def _create(self, input: List[Dict[str, Any]], stream: bool = False, **kwargs):
+        prompt = "\n".join(str(message.get("content", "")) for message in input if isinstance(message, dict))
+        text = self._plan_json(prompt) if "academic planner" in prompt else "This is a simulated response."
+        usage = SimpleNamespace(input_tokens=len(prompt) // 4, output_tokens=len(text) // 4)
+        response = SimpleNamespace(id=f"resp_fake_{uuid.uuid4().hex[:12]}", output=[], output_text=text, usage=usage)
+
+        if stream:
+            return self._stream(text, response)
+
+        time.sleep(self._latency(usage.output_tokens))
+        return response
+
+    def _latency(self, output_tokens: int) -> float:
+        jitter = self._random.uniform(0.8, 1.25)
+        return (self.first_token_seconds + output_tokens / self.tokens_per_second) * jitter
+
+    def _stream(self, text: str, response) -> Iterator[SimpleNamespace]:
+        time.sleep(self.first_token_seconds * self._random.uniform(0.8, 1.25))
+        chunk_delay = STREAM_CHUNK_CHARS / 4 / self.tokens_per_second
+        for start in range(0, len(text), STREAM_CHUNK_CHARS):
+            time.sleep(chunk_delay)
+            yield SimpleNamespace(type="response.output_text.delta", delta=text[start:start + STREAM_CHUNK_CHARS])
+        yield SimpleNamespace(type="response.completed", response=response)
+
+    @staticmethod
+    def _ranked_assignments(prompt: str) -> List[Dict[str, Any]]:
+        marker = "COURSE DATA:\n"
+        if marker not in prompt:
+            return []
+        line = prompt.split(marker, 1)[1].split("\n", 1)[0]
+        try:
+            return json.loads(line).get("pr", [])
+        except (json.JSONDecodeError, AttributeError):
+            return []
+
+    def _plan_json(self, prompt: str) -> str:
+        ranked = self._ranked_assignments(prompt)
+        todos = [{
+            "id": f"todo-{index}",
+            "title": f"Complete {item.get('n', 'assignment')}",
+            "description": "Review the instructions and finish a first draft.",
+            "priority": PRIORITY_MAP.get(item.get("p"), "medium"),
+            "dueDate": item.get("due"),
+            "estimatedTime": f"{item.get('h', 1)} hours",
+            "course": item.get("c"),
+            "completed": False
+        } for index, item in enumerate(ranked[:8])]
+
+        courses = list(dict.fromkeys(item.get("c") for item in ranked if item.get("c")))[:3]
+        study_blocks = [{
+            "id": f"study-{index}",
+            "title": f"{course} review session",
+            "course": course,
+            "duration": "60 minutes",
+            "topics": ["Lecture notes", "Practice problems"],
+            "difficulty": "medium"
+        } for index, course in enumerate(courses)]
+
+        insights = [{
+            "id": "insight-0",
+            "type": "tip",
+            "title": "Start with the most urgent work",
+            "message": "Tackle high-priority items first and schedule study blocks around them.",
+            "action": None
+        }]
+
+        return json.dumps({"todos": todos, "studyBlocks": study_blocks, "insights": insights})
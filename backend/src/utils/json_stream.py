@@ -0,0 +1,85 @@
+from typing import List, Tuple, Dict, Any, Optional
+import json
+
+
+class JsonArrayItemStream:
+    """
+    Incremental parser for a streamed JSON object of arrays of objects, e.g.
+    {"todos": [{...}, {...}], "insights": [{...}]}.
+
+    feed() accepts arbitrary text chunks and returns each array item as soon as
+    its closing brace arrives, as (array key, parsed item) pairs. Text before
+    the first '{' (such as a markdown fence) is ignored.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start: Optional[int] = None
+        self._last_key: Optional[str] = None
+        self._section: Optional[str] = None
+        self._item_start: Optional[int] = None
+        self._closed = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Dict[str, Any]]]:
+        self._buffer += chunk
+        completed = []
+
+        while self._pos < len(self._buffer):
+            char = self._buffer[self._pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        # Strings directly inside the root object are keys (or scalar values)
+                        self._last_key = self._buffer[self._string_start + 1:self._pos]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif char in "{[":
+                if char == "[" and self._depth == 1:
+                    self._section = self._last_key
+                elif char == "{" and self._depth == 2 and self._section is not None:
+                    self._item_start = self._pos
+                self._depth += 1
+            elif char in "}]":
+                self._depth = max(0, self._depth - 1)
+                if char == "}" and self._depth == 2 and self._item_start is not None:
+                    item = self._parse(self._buffer[self._item_start:self._pos + 1])
+                    if item is not None:
+                        completed.append((self._section, item))
+                    self._item_start = None
+                elif char == "]" and self._depth == 1:
+                    self._section = None
+                elif char == "}" and self._depth == 0:
+                    self._closed = True
+
+            self._pos += 1
+
+        return completed
+
+    @staticmethod
+    def _parse(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        return item if isinstance(item, dict) else None
+
+    @property
+    def complete(self) -> bool:
+        """Whether the root object has been closed, i.e. the stream was not cut off"""
+        return self._closed
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far"""
+        return self._buffer
@@ -0,0 +1,50 @@
+from collections import defaultdict
+from threading import Lock
+from typing import Dict, Any
+
+# Process-local counters and timing summaries, read by the metrics endpoint and logs
+_lock = Lock()
+_counters: Dict[str, float] = defaultdict(float)
+_gauges: Dict[str, float] = {}
+_observations: Dict[str, Dict[str, float]] = {}
+
+
+def increment(name: str, value: float = 1):
+    """Add to a monotonically increasing counter"""
+    with _lock:
+        _counters[name] += value
+
+
+def set_gauge(name: str, value: float):
+    """Record the current value of a gauge (queue depth, in-flight requests, ...)"""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, value: float):
+    """Record one sample (e.g. a latency) as count/sum/max"""
+    with _lock:
+        stats = _observations.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["sum"] += value
+        stats["max"] = max(stats["max"], value)
+
+
+def ratio(numerator: str, denominator: str) -> float:
+    """Ratio of two counters, 0 when the denominator is empty"""
+    with _lock:
+        total = _counters.get(denominator, 0)
+        return _counters.get(numerator, 0) / total if total else 0.0
+
+
+def snapshot() -> Dict[str, Any]:
+    """Copy of all metrics"""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "observations": {
+                name: {**stats, "avg": stats["sum"] / stats["count"] if stats["count"] else 0.0}
+                for name, stats in _observations.items()
+            }
+        }
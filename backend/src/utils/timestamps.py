@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Iterable
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Stored records carry "<field>_ts" epoch seconds next to each of these ISO strings
+ASSIGNMENT_TIMESTAMP_FIELDS = ("due_at", "lock_at")
+ANNOUNCEMENT_TIMESTAMP_FIELDS = ("posted_at",)
+MODULE_TIMESTAMP_FIELDS = ("unlock_at", "completed_at")
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """Parse an ISO string or datetime into epoch seconds, None if missing or invalid"""
+    if not value:
+        return None
+
+    try:
+        if isinstance(value, datetime):
+            parsed = value
+        else:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+
+        return parsed.timestamp()
+    except (ValueError, TypeError):
+        logger.warning(f"Could not parse timestamp: {value}")
+        return None
+
+
+def add_epoch_fields(record: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """Store "<field>_ts" integer epoch seconds (or None) next to each timestamp field, at sync time"""
+    for field in fields:
+        timestamp = parse_timestamp(record.get(field))
+        record[f"{field}_ts"] = int(timestamp) if timestamp is not None else None
+    return record
+
+
+def record_ts(record: Dict[str, Any], field: str) -> Optional[float]:
+    """
+    Epoch seconds of a record's timestamp field, from the stored "<field>_ts".
+    Snapshots synced before these fields existed fall back to parsing the string.
+    """
+    key = f"{field}_ts"
+    if key in record:
+        return record[key]
+    return parse_timestamp(record.get(field))
+
+
+def filter_between(records: Iterable[Dict[str, Any]], field: str, start: Optional[float] = None,
+                   end: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Records whose timestamp is within [start, end); records without one are dropped"""
+    selected = []
+    for record in records:
+        timestamp = record_ts(record, field)
+        if timestamp is None:
+            continue
+        if (start is None or timestamp >= start) and (end is None or timestamp < end):
+            selected.append(record)
+    return selected
+
@@ -0,0 +1,6 @@
+def estimate_token_count(text: str) -> int:
+    """
+    Estimate the number of tokens in a string.
+    This is a rough approximation - about 4 characters per token for English text.
+    """
+    return max(1, len(text) // 4)
@@ -1,3 +1,4 @@
+import { useState } from 'react';
 import { useMutation } from '@tanstack/react-query';
 import { AIPlannerService, AIPlannerResponse } from '../services/ai-planner.service';
 
@@ -10,10 +11,14 @@ interface UseAIPlannerResult {
 }
 
 export const useAIPlanner = (): UseAIPlannerResult => {
+  // Sections rendered while the plan is still streaming in
+  const [partialPlan, setPartialPlan] = useState<AIPlannerResponse | undefined>(undefined);
+  
   const mutation = useMutation({
     mutationFn: ({ forceRegenerate = false }: { forceRegenerate?: boolean } = {}) => {
       console.log('🤖 [AI Planner Hook] Starting AI plan generation...', { forceRegenerate });
-      return AIPlannerService.generatePlan(forceRegenerate);
+      setPartialPlan(undefined);
+      return AIPlannerService.streamPlan(forceRegenerate, setPartialPlan);
     },
     retry: (failureCount, error) => {
       // Don't retry on timeout errors to avoid spam
@@ -66,7 +71,7 @@ export const useAIPlanner = (): UseAIPlannerResult => {
   return {
     generatePlan: (forceRegenerate = false) => mutation.mutate({ forceRegenerate }),
     isGenerating: mutation.isPending,
-    planData: mutation.data,
+    planData: mutation.data ?? (mutation.isPending ? partialPlan : undefined),
     error: mutation.error,
     isSuccess: mutation.isSuccess,
   };
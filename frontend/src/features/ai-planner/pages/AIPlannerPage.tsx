@@ -57,8 +57,8 @@ export const AIPlannerPage = () => {
     }
   }, [coursesLoading, courses, planData, isGenerating, error, generatePlan]);
 
-  // Show loading screen while courses are loading or AI is generating
-  const isLoading = coursesLoading || isGenerating;
+  // Show loading screen while courses are loading or until the first streamed sections arrive
+  const isLoading = coursesLoading || (isGenerating && !planData);
   
   console.log('🎯 [AI Planner Page] Render state:', {
     isLoading,
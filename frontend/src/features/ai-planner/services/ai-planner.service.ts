@@ -1,4 +1,3 @@
-import { ApiService } from '@/services/api/api.service';
 import { auth } from '@/config/firebase.config';
 
 export interface TodoItem {
@@ -55,136 +54,189 @@ export interface AIPlannerResponse {
   assignment_count: number;
 }
 
+export interface PlanJobStatus {
+  job_id: string;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  stage: string;
+  progress: number;
+  plan?: AIPlannerResponse | null;
+  error?: string | null;
+  created_at: string;
+  updated_at: string;
+}
+
+const API_BASE_URL = 'http://localhost:8000';
+const REQUEST_TIMEOUT = 30000; // Job polls are short; generation runs as a server-side job
+const POLL_INTERVAL = 1500;
+const MAX_JOB_WAIT = 300000; // Give up polling after 5 minutes
+
 export class AIPlannerService {
-  static async generatePlan(forceRegenerate: boolean = false): Promise<AIPlannerResponse> {
-    try {
-      console.log('📡 [AI Planner Service] Starting AI Planner API call (extended timeout)');
-      console.log('📡 [AI Planner Service] Force regenerate:', forceRegenerate);
-      
-      const startTime = performance.now();
-      
-      // Custom fetch with extended timeout for AI operations (2 minutes)
-      const endpoint = forceRegenerate 
-        ? '/api/ai-planner/generate?force_regenerate=true' 
-        : '/api/ai-planner/generate';
-      const response = await this.postWithExtendedTimeout(endpoint, {});
-      const endTime = performance.now();
-      
-      console.log('📡 [AI Planner Service] API call completed in', Math.round(endTime - startTime), 'ms');
-      console.log('📡 [AI Planner Service] Response received:', {
-        course_count: response.course_count,
-        assignment_count: response.assignment_count,
-        generated_at: response.generated_at,
-        todo_list_length: response.todo_list?.length || 0,
-        todo_list_preview: response.todo_list?.slice(0, 100) + '...' || 'No content'
-      });
+  // Stream a plan over server-sent events; onUpdate receives the partial plan after every item.
+  // The server generates on a background job; if the stream drops, the job is polled instead.
+  static async streamPlan(
+    forceRegenerate: boolean = false,
+    onUpdate?: (partial: AIPlannerResponse) => void
+  ): Promise<AIPlannerResponse> {
+    const idToken = await auth.currentUser?.getIdToken();
+    if (!idToken) {
+      throw new Error('Not authenticated');
+    }
+    
+    const endpoint = forceRegenerate 
+      ? '/api/ai-planner/stream?force_regenerate=true' 
+      : '/api/ai-planner/stream';
+    const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+      headers: { 'Authorization': `Bearer ${idToken}`, 'Accept': 'text/event-stream' }
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+    
+    const partial: AIPlannerResponse = {
+      todos: [],
+      deadlines: [],
+      studyBlocks: [],
+      insights: [],
+      summary: { totalTasks: 0, highPriorityCount: 0, upcomingDeadlines: 0, estimatedStudyTime: '0 hours' },
+      generated_at: new Date().toISOString(),
+      course_count: 0,
+      assignment_count: 0
+    };
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let job: PlanJobStatus | undefined;
+    
+    while (true) {
+      let chunk;
+      try {
+        chunk = await reader.read();
+      } catch (error) {
+        if (!job) throw error;
+        break;
+      }
+      const { done, value } = chunk;
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
       
-      return response;
-    } catch (error) {
-      console.error('📡 [AI Planner Service] Error generating AI plan:', error);
-      console.error('📡 [AI Planner Service] Error type:', typeof error);
-      console.error('📡 [AI Planner Service] Error details:', {
-        message: (error as any)?.message,
-        status: (error as any)?.status,
-        statusText: (error as any)?.statusText,
-        response: (error as any)?.response
-      });
-      throw error;
+      // Events are separated by a blank line
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        
+        const event = rawEvent.match(/^event: (.*)$/m)?.[1];
+        const data = rawEvent.match(/^data: (.*)$/m)?.[1];
+        if (!event || data === undefined) continue;
+        const payload = JSON.parse(data);
+        
+        if (event === 'done') {
+          return payload as AIPlannerResponse;
+        }
+        if (event === 'error') {
+          const error = new Error(payload.detail || 'Failed to generate AI plan');
+          // @ts-ignore
+          error.status = payload.status;
+          throw error;
+        }
+        if (event === 'job') {
+          job = payload as PlanJobStatus;
+          continue;
+        }
+        if (event === 'summary') {
+          partial.summary = payload.summary;
+          partial.course_count = payload.course_count;
+          partial.assignment_count = payload.assignment_count;
+        } else if (event === 'todos' || event === 'deadlines' || event === 'studyBlocks' || event === 'insights') {
+          (partial[event] as any[]).push(payload);
+        }
+        onUpdate?.({ ...partial });
+      }
+    }
+    
+    // Connection dropped (e.g. a proxy timeout) while the job keeps running server-side
+    if (job) {
+      console.warn('📡 [AI Planner Service] Plan stream ended early, polling job', job.job_id);
+      return this.waitForJob(job);
     }
+    throw new Error('Plan stream ended before the plan was complete');
   }
 
-  // Custom method with extended timeout for AI operations
-  private static async postWithExtendedTimeout(endpoint: string, data: any): Promise<AIPlannerResponse> {
-    const EXTENDED_TIMEOUT = 120000; // 2 minutes for AI operations
+  // Poll a generation job until it completes or fails
+  private static async waitForJob(
+    job: PlanJobStatus,
+    onProgress?: (job: PlanJobStatus) => void
+  ): Promise<AIPlannerResponse> {
+    const deadline = Date.now() + MAX_JOB_WAIT;
+    let current = job;
     
-    try {
-      console.log('📡 [AI Planner Service] Using extended timeout of', EXTENDED_TIMEOUT / 1000, 'seconds');
-      
-      const idToken = await auth.currentUser?.getIdToken();
-      if (!idToken) {
-        throw new Error('Not authenticated');
+    while (current.status === 'queued' || current.status === 'running') {
+      onProgress?.(current);
+      if (Date.now() > deadline) {
+        throw new Error(`AI generation timeout after ${MAX_JOB_WAIT / 1000} seconds. The AI is working hard on your plan - please try again.`);
       }
-      
-      const controller = new AbortController();
-      const timeoutId = setTimeout(() => {
-        console.log('📡 [AI Planner Service] Request timeout after', EXTENDED_TIMEOUT / 1000, 'seconds');
-        controller.abort();
-      }, EXTENDED_TIMEOUT);
+      await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL));
+      current = (await this.request('GET', `/api/ai-planner/jobs/${job.job_id}`)).data as PlanJobStatus;
+    }
+    
+    onProgress?.(current);
+    if (current.status === 'failed' || !current.plan) {
+      throw new Error(current.error || 'Failed to generate AI plan');
+    }
+    return current.plan;
+  }
 
-      console.log('📡 [AI Planner Service] Making fetch request to backend...');
-      
-      const response = await fetch(`http://localhost:8000${endpoint}`, {
-        method: 'POST',
+  private static async request(method: 'GET' | 'POST', endpoint: string, data?: any): Promise<{ status: number; data: any }> {
+    const idToken = await auth.currentUser?.getIdToken();
+    if (!idToken) {
+      throw new Error('Not authenticated');
+    }
+    
+    const controller = new AbortController();
+    const timeoutId = setTimeout(() => controller.abort(), REQUEST_TIMEOUT);
+    
+    try {
+      const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+        method,
         headers: {
           'Authorization': `Bearer ${idToken}`,
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify(data),
+        body: data !== undefined ? JSON.stringify(data) : undefined,
         signal: controller.signal
       });
-
-      console.log('📡 [AI Planner Service] Fetch completed! Response status:', response.status);
-      console.log('📡 [AI Planner Service] Response headers:', Object.fromEntries(response.headers.entries()));
       
-      clearTimeout(timeoutId);
-
+      const result = await response.json();
       if (!response.ok) {
-        const errorData = await response.json();
         console.error('📡 [AI Planner Service] API Error Response:', {
           status: response.status,
           statusText: response.statusText,
-          data: errorData
+          data: result
         });
         
-        const error = new Error(errorData.detail || `HTTP ${response.status}: ${response.statusText}`);
+        const error = new Error(result.detail || `HTTP ${response.status}: ${response.statusText}`);
         // @ts-ignore
         error.status = response.status;
         // @ts-ignore
-        error.data = errorData;
+        error.data = result;
         throw error;
       }
-
-      console.log('📡 [AI Planner Service] About to parse JSON response...');
-      const result = await response.json();
-      console.log('📡 [AI Planner Service] JSON parsing completed successfully');
-      console.log('📡 [AI Planner Service] Response data keys:', Object.keys(result));
-      console.log('📡 [AI Planner Service] Response data preview:', {
-        course_count: result.course_count,
-        assignment_count: result.assignment_count,
-        generated_at: result.generated_at,
-        todos_count: result.todos?.length || 0,
-        deadlines_count: result.deadlines?.length || 0,
-        studyBlocks_count: result.studyBlocks?.length || 0,
-        insights_count: result.insights?.length || 0
-      });
-      return result;
-
+      
+      return { status: response.status, data: result };
     } catch (error: any) {
       if (error.name === 'AbortError') {
-        console.error('📡 [AI Planner Service] Request aborted due to timeout');
-        throw new Error(`AI generation timeout after ${EXTENDED_TIMEOUT / 1000} seconds. The AI is working hard on your plan - please try again.`);
+        throw new Error(`Request timeout after ${REQUEST_TIMEOUT / 1000} seconds. Please try again.`);
       }
       
-      // Check for various network errors
       if (error instanceof TypeError && error.message.includes('fetch')) {
         console.error('📡 [AI Planner Service] Network/fetch error:', error);
         throw new Error('Network connection error. Please check your internet connection and try again.');
       }
       
-      if (error.message && error.message.includes('JSON')) {
-        console.error('📡 [AI Planner Service] JSON parsing error:', error);
-        throw new Error('Response parsing error. The server response may be corrupted.');
-      }
-      
-      console.error('📡 [AI Planner Service] Unknown error type:', {
-        name: error.name,
-        message: error.message,
-        type: typeof error,
-        constructor: error.constructor?.name
-      });
-      
-      console.error('📡 [AI Planner Service] Full error:', error);
       throw error;
+    } finally {
+      clearTimeout(timeoutId);
     }
   }
 }
@@ -148,36 +148,9 @@ export const ChatPage = () => {
     setIsLoading(true);
 
     try {
-      console.log('Sending message with context from previous messages');
-      
-      // Always send previous messages for context (not just when resuming)
-      let previousMessagesToSend: ChatMessage[] | undefined;
-      if (messages.length > 0) {
-        // Calculate estimated token count of messages to ensure we don't exceed limits
-        let tokenCount = 0;
-        let messagesToInclude = [];
-        
-        // Start from the most recent messages and work backwards
-        for (let i = messages.length - 1; i >= 0; i--) {
-          const msg = messages[i];
-          const msgTokens = estimateTokenCount(msg.content);
-          
-          // If adding this message would exceed our token budget, stop
-          if (tokenCount + msgTokens > AVAILABLE_INPUT_TOKENS * 0.8) {
-            break;
-          }
-          
-          // Otherwise, include this message
-          messagesToInclude.unshift(msg);
-          tokenCount += msgTokens;
-        }
-        
-        // If we have messages to include, send them
-        if (messagesToInclude.length > 0) {
-          previousMessagesToSend = messagesToInclude;
-          console.log(`Sending ${previousMessagesToSend.length} previous messages (approx. ${tokenCount} tokens) for context`);
-        }
-        
+      // The server owns the history; it only needs the last message we have seen
+      const lastMessageId = [...messages].reverse().find(msg => msg.messageId)?.messageId;
+      if (isResumingChat) {
         // Reset resuming flag after first message
         setIsResumingChat(false);
       }
@@ -187,7 +160,7 @@ export const ChatPage = () => {
         content, 
         currentChatId, 
         undefined, // No longer using previous_response_id
-        previousMessagesToSend
+        lastMessageId
       );
       
       // Update the chat ID if this is a new chat
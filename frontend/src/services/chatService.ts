@@ -24,27 +24,22 @@ const createAuthenticatedRequest = async () => {
   });
 };
 
-// Helper to prepare message for sending to the API
-const prepareMessageForApi = (message: ChatMessage) => {
-  // Convert Date objects to ISO strings to ensure proper serialization
-  return {
-    ...message,
-    timestamp: message.timestamp instanceof Date 
-      ? message.timestamp.toISOString() 
-      : message.timestamp,
-  };
-};
+// Helper to map the API's snake_case message ID onto the client model
+const fromApiMessage = (message: any): ChatMessage => ({
+  ...message,
+  messageId: message.message_id ?? message.messageId,
+});
 
 export const sendMessage = async (
   message: string, 
   chatId?: string, 
   previousResponseId?: string,
-  previousMessages?: ChatMessage[]
+  lastMessageId?: string
 ): Promise<ChatMessage> => {
   try {
     const http = await createAuthenticatedRequest();
     
-    // Build request body
+    // Build request body; the server rebuilds conversation history itself
     const requestBody: any = { 
       message
     };
@@ -58,20 +53,16 @@ export const sendMessage = async (
       requestBody.chat_id = chatId;
     }
     
-    // Include previous messages if available (for resuming conversations)
-    if (previousMessages && previousMessages.length > 0) {
-      // The messages have already been filtered by token count in the ChatPage component
-      console.log(`Sending ${previousMessages.length} previous messages for context`);
-      
-      // Prepare messages for API - ensure dates are serialized correctly
-      requestBody.previous_messages = previousMessages.map(prepareMessageForApi);
+    // Lets the server detect a stale history cache
+    if (lastMessageId) {
+      requestBody.last_message_id = lastMessageId;
     }
     
     const response = await http.post<ChatResponse>('/api/chat', requestBody);
     
     // Add the response ID and chat ID to the returned message
     return {
-      ...response.data.message,
+      ...fromApiMessage(response.data.message),
       responseId: response.data.response_id,
       chatId: response.data.chat_id
     };
@@ -96,7 +87,7 @@ export const getChatMessages = async (chatId: string): Promise<ChatMessage[]> =>
   try {
     const http = await createAuthenticatedRequest();
     const response = await http.get(`/api/chats/${chatId}/messages`);
-    return response.data || [];
+    return (response.data || []).map(fromApiMessage);
   } catch (error) {
     console.error(`Error fetching messages for chat ${chatId}:`, error);
     return [];